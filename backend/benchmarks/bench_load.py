@@ -0,0 +1,277 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent.parent
+BENCH_DIR = Path(__file__).parent
+
+# Boots the app (through serve.py) against benchmarks/fake_services.py and
+# benchmarks/fake_piper.py, seeds users with uploads, then drives a weighted
+# traffic mix for --duration seconds and reports throughput and latency
+# percentiles per operation. Needs Postgres (DATABASE_URL); the teaching
+# cache stores jsonb.
+
+DEFAULT_MIX = "upload=1,lesson=25,answer=30,camera=30,voice=14"
+CAMERA_SAMPLE = {
+    "session_duration": 30, "focus_score": 0.8, "confusion_level": 0.2, "fatigue_score": 0.1,
+    "engagement": 0.7, "frustration": 0.1, "blink_rate": 14.0, "head_stability": 0.9, "engagement_score": 0.75,
+}
+VOICE_LINES = [
+    "Correct! Well done.", "Not quite, try again.", "Let's look at this step by step.",
+    "A derivative measures how fast a function changes.", "Here is a hint.", "Next lesson",
+]
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest rank
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Unknown operation in --mix: {name} (choose from {', '.join(OPERATIONS)})")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def record(self, operation: str, seconds: float, ok: bool) -> None:
+        self.latencies[operation].append(seconds * 1000)
+        if not ok:
+            self.errors[operation] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        rows = {}
+        for operation, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            rows[operation] = {
+                "requests": len(values),
+                "errors": self.errors[operation],
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50), 1),
+                "p95_ms": round(percentile(values, 95), 1),
+                "p99_ms": round(percentile(values, 99), 1),
+                "max_ms": round(values[-1], 1),
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {"elapsed_s": round(elapsed, 1), "requests": total, "rps": round(total / elapsed, 2), "operations": rows}
+
+
+class Learner:
+    def __init__(self, index: int):
+        # Same shape as the frontend's guest ids, so the run exercises
+        # the non-UUID ids real users send
+        self.user_id = f"guest_{uuid.uuid4()}"
+        self.name = f"Load {index}"
+        self.subtopics: list[str] = []
+
+
+def document(learner: Learner) -> tuple:
+    text = "\n\n".join(f"Section {i}\nNotes for {learner.name}." for i in range(20))
+    return ("files", (f"notes-{learner.user_id[-8:]}.txt", text.encode(), "text/plain"))
+
+
+async def upload(client: httpx.AsyncClient, learner: Learner) -> httpx.Response:
+    return await client.post(
+        "/parse",
+        files=[document(learner)],
+        headers={"X-User-Id": learner.user_id, "X-User-Name": learner.name},
+    )
+
+
+async def learn_subtopics(client: httpx.AsyncClient, learner: Learner, curriculum_id: str) -> None:
+    curriculum = await client.get("/api/curriculum", params={"user_id": learner.user_id, "curriculum_id": curriculum_id})
+    learner.subtopics += [s["id"] for m in curriculum.json()["modules"] for s in m["subtopics"]]
+
+
+async def lesson(client: httpx.AsyncClient, learner: Learner) -> httpx.Response:
+    return await client.get(f"/api/teaching/{random.choice(learner.subtopics)}", params={"user_id": learner.user_id})
+
+
+async def answer(client: httpx.AsyncClient, learner: Learner) -> httpx.Response:
+    return await client.post("/api/attempts/score", json={
+        "user_id": learner.user_id,
+        "subtopic_id": random.choice(learner.subtopics),
+        "final_score": random.randint(20, 100),
+    })
+
+
+async def camera(client: httpx.AsyncClient, learner: Learner) -> httpx.Response:
+    return await client.post("/api/camera/metrics", json={
+        "user_id": learner.user_id, "subtopic_id": random.choice(learner.subtopics), **CAMERA_SAMPLE,
+    })
+
+
+async def voice(client: httpx.AsyncClient, learner: Learner) -> httpx.Response:
+    # Mostly repeated phrases (cache hits) with an occasional new one
+    texts = random.sample(VOICE_LINES, 3)
+    if random.random() < 0.2:
+        texts.append(f"You have finished {random.randint(1, 10_000)} exercises.")
+    return await client.post("/api/voice/batch", params={"format": "json"}, json={"texts": texts})
+
+
+OPERATIONS = {"upload": upload, "lesson": lesson, "answer": answer, "camera": camera, "voice": voice}
+
+
+async def timed_call(recorder: Recorder, operation: str, client: httpx.AsyncClient, learner: Learner) -> None:
+    started = time.perf_counter()
+    response = None
+    try:
+        response = await OPERATIONS[operation](client, learner)
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        ok = False
+    recorder.record(operation, time.perf_counter() - started, ok)
+    if operation == "upload" and ok:
+        await learn_subtopics(client, learner, response.json()["curriculum_id"])
+
+
+async def drive(base_url: str, learners: list[Learner], mix: dict[str, float], concurrency: int,
+                duration: float, recorder: Recorder) -> float:
+    names, weights = list(mix), list(mix.values())
+    timeout = httpx.Timeout(300.0)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        print(f"[LOAD] Seeding {len(learners)} learner(s) with one upload each")
+        seed = Recorder()
+        await asyncio.gather(*(timed_call(seed, "upload", client, learner) for learner in learners))
+        learners = [learner for learner in learners if learner.subtopics]
+        if not learners:
+            raise SystemExit("[LOAD] Seeding failed: no uploads produced subtopics")
+        print(f"[LOAD] Seed uploads p50 {seed.summary(1)['operations']['upload']['p50_ms']} ms; running mix for {duration:.0f}s")
+
+        deadline = time.monotonic() + duration
+
+        async def user_loop():
+            while time.monotonic() < deadline:
+                operation = random.choices(names, weights)[0]
+                await timed_call(recorder, operation, client, random.choice(learners))
+
+        started = time.monotonic()
+        await asyncio.gather(*(user_loop() for _ in range(concurrency)))
+        return time.monotonic() - started
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"[LOAD] {process.args} exited with {process.returncode}")
+        try:
+            if httpx.get(base_url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"[LOAD] {base_url} did not come up in {timeout}s")
+
+
+def stop(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend against local fakes for Gemini, Unstructured and Piper")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), help="Postgres URL; use a scratch database")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--concurrency", type=int, default=32, help="Simulated users issuing requests back to back")
+    parser.add_argument("--learners", type=int, default=8, help="Accounts seeded with one upload each")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fake-port", type=int, default=8766)
+    parser.add_argument("--gemini-latency", default="lognormal:2500,0.4", help="fixed:MS, uniform:LO,HI or lognormal:MEDIAN_MS,SIGMA")
+    parser.add_argument("--unstructured-job-latency", default="lognormal:6000,0.5")
+    parser.add_argument("--piper-latency", default="lognormal:250,0.3")
+    parser.add_argument("--elements", type=int, default=150)
+    parser.add_argument("--json", help="Also write the summary here, for comparing runs")
+    args = parser.parse_args()
+
+    if not args.database_url or not args.database_url.startswith("postgres"):
+        raise SystemExit("--database-url (or DATABASE_URL) must point at a scratch Postgres database")
+    mix = parse_mix(args.mix)
+
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    base_url = f"http://127.0.0.1:{args.port}"
+    scratch = tempfile.mkdtemp(prefix="orbit-load-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": args.database_url,
+        "DEBUG": "false",
+        "GEMINI_API_KEY": "load-test-key",
+        "GOOGLE_GEMINI_BASE_URL": fake_url,
+        "UNSTRUCTURED_API_KEY": "load-test-key",
+        "UNSTRUCTURED_API_URL": fake_url,
+        "PIPER_BINARY_PATH": str(BENCH_DIR / "fake_piper.py"),
+        "FAKE_PIPER_LATENCY": args.piper_latency,
+        "PHRASE_STORE_DIR": os.path.join(scratch, "tts_cache"),
+        "WEB_CONCURRENCY": str(args.workers),
+    }
+    for name in [k for k in env if k.startswith("GEMINI_API_KEY_")]:
+        env.pop(name)
+
+    fakes = subprocess.Popen([
+        sys.executable, str(BENCH_DIR / "fake_services.py"),
+        "--port", str(args.fake_port),
+        "--gemini-latency", args.gemini_latency,
+        "--unstructured-job-latency", args.unstructured_job_latency,
+        "--elements", str(args.elements),
+    ], env=env)
+    app = None
+    try:
+        subprocess.run([sys.executable, "scripts/migrate.py"], cwd=BACKEND_DIR, env=env, check=True)
+        app = subprocess.Popen([sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(args.port)], cwd=BACKEND_DIR, env=env)
+        wait_until_ready(f"{fake_url}/api/v1/jobs/none", fakes)
+        wait_until_ready(f"{base_url}/health/live", app)
+
+        recorder = Recorder()
+        learners = [Learner(i) for i in range(args.learners)]
+        elapsed = asyncio.run(drive(base_url, learners, mix, args.concurrency, args.duration, recorder))
+    finally:
+        if app is not None:
+            stop(app)
+        stop(fakes)
+
+    summary = recorder.summary(elapsed)
+    summary["config"] = {k: v for k, v in vars(args).items() if k not in ("database_url", "json")}
+    print(f"\n{args.workers} worker(s), concurrency {args.concurrency}, {summary['requests']} requests in {summary['elapsed_s']}s ({summary['rps']} req/s)")
+    print(f"  {'operation':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for operation, row in summary["operations"].items():
+        print(
+            f"  {operation:<10} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8} "
+            f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} {row['max_ms']:>9}"
+        )
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
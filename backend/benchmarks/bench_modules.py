@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import gc
+import gzip
+import hashlib
+import json
+import mimetypes
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+
+# Times the module builder (is_garbage, create_modules, balance_modules,
+# merge_small_modules) on recorded Unstructured outputs in benchmarks/fixtures
+# plus synthetic documents of --sizes elements, tracks peak allocations, and
+# checks the modules built are identical across repeats and, with --against
+# or --compare, across commits. --code-dir points the imports at another
+# checkout, which is how --against measures an older commit with this script.
+
+WORDS = (
+    "function derivative limit slope tangent rate change integral area curve value "
+    "vector matrix probability event outcome sequence series sum theorem proof example "
+    "energy force mass velocity acceleration momentum cell membrane protein enzyme"
+).split()
+MOJIBAKE = ["donâ€™t", "itâ€™s", "â€œquotedâ€\x9d", "cafÃ©", "naÃ¯ve"]
+
+
+def sentence(rng: random.Random, low: int, high: int) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(low, high))]
+    if rng.random() < 0.1:
+        words.insert(rng.randrange(len(words)), rng.choice(MOJIBAKE))
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_elements(count: int, seed: int = 0) -> list[dict]:
+    # Shaped like Unstructured partition output: numbered sections of prose,
+    # lists, formulas and tables, with page furniture the filters should drop
+    rng = random.Random(seed * 100_003 + count)
+    elements = []
+    section = 0
+    page = 1
+
+    def add(kind: str, text: str) -> None:
+        elements.append({
+            "type": kind,
+            "element_id": hashlib.md5(f"{count}-{len(elements)}".encode()).hexdigest(),
+            "text": text,
+            "metadata": {"page_number": page, "filename": f"synthetic-{count}.pdf", "languages": ["eng"]},
+        })
+
+    while len(elements) < count:
+        section += 1
+        add("Title", f"{section}. {' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title()}")
+        for _ in range(rng.randint(1, 6)):
+            roll = rng.random()
+            if roll < 0.55:
+                add("NarrativeText", " ".join(sentence(rng, 8, 24) for _ in range(rng.randint(1, 4))))
+            elif roll < 0.65:
+                add("ListItem", sentence(rng, 4, 12))
+            elif roll < 0.72:
+                add("Formula", f"f(x) = {rng.randint(2, 9)}x^{rng.randint(2, 4)} + {rng.randint(1, 20)}")
+            elif roll < 0.78:
+                add("Table", " ".join(f"{rng.choice(WORDS)} {rng.randint(1, 99)}" for _ in range(rng.randint(6, 20))))
+            elif roll < 0.86:
+                add("UncategorizedText", sentence(rng, 3, 10))
+            elif roll < 0.92:
+                page += 1
+                add("PageNumber", str(page))
+            elif roll < 0.96:
+                add("Header", rng.choice(["Chapter notes", "Lecture handout", "-----", "* * *"]))
+            else:
+                add("Footer", f"Page {page}")
+    return elements[:count]
+
+
+def load_fixtures(fixture_dir: Path, sizes: list[int]) -> dict[str, list[dict]]:
+    fixtures = {}
+    for path in sorted(fixture_dir.glob("*.json*")):
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            fixtures[path.name.split(".")[0]] = json.load(f)
+    for size in sizes:
+        fixtures[f"synthetic-{size}"] = synthetic_elements(size)
+    return fixtures
+
+
+def resize(elements: list[dict], size: int) -> list[dict]:
+    # A prefix of the document, or the document repeated with fresh ids and
+    # page numbers, so larger fixtures keep recorded text and structure
+    pages = max((e.get("metadata", {}).get("page_number") or 0 for e in elements), default=0)
+    resized = []
+    for copy in range(-(-size // len(elements))):
+        for element in elements:
+            clone = json.loads(json.dumps(element))
+            if copy:
+                clone["element_id"] = f"{element.get('element_id', '')}-{copy}"
+                if clone.get("metadata", {}).get("page_number"):
+                    clone["metadata"]["page_number"] += copy * pages
+            resized.append(clone)
+    return resized[:size]
+
+
+def save_fixture(elements: list[dict], target: Path) -> None:
+    # mtime=0 keeps regenerated fixtures byte-identical
+    with open(target, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+        f.write(json.dumps(elements).encode("utf-8"))
+    print(f"[BENCH] Saved {len(elements)} elements -> {target}")
+
+
+def record(paths: list[str], fixture_dir: Path, from_elements: bool, sizes: list[int]) -> None:
+    # Runs real documents through Unstructured once and keeps the elements;
+    # with from_elements the files already hold Unstructured element JSON
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+    for path in map(Path, paths):
+        if from_elements:
+            with open(path, encoding="utf-8") as f:
+                elements = json.load(f)
+        else:
+            from starlette.datastructures import Headers, UploadFile
+
+            from services.manual_parsing import get_elements
+            from services.unstructured_service import parse_files
+
+            content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            with open(path, "rb") as f:
+                upload = UploadFile(file=f, filename=path.name, headers=Headers({"content-type": content_type}))
+                elements = get_elements(asyncio.run(parse_files([upload])))
+        save_fixture(elements, fixture_dir / f"{path.stem}.json.gz")
+        for size in sizes:
+            save_fixture(resize(elements, size), fixture_dir / f"{path.stem}-{size}.json.gz")
+
+
+def digest(modules) -> str:
+    return hashlib.sha256(json.dumps(modules, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def best_ms(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1000, 3)
+
+
+def peak_kib(fn) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def measure(elements: list[dict], repeat: int) -> dict:
+    import ftfy
+
+    from services import manual_parsing
+    from services.garbage_removal import is_garbage
+
+    # Capture the raw modules create_modules hands to balance_modules, so the
+    # later stages can be timed on their real inputs
+    balance_modules = manual_parsing.balance_modules
+    merge_small_modules = manual_parsing.merge_small_modules
+    captured = {}
+
+    def capture(modules):
+        captured["raw"] = [module[:] for module in modules]
+        return balance_modules(modules)
+
+    manual_parsing.balance_modules = capture
+    try:
+        modules = manual_parsing.create_modules(elements)
+    finally:
+        manual_parsing.balance_modules = balance_modules
+    raw = captured.get("raw", [])
+    balanced = balance_modules(raw)
+    texts = [ftfy.fix_text(element["text"]) for element in elements]
+
+    stages = {
+        "is_garbage": lambda: [is_garbage(text, 10, 0.5) for text in texts],
+        "balance_modules": lambda: balance_modules(raw),
+        "merge_small_modules": lambda: merge_small_modules(balanced),
+        "create_modules": lambda: manual_parsing.create_modules(elements),
+    }
+    results = {name: {"ms": best_ms(fn, repeat), "peak_kib": peak_kib(fn)} for name, fn in stages.items()}
+
+    digests = {digest(modules)} | {digest(manual_parsing.create_modules(elements)) for _ in range(2)}
+    stable = len(digests) == 1
+    return {
+        "elements": len(elements),
+        "modules": len(modules),
+        "subtopics": sum(len(module) for module in modules),
+        "digest": next(iter(digests)) if stable else None,
+        "stable": stable,
+        "stages": results,
+    }
+
+
+def run(fixtures: dict[str, list[dict]], repeat: int) -> dict:
+    results = {}
+    for name, elements in sorted(fixtures.items(), key=lambda item: len(item[1])):
+        # Fewer repeats on big documents; create_modules is seconds there
+        result = measure(elements, max(1, repeat * 500 // max(500, len(elements))))
+        results[name] = result
+        print(
+            f"  {name:<24} {result['elements']:>6} el -> {result['modules']:>4} modules "
+            f"{'stable' if result['stable'] else 'UNSTABLE'} " +
+            " ".join(f"{stage}={row['ms']}ms/{row['peak_kib']}KiB" for stage, row in result["stages"].items())
+        )
+    return results
+
+
+def compare(before: dict, after: dict, allow_output_change: bool) -> bool:
+    ok = True
+    print(f"\n  {'fixture':<24} {'stage':<20} {'before ms':>10} {'after ms':>10} {'ratio':>7} {'before KiB':>11} {'after KiB':>10}")
+    for name in sorted(set(before) & set(after), key=lambda n: after[n]["elements"]):
+        for stage, new in after[name]["stages"].items():
+            old = before[name]["stages"].get(stage)
+            if not old:
+                continue
+            ratio = old["ms"] / new["ms"] if new["ms"] else float("inf")
+            print(f"  {name:<24} {stage:<20} {old['ms']:>10} {new['ms']:>10} {ratio:>6.2f}x {old['peak_kib']:>11} {new['peak_kib']:>10}")
+        if before[name]["digest"] != after[name]["digest"]:
+            print(f"  {name}: modules differ between runs ({before[name]['digest']} -> {after[name]['digest']})")
+            ok = allow_output_change and ok
+    return ok
+
+
+def measure_revision(revision: str, argv: list[str]) -> dict:
+    repo = Path(subprocess.check_output(["git", "rev-parse", "--show-toplevel"], cwd=BACKEND_DIR, text=True).strip())
+    backend = BACKEND_DIR.resolve().relative_to(repo)
+    worktree = Path(tempfile.mkdtemp(prefix="orbit-bench-"))
+    saved = worktree.with_suffix(".json")
+    subprocess.run(["git", "worktree", "add", "--detach", str(worktree), revision], cwd=repo, check=True)
+    try:
+        print(f"[BENCH] Measuring {revision}")
+        subprocess.run([sys.executable, __file__, *argv, "--code-dir", str(worktree / backend), "--save", str(saved)], check=True)
+        return json.loads(saved.read_text())
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", str(worktree)], cwd=repo, check=False)
+        saved.unlink(missing_ok=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Module builder timings, peak memory and output stability")
+    parser.add_argument("--sizes", default="10,100,1000,5000", help="Synthetic fixture sizes in elements ('' for recorded only)")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURE_DIR, help="Recorded element fixtures (*.json, *.json.gz)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--record", nargs="+", metavar="FILE", help="Run documents through Unstructured and save them as fixtures")
+    parser.add_argument("--from-elements", action="store_true", help="--record FILEs are saved Unstructured element JSON; skip the API")
+    parser.add_argument("--resize", default="", help="With --record, also save each document cut or repeated to these element counts")
+    parser.add_argument("--save", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, metavar="RESULTS", help="Compare against results saved with --save")
+    parser.add_argument("--against", metavar="REV", help="Measure REV in a temporary git worktree and compare")
+    parser.add_argument("--allow-output-change", action="store_true", help="Don't fail when modules differ from the baseline")
+    parser.add_argument("--code-dir", type=Path, default=BACKEND_DIR, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(args.code_dir))
+    if args.record:
+        record(args.record, args.fixtures, args.from_elements, [int(size) for size in args.resize.split(",") if size.strip()])
+        return
+
+    baseline = None
+    if args.against:
+        shared = ["--sizes", args.sizes, "--fixtures", str(args.fixtures.resolve()), "--repeat", str(args.repeat)]
+        baseline = measure_revision(args.against, shared)
+    elif args.compare:
+        baseline = json.loads(args.compare.read_text())
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    print(f"[BENCH] Module builder from {args.code_dir}")
+    results = run(load_fixtures(args.fixtures, sizes), args.repeat)
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+
+    unstable = [name for name, result in results.items() if not result["stable"]]
+    if unstable:
+        print(f"[BENCH] Output changed between repeats for: {', '.join(unstable)}")
+    if baseline is not None and not compare(baseline, results, args.allow_output_change):
+        sys.exit(1)
+    if unstable:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
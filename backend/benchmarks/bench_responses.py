@@ -0,0 +1,103 @@
+import argparse
+import base64
+import gzip
+import json
+import math
+import struct
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.compression import brotli, compress
+from services.json_response import dumps, orjson
+
+
+def simulation_html(lines: int = 300) -> str:
+    body = [
+        "<!DOCTYPE html><html><head><style>body{margin:0;font-family:sans-serif}</style></head><body>",
+        "<canvas id='c' width='600' height='400'></canvas><input id='speed' type='range' min='1' max='10'>",
+        "<script>",
+    ]
+    for i in range(lines - 5):
+        body.append(f"  const p{i} = {{x: Math.cos({i} * 0.1) * 120 + 300, y: Math.sin({i} * 0.1) * 120 + 200, r: {i % 7 + 2}}};")
+    body += ["</script>", "</body></html>"]
+    return "\n".join(body)
+
+
+def typical_lesson() -> dict:
+    paragraph = (
+        "A derivative measures how a function changes as its input changes. "
+        "Geometrically it is the slope of the tangent line at a point, and physically "
+        "it describes instantaneous rates such as velocity. "
+    ) * 3
+    blocks = [
+        {"type": "paragraph", "content": paragraph},
+        {"type": "formula", "formula": "f'(x) = lim_{h->0} (f(x+h) - f(x)) / h", "explanation": paragraph[:200]},
+        {"type": "insight", "content": paragraph[:240]},
+        {"type": "list", "items": [paragraph[:120] for _ in range(5)]},
+        {"type": "simulation", "html": simulation_html(), "description": paragraph[:160]},
+        {"type": "paragraph", "content": paragraph},
+        {
+            "type": "question", "questionType": "mcq", "question": "What is the derivative of x^2?",
+            "options": ["x", "2x", "x^2", "2"], "correctAnswer": 1, "explanation": paragraph[:180],
+        },
+        {
+            "type": "question", "questionType": "fill_in_blank", "question": "The derivative of sin(x) is ____.",
+            "correctAnswer": "cos(x)", "explanation": paragraph[:180],
+        },
+    ]
+    return {"blocks": blocks, "cached": True, "curriculum_id": "6f1c8e0a-94a3-4b0e-9d6f-2b1c2c1e7a10"}
+
+
+def voice_batch(phrases: int = 10, seconds: float = 1.5, rate: int = 22050) -> dict:
+    samples = int(seconds * rate)
+    pcm = b"".join(
+        struct.pack("<h", int(8000 * math.sin(i * 0.05) * math.sin(i * 0.0007)))
+        for i in range(samples)
+    )
+    header = b"RIFF" + struct.pack("<I", 36 + len(pcm)) + b"WAVEfmt " + struct.pack(
+        "<IHHIIHH", 16, 1, 1, rate, rate * 2, 2, 16
+    ) + b"data" + struct.pack("<I", len(pcm))
+    audio = base64.b64encode(header + pcm).decode("ascii")
+    return {"audio": [audio] * phrases, "keys": [f"{i:032x}" for i in range(phrases)], "formats": ["wav"] * phrases}
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def report(name: str, payload: dict, repeat: int) -> None:
+    stdlib_ms = timed(lambda: json.dumps(payload).encode("utf-8"), repeat)
+    fast_ms = timed(lambda: dumps(payload), repeat)
+    body = dumps(payload)
+
+    print(f"{name}")
+    print(f"  serialize  json.dumps {stdlib_ms:8.3f} ms | {'orjson' if orjson else 'fallback'} {fast_ms:8.3f} ms")
+    print(f"  identity   {len(body):>10,} bytes")
+    gzip_ms = timed(lambda: compress(body, "gzip"), repeat)
+    print(f"  gzip-6     {len(compress(body, 'gzip')):>10,} bytes ({gzip_ms:.3f} ms)")
+    if brotli is not None:
+        br_ms = timed(lambda: compress(body, "br"), repeat)
+        print(f"  br-4       {len(compress(body, 'br')):>10,} bytes ({br_ms:.3f} ms)")
+    else:
+        print("  br-4       (brotli not installed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes on the wire and serialization time for typical payloads")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    report("GET /api/teaching (typical lesson)", typical_lesson(), args.repeat)
+    report("POST /api/voice/batch (10 phrases, json)", voice_batch(), max(1, args.repeat // 10))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from sqlalchemy import create_engine, text
+
+from services.db_services.migrations import run_migrations
+from services.db_services.user_stats import as_date, compute_streak
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def python_streak(db, user_id: str) -> int:
+    # The per-row walk get_user_stats used to do
+    dates = [as_date(row.attempt_date) for row in db.execute(
+        text("""
+            SELECT DISTINCT DATE(created_at) AS attempt_date
+            FROM user_attempts
+            WHERE user_id = :uid
+            ORDER BY attempt_date DESC
+        """),
+        {"uid": user_id}
+    )]
+    if not dates:
+        return 0
+    streak = 1
+    for previous, current in zip(dates, dates[1:]):
+        if current != previous - timedelta(days=1):
+            break
+        streak += 1
+    return streak
+
+
+def seed(engine, days: int, per_day: int, gap_at: int) -> None:
+    end = date.today()
+    rows = []
+    for offset in range(days):
+        if offset == gap_at:
+            continue
+        day = end - timedelta(days=offset)
+        for i in range(per_day):
+            rows.append({
+                "uid": USER_ID,
+                "at": datetime(day.year, day.month, day.day, 9 + i),
+            })
+    with engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO user_attempts (user_id, subtopic_id, score, created_at) VALUES (:uid, NULL, 1.0, :at)"),
+            rows
+        )
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the SQL run walk with the Python walk")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--per-day", type=int, default=3)
+    parser.add_argument("--gap-days-ago", type=int, default=400, help="Break the streak this many days back")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default=os.getenv("TEST_DATABASE_URL", "sqlite://"))
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    run_migrations(engine)
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM user_attempts WHERE user_id = :uid"), {"uid": USER_ID})
+    days = args.years * 365
+    seed(engine, days, args.per_day, args.gap_days_ago)
+
+    with engine.connect() as db:
+        sql_streak, _ = compute_streak(db, USER_ID)
+        walk_streak = python_streak(db, USER_ID)
+        assert sql_streak == walk_streak, (sql_streak, walk_streak)
+
+        sql_ms = timed(lambda: compute_streak(db, USER_ID), args.repeat)
+        walk_ms = timed(lambda: python_streak(db, USER_ID), args.repeat)
+
+    print(f"{engine.dialect.name}: {days} days x {args.per_day} attempts, streak {sql_streak}")
+    print(f"  sql run walk         : {sql_ms:8.2f} ms (1 row returned)")
+    print(f"  python walk          : {walk_ms:8.2f} ms ({days - 1} rows returned)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.bench_responses import simulation_html, timed
+from services.Gemini_Services.teaching_models import Simulation, TeachingResponse, parse_teaching_response
+
+
+def gemini_lesson_text() -> str:
+    paragraph = (
+        "A derivative measures how a function changes as its input changes. "
+        "Geometrically it is the slope of the tangent line at a point. "
+    ) * 3
+    blocks = [
+        {"type": "paragraph", "content": paragraph},
+        {"type": "formula", "formula": "f'(x) = lim_{h->0} (f(x+h) - f(x)) / h", "explanation": paragraph[:200]},
+        {"type": "insight", "content": paragraph[:240]},
+        {"type": "list", "items": [paragraph[:120] for _ in range(5)]},
+        {"type": "simulation", "html": simulation_html() + "\n```", "description": paragraph[:160]},
+        {"type": "paragraph", "content": paragraph},
+        {
+            "type": "question", "questionType": "mcq", "question": "What is the derivative of x^2?",
+            "options": ["x", "2x", "x^2", "2"], "correctIndex": 1,
+            "explanations": {"correct": paragraph[:120], "incorrect": [paragraph[:80]] * 3}, "hint": "Power rule",
+        },
+        {
+            "type": "question", "questionType": "fill_in_blank", "question": "The derivative of sin(x) is ____.",
+            "correctAnswer": "cos(x)", "acceptedAnswers": ["cos x"],
+            "explanations": {"correct": paragraph[:120]}, "hint": "Think of the unit circle",
+        },
+    ]
+    return json.dumps({"blocks": blocks}, indent=2)
+
+
+def previous_path(raw: str) -> str:
+    # generate_teaching_blocks + routes/teaching.py before the fast path
+    result = TeachingResponse(**json.loads(raw))
+    for block in result.blocks:
+        if isinstance(block, Simulation):
+            html = block.html.strip()
+            if html.endswith("```"):
+                html = html[:-3]
+            block.html = html.strip()
+    blocks_list = [block.model_dump() for block in result.blocks]
+    stored = json.dumps(blocks_list)
+    json.dumps({"blocks": blocks_list, "cached": False, "curriculum_id": "c"})
+    return stored
+
+
+def fast_path(raw: str) -> bytes:
+    _, blocks_json = parse_teaching_response(raw)
+    b"".join([b'{"blocks":', blocks_json, b',"cached":false,"curriculum_id":"c"}'])
+    return blocks_json
+
+
+def previous_cached(stored: str) -> None:
+    json.dumps({"blocks": json.loads(stored), "cached": True, "curriculum_id": "c"})
+
+
+def fast_cached(stored: str) -> None:
+    b"".join([b'{"blocks":', stored.encode("utf-8"), b',"cached":true,"curriculum_id":"c"}'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini teaching output: parse/validate/serialize cost per lesson")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    raw = gemini_lesson_text()
+    stored = previous_path(raw)
+    assert json.loads(stored) == json.loads(fast_path(raw)), "fast path changed the stored blocks"
+
+    rows = [
+        ("generate (validate + store + respond)", timed(lambda: previous_path(raw), args.repeat), timed(lambda: fast_path(raw), args.repeat)),
+        ("cached (load + respond)", timed(lambda: previous_cached(stored), args.repeat), timed(lambda: fast_cached(stored), args.repeat)),
+    ]
+    print(f"lesson: {len(raw):,} bytes of Gemini output, 8 blocks")
+    for name, before, after in rows:
+        print(f"  {name:<40} {before:7.3f} ms -> {after:7.3f} ms ({before / after:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import argparse
+import math
+import os
+import random
+import struct
+import sys
+import time
+from typing import Callable
+
+# Drop-in for the piper binary (PIPER_BINARY_PATH): reads text on stdin,
+# waits FAKE_PIPER_LATENCY and writes a WAV roughly as long as the speech.
+
+RATE = 22050
+
+
+def latency(spec: str) -> Callable[[], float]:
+    # "fixed:MS", "uniform:LO,HI" or "lognormal:MEDIAN_MS,SIGMA"; returns seconds
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(0, sigma) * median / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def wav_for(text: str, length_scale: float) -> bytes:
+    seconds = max(0.3, len(text.split()) * 0.32 * length_scale)
+    samples = int(seconds * RATE)
+    pcm = struct.pack(f"<{samples}h", *(int(3000 * math.sin(i * 0.06)) for i in range(samples)))
+    header = b"RIFF" + struct.pack("<I", 36 + len(pcm)) + b"WAVEfmt " + struct.pack(
+        "<IHHIIHH", 16, 1, 1, RATE, RATE * 2, 2, 16
+    ) + b"data" + struct.pack("<I", len(pcm))
+    return header + pcm
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model")
+    parser.add_argument("--output_file", required=True)
+    parser.add_argument("--length_scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    text = sys.stdin.read()
+    time.sleep(latency(os.getenv("FAKE_PIPER_LATENCY", "lognormal:250,0.3"))())
+    with open(args.output_file, "wb") as f:
+        f.write(wav_for(text, args.length_scale))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks.bench_teaching_parse import gemini_lesson_text
+from benchmarks.fake_piper import latency
+
+# Local stand-ins for the Gemini and Unstructured HTTP APIs, answering with
+# realistic payloads after a configurable delay. Point the app at them with
+# GOOGLE_GEMINI_BASE_URL and UNSTRUCTURED_API_URL (bench_load.py does this).
+
+TOPICS = [
+    ("Limits", "limit approaches value neighbourhood epsilon delta continuity"),
+    ("Derivatives", "slope tangent rate change differentiation power rule"),
+    ("Chain Rule", "composition inner outer function derivative product"),
+    ("Integrals", "area accumulation antiderivative riemann sum bounds"),
+    ("Series", "sequence convergence ratio test geometric terms sum"),
+    ("Vectors", "magnitude direction dot product projection components"),
+    ("Matrices", "rows columns determinant inverse linear transformation"),
+    ("Probability", "events outcomes conditional independence expectation variance"),
+]
+
+
+def document_elements(count: int, seed: str) -> list[dict]:
+    rng = random.Random(seed)
+    elements = []
+    section = 0
+    while len(elements) < count:
+        title, vocabulary = TOPICS[section % len(TOPICS)]
+        words = vocabulary.split()
+        elements.append({"type": "Title", "text": f"{section + 1}. {title} part {section // len(TOPICS) + 1}"})
+        for _ in range(rng.randint(2, 4)):
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(18, 40)))
+            elements.append({"type": "NarrativeText", "text": sentence.capitalize() + "."})
+        section += 1
+    return elements[:count]
+
+
+def gemini_text(body: dict) -> str:
+    config = body.get("generationConfig") or {}
+    if config.get("responseMimeType") == "application/json":
+        return gemini_lesson_text()
+    return "Think of the derivative as the slope of the curve at that exact point. Try a nearby point and shrink the gap."
+
+
+def create_app(gemini_latency: Callable[[], float], create_latency: Callable[[], float],
+               job_latency: Callable[[], float], download_latency: Callable[[], float], elements: int) -> Starlette:
+    jobs: dict[str, dict] = {}
+
+    async def generate_content(request: Request):
+        target = request.path_params["target"]
+        if not target.endswith(":generateContent"):
+            return JSONResponse({"error": {"code": 404, "message": target}}, status_code=404)
+        body = await request.json()
+        await asyncio.sleep(gemini_latency())
+        return JSONResponse({
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": gemini_text(body)}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": 1200, "candidatesTokenCount": 900, "totalTokenCount": 2100},
+            "modelVersion": target.split(":")[0],
+        })
+
+    def job_information(job: dict) -> dict:
+        status = "COMPLETED" if time.monotonic() >= job["ready_at"] else "IN_PROGRESS"
+        return {
+            "id": job["id"],
+            "status": status,
+            "created_at": job["created_at"],
+            "workflow_id": job["id"],
+            "workflow_name": "on-demand",
+            "job_type": "ephemeral",
+            "input_file_ids": job["input_file_ids"],
+        }
+
+    async def create_job(request: Request):
+        form = await request.form()
+        files = [value for _, value in form.multi_items() if hasattr(value, "read")]
+        await asyncio.sleep(create_latency())
+        job_id = str(uuid.uuid4())
+        jobs[job_id] = {
+            "id": job_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "ready_at": time.monotonic() + job_latency(),
+            "input_file_ids": [str(uuid.uuid4()) for _ in files or [None]],
+        }
+        return JSONResponse(job_information(jobs[job_id]))
+
+    async def get_job(request: Request):
+        job = jobs.get(request.path_params["job_id"])
+        if job is None:
+            return JSONResponse({"detail": "Job not found"}, status_code=404)
+        return JSONResponse(job_information(job))
+
+    async def download_job_output(request: Request):
+        await asyncio.sleep(download_latency())
+        file_id = request.query_params.get("file_id", "")
+        return JSONResponse(document_elements(elements, file_id))
+
+    return Starlette(routes=[
+        Route("/v1beta/models/{target:path}", generate_content, methods=["POST"]),
+        Route("/api/v1/jobs/", create_job, methods=["POST"]),
+        Route("/api/v1/jobs/{job_id}", get_job, methods=["GET"]),
+        Route("/api/v1/jobs/{job_id}/download", download_job_output, methods=["GET"]),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini and Unstructured APIs with configurable latency")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--gemini-latency", default="lognormal:2500,0.4")
+    parser.add_argument("--unstructured-create-latency", default="lognormal:400,0.3")
+    parser.add_argument("--unstructured-job-latency", default="lognormal:6000,0.5", help="Time until a job reports COMPLETED")
+    parser.add_argument("--unstructured-download-latency", default="lognormal:300,0.3")
+    parser.add_argument("--elements", type=int, default=150, help="Elements returned per document")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(
+        latency(args.gemini_latency),
+        latency(args.unstructured_create_latency),
+        latency(args.unstructured_job_latency),
+        latency(args.unstructured_download_latency),
+        args.elements,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,25 @@ class Settings(BaseSettings):
     DEBUG: bool = True
     UNSTRUCTURED_API_KEY: str
     GEMINI_API_KEY: Optional[str] = None
+    # 0 keeps NullPool (a fresh connection per session, friendly to external poolers)
+    DB_POOL_SIZE: int = 0
+    WARMUP_CONCURRENCY: int = 4
+    # Write-behind for /api/attempts/score: batch commits instead of one per answer
+    ATTEMPT_WRITE_BEHIND: bool = False
+    ATTEMPT_FLUSH_MS: int = 250
+    ATTEMPT_FLUSH_BATCH: int = 200
+    ATTEMPT_MAX_PENDING: int = 10000
+    # Responses smaller than this go out uncompressed
+    COMPRESSION_MIN_BYTES: int = 1024
+    BROTLI_QUALITY: int = 4
+    # How long shutdown waits for narration and Piper jobs before exiting
+    SHUTDOWN_DRAIN_SECONDS: float = 20.0
+    # Unset disables the /admin endpoints and X-Profile header
+    ADMIN_TOKEN: Optional[str] = None
+    # Fraction of requests profiled at random (0 = only on request)
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL_MS: float = 5.0
+    PROFILE_MAX_STORED: int = 50
 
     class Config:
         env_file = ".env"
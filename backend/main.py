@@ -1,3 +1,4 @@
+import os
 import sys
 import asyncio
 
@@ -16,6 +17,15 @@ from routes.chat import router as chat_router
 from routes.camera import router as camera_router
 from routes.revision import router as revision_router
 from routes.voice import router as voice_router
+from routes.health import router as health_router
+from routes.metrics import router as metrics_router
+from routes.admin import router as admin_router
+from services.warmup import warmup
+from services.attempt_buffer import attempt_buffer
+from services.compression import CompressionMiddleware
+from services.json_response import FastJSONResponse
+from services.metrics import MetricsMiddleware, registry
+from services.profiling import ProfilingMiddleware, profiling
 
 from config import get_settings
 from dotenv import load_dotenv
@@ -23,8 +33,15 @@ load_dotenv()
 
 settings = get_settings()
 
+profiling.admin_token = settings.ADMIN_TOKEN
+profiling.sample_rate = settings.PROFILE_SAMPLE_RATE
+profiling.interval_ms = settings.PROFILE_INTERVAL_MS
+profiling.store.max_entries = settings.PROFILE_MAX_STORED
+if os.getenv("ORBIT_PROFILE_DIR"):
+    profiling.share(os.getenv("ORBIT_PROFILE_DIR"))
 
-app = FastAPI(title="Orbit",debug=settings.DEBUG)
+
+app = FastAPI(title="Orbit",debug=settings.DEBUG,default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +50,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    brotli_quality=settings.BROTLI_QUALITY,
+)
+app.add_middleware(ProfilingMiddleware)
+# Added last so it is outermost and times the whole request
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(parse_router)
 app.include_router(curriculum_router)
@@ -43,6 +68,9 @@ app.include_router(chat_router)
 app.include_router(camera_router)
 app.include_router(revision_router)
 app.include_router(voice_router)
+app.include_router(health_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
 
 
 
@@ -53,11 +81,36 @@ async def startup_event():
     print(f"Current event loop: {loop}")
     
     from services.tts_service import precache_common_phrases
-    try:
-        await precache_common_phrases()
-        print("Voice cache warmed up successfully")
-    except Exception as e:
-        print(f"Failed to warm up voice cache: {e}")
+    from services.manual_parsing import get_nlp
+    from services.db_services.db import warm_up_db
+    
+    warmup.register("voice_cache", precache_common_phrases)
+    warmup.register("spacy", get_nlp)
+    warmup.register("db_pool", warm_up_db)
+    warmup.start(settings.WARMUP_CONCURRENCY)
+    registry.start_sharing()
+
+    if settings.ATTEMPT_WRITE_BEHIND:
+        attempt_buffer.flush_interval = settings.ATTEMPT_FLUSH_MS / 1000
+        attempt_buffer.max_batch = settings.ATTEMPT_FLUSH_BATCH
+        attempt_buffer.max_pending = settings.ATTEMPT_MAX_PENDING
+        attempt_buffer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # In-flight requests have drained by now; let background narration and
+    # Piper jobs finish, then flush buffered attempts before the process exits
+    from services.narration import drain_narration
+    from services.tts_service import tts_service
+
+    abandoned = await drain_narration(settings.SHUTDOWN_DRAIN_SECONDS)
+    abandoned += await tts_service.drain(settings.SHUTDOWN_DRAIN_SECONDS)
+    if abandoned:
+        print(f"[SHUTDOWN] {abandoned} background voice job(s) did not finish in time")
+    tts_service.cache.flush()
+    await attempt_buffer.close()
+    registry.stop_sharing()
 
 @app.get("/")
 def check():
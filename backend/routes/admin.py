@@ -0,0 +1,46 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from services.profiling import is_admin, profiling
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    # 404 rather than 401 so the endpoints don't advertise themselves
+    if not is_admin(x_admin_token, profiling):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)], include_in_schema=False)
+
+@router.get("/profiling")
+async def get_profiling():
+    return profiling.snapshot()
+
+@router.post("/profiling")
+async def set_profiling(
+    sample_rate: Optional[float] = Query(None, ge=0, le=1),
+    interval_ms: Optional[float] = Query(None, ge=1, le=1000)
+):
+    # Runtime toggle; under serve.py the other workers pick it up within a second
+    await asyncio.to_thread(profiling.update, sample_rate, interval_ms)
+    return profiling.snapshot()
+
+@router.get("/profiles")
+async def list_profiles():
+    return {"profiles": await asyncio.to_thread(profiling.store.list)}
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    # Folded stacks: pipe into flamegraph.pl or drop into speedscope.app
+    profile = await asyncio.to_thread(profiling.store.get, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        profile["folded"],
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'}
+    )
+
+@router.delete("/profiles")
+async def clear_profiles():
+    await asyncio.to_thread(profiling.store.clear)
+    return {"status": "success"}
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from pydantic import BaseModel
 from services.db_services.db import get_session
+from services.attempt_buffer import PendingAttempt, attempt_buffer, write_attempts
 import traceback
 
 router = APIRouter(prefix="/api", tags=["Attempts"])
@@ -17,30 +17,19 @@ async def update_subtopic_score(
     data: ScoreUpdate,
     db: Session = Depends(get_session)
 ):
-    try:
-        # 1. Record the attempt history
-        db.execute(
-            text("""
-                INSERT INTO user_attempts (user_id, subtopic_id, score)
-                VALUES (:uid, :sid, :score_float)
-            """),
-            {
-                "uid": data.user_id, 
-                "sid": data.subtopic_id, 
-                "score_float": data.final_score / 100.0
-            }
-        )
+    attempt = PendingAttempt(data.user_id, data.subtopic_id, data.final_score)
 
-        # 2. Update the main subtopic score
-        db.execute(
-            text("""
-                UPDATE subtopics
-                SET score = :score
-                WHERE id = :sid
-            """),
-            {"sid": data.subtopic_id, "score": data.final_score}
-        )
-        
+    # Write-behind mode: queued and committed with the next batch
+    if attempt_buffer.submit(attempt):
+        return {
+            "success": True,
+            "final_score": data.final_score,
+            "buffered": True
+        }
+
+    try:
+        # Record the attempt history, running aggregates and the subtopic score
+        write_attempts(db, [attempt])
         db.commit()
         
         return {
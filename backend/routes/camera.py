@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from services.db_services.db import get_session
+from services.db_services.score_stats import record_engagement
 import traceback
 
 router = APIRouter(prefix="/api", tags=["Camera"])
@@ -20,6 +21,17 @@ class CameraMetrics(BaseModel):
     head_stability: float
     engagement_score: float
 
+CAMERA_METRIC_COLUMNS = [
+    "user_id", "subtopic_id", "session_duration",
+    "focus_score", "confusion_level", "fatigue_score",
+    "engagement", "frustration", "blink_rate",
+    "head_stability", "engagement_score",
+]
+MAX_CAMERA_BATCH = 500
+# A full sample is about 300 bytes; the cap is checked before any parsing
+MAX_CAMERA_BATCH_BYTES = MAX_CAMERA_BATCH * 1024
+camera_batch_adapter = TypeAdapter(list[CameraMetrics])
+
 @router.post("/camera/metrics")
 async def submit_camera_metrics(
     data: CameraMetrics,
@@ -27,40 +39,9 @@ async def submit_camera_metrics(
 ):
 
     try:
-        # Insert metrics
-        db.execute(
-            text("""
-                INSERT INTO camera_metrics (
-                    user_id, subtopic_id, session_duration,
-                    focus_score, confusion_level, fatigue_score,
-                    engagement, frustration, blink_rate,
-                    head_stability, engagement_score
-                ) VALUES (
-                    :user_id, :subtopic_id, :session_duration,
-                    :focus_score, :confusion_level, :fatigue_score,
-                    :engagement, :frustration, :blink_rate,
-                    :head_stability, :engagement_score
-                )
-            """),
-            {
-                "user_id": data.user_id,
-                "subtopic_id": data.subtopic_id,
-                "session_duration": data.session_duration,
-                "focus_score": data.focus_score,
-                "confusion_level": data.confusion_level,
-                "fatigue_score": data.fatigue_score,
-                "engagement": data.engagement,
-                "frustration": data.frustration,
-                "blink_rate": data.blink_rate,
-                "head_stability": data.head_stability,
-                "engagement_score": data.engagement_score
-            }
-        )
+        insert_camera_metrics(db, [data])
         db.commit()
         
-
-        update_subtopic_score_with_camera(db, data.subtopic_id)
-        
         return {
             "success": True,
             "engagement_score": data.engagement_score
@@ -73,61 +54,85 @@ async def submit_camera_metrics(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def update_subtopic_score_with_camera(db: Session, subtopic_id: str):
+def too_many_samples() -> HTTPException:
+    return HTTPException(status_code=400, detail=f"Maximum {MAX_CAMERA_BATCH} samples per batch")
 
 
-    question_result = db.execute(
-        text("""
-            SELECT AVG(score) * 100 as avg_score
-            FROM user_attempts
-            WHERE subtopic_id = :sid
-        """),
-        {"sid": subtopic_id}
-    ).fetchone()
-    
-    question_score = question_result.avg_score if question_result and question_result.avg_score else 0
-    
+async def read_capped_body(request: Request) -> bytes:
+    too_large = HTTPException(status_code=413, detail=f"Batch body over {MAX_CAMERA_BATCH_BYTES} bytes")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_CAMERA_BATCH_BYTES:
+        raise too_large
+    # Chunked uploads carry no length, so the stream is capped as it arrives
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_CAMERA_BATCH_BYTES:
+            raise too_large
+    return bytes(body)
 
-    camera_result = db.execute(
-        text("""
-            SELECT AVG(engagement_score) as avg_engagement
-            FROM camera_metrics
-            WHERE subtopic_id = :sid
-        """),
-        {"sid": subtopic_id}
-    ).fetchone()
-    
-    camera_score = camera_result.avg_engagement if camera_result and camera_result.avg_engagement else 0
-    
-    # Calculate Final Score
-    # If no questions attempted, use 100% camera score
-    # If no camera data, use 100% question score
-    # If both, use weighted average (70% Q, 30% C)
-    
-    if question_result and question_result.avg_score is not None:
-        # Questions exist
-        if camera_result and camera_result.avg_engagement:
-             # Both exist -> Weighted
-             final_score = int((question_score * 0.7) + (camera_score * 0.3))
-        else:
-             # Only questions -> 100% Q
-             final_score = int(question_score)
-    else:
-        # No questions attempted yet
-        if camera_result and camera_result.avg_engagement:
-            # Only camera -> 100% C
-            final_score = int(camera_score)
-        else:
-            # Nothing -> 0
-            final_score = 0
+
+def parse_camera_batch(body: bytes, content_type: str) -> list[CameraMetrics]:
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        lines = [line for line in body.splitlines() if line.strip()]
+        if len(lines) > MAX_CAMERA_BATCH:
+            raise too_many_samples()
+        return [CameraMetrics.model_validate_json(line) for line in lines]
+    return camera_batch_adapter.validate_json(body)
+
+
+def insert_camera_metrics(db: Session, samples: list[CameraMetrics]) -> None:
+    # One multi-row INSERT for the whole batch instead of a statement per sample
+    rows = []
+    params = {}
+    for i, sample in enumerate(samples):
+        rows.append("(" + ", ".join(f":{col}_{i}" for col in CAMERA_METRIC_COLUMNS) + ")")
+        for col in CAMERA_METRIC_COLUMNS:
+            params[f"{col}_{i}"] = getattr(sample, col)
 
     db.execute(
-        text("UPDATE subtopics SET score = :score WHERE id = :sid"),
-        {"score": final_score, "sid": subtopic_id}
+        text(f"""
+            INSERT INTO camera_metrics ({", ".join(CAMERA_METRIC_COLUMNS)})
+            VALUES {", ".join(rows)}
+        """),
+        params
     )
-    db.commit()
-    
-    print(f"[INFO] Updated subtopic {subtopic_id}: Q={question_score:.1f}, C={camera_score:.1f}, Final={final_score}")
+    record_engagement(db, [(s.user_id, s.subtopic_id, s.engagement_score) for s in samples])
+
+
+@router.post("/camera/metrics/batch")
+async def submit_camera_metrics_batch(
+    request: Request,
+    db: Session = Depends(get_session)
+):
+    body = await read_capped_body(request)
+    try:
+        samples = parse_camera_batch(body, request.headers.get("content-type", ""))
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if not samples:
+        return {"success": True, "inserted": 0, "subtopics_updated": 0}
+
+    if len(samples) > MAX_CAMERA_BATCH:
+        raise too_many_samples()
+
+    try:
+        # Learners' scores and progress move with the engagement sums
+        insert_camera_metrics(db, samples)
+        db.commit()
+
+        return {
+            "success": True,
+            "inserted": len(samples),
+            "subtopics_updated": len({sample.subtopic_id for sample in samples})
+        }
+
+    except Exception as e:
+        db.rollback()
+        print(f"[ERROR] Failed to save camera metrics batch: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/camera/stats/{subtopic_id}")
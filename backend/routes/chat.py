@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from services.db_services.db import get_session
-from services.Gemini_Services.key_manager import key_manager
+from services.Gemini_Services.key_manager import generate_content, key_manager
+from services.Gemini_Services.token_budget import fit_content, record_prompt
 from google import genai
 import traceback
 
@@ -18,20 +19,25 @@ async def chat_with_ai(
     db: Session = Depends(get_session)
 ):
     try:
-        def _call_chat(api_key: str):
-            client = genai.Client(api_key=api_key)
-            
-            prompt = f"""You are a helpful teaching assistant. Answer the student's question  and clearly.
+        def _build_prompt(context: str) -> str:
+            return f"""You are a helpful teaching assistant. Answer the student's question  and clearly.
 
 Context from lesson:
-"{data.context}"
+"{context}"
 
 Student's question:
 {data.message}
 
 Provide a short, focused answer (4-5 sentences max). Be encouraging and doubt-oriented."""
+
+        prompt = _build_prompt(fit_content("chat", _build_prompt(""), data.context))
+        record_prompt("chat", prompt)
+
+        def _call_chat(api_key: str):
+            client = genai.Client(api_key=api_key)
             
-            response = client.models.generate_content(
+            response = generate_content(
+                client,
                 model="gemini-2.5-flash-lite",
                 contents=prompt,
                 config={
@@ -1,15 +1,42 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from services.db_services.db import get_session
+from services.db_services.user_stats import remove_curriculum
+from services.db_services.content_versions import (
+    bump_user_curriculums,
+    get_curriculum_version,
+    get_user_curriculums_version,
+)
+from services.response_cache import curriculum_cache, etag_matches, make_etag
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def not_modified(request: Request, response: Response, etag: str) -> bool:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return etag_matches(request.headers.get("if-none-match"), etag)
 
 router = APIRouter(prefix="/api", tags=["Curriculum"])
 
 @router.get("/curriculums")
 async def get_user_curriculums(
+    request: Request,
+    response: Response,
     user_id: str = Query(...),
     db: Session = Depends(get_session)
 ):
+    version = get_user_curriculums_version(db, user_id)
+    etag = make_etag("curriculums", version)
+    if not_modified(request, response, etag):
+        return Response(status_code=304, headers=dict(response.headers))
+
+    cache_key = ("curriculums", user_id)
+    cached = curriculum_cache.get(cache_key, version)
+    if cached is not None:
+        return cached
+
     curriculums = db.execute(
         text("""
             SELECT id, title, created_at, is_pinned, is_archived
@@ -20,7 +47,7 @@ async def get_user_curriculums(
         {"uid": user_id}
     ).fetchall()
     
-    return {
+    result = {
         "curriculums": [
             {
                 "id": str(c.id),
@@ -32,6 +59,8 @@ async def get_user_curriculums(
             for c in curriculums
         ]
     }
+    curriculum_cache.put(cache_key, version, result)
+    return result
 
 @router.post("/curriculum/{curriculum_id}/pin")
 async def pin_curriculum(
@@ -51,6 +80,7 @@ async def pin_curriculum(
         text("UPDATE curriculums SET is_pinned = :status WHERE id = :cid AND user_id = :uid"),
         {"status": new_status, "cid": curriculum_id, "uid": user_id}
     )
+    bump_user_curriculums(db, user_id)
     db.commit()
     return {"status": "success", "is_pinned": new_status}
 
@@ -66,6 +96,7 @@ async def archive_curriculum(
         text("UPDATE curriculums SET is_archived = TRUE WHERE id = :cid AND user_id = :uid"),
         {"cid": curriculum_id, "uid": user_id}
     )
+    bump_user_curriculums(db, user_id)
     db.commit()
     return {"status": "success"}
 
@@ -80,36 +111,40 @@ async def delete_curriculum(
     
     # First delete related records if not cascading (safer)
     # Actually, let's just try deleting the curriculum.
+    remove_curriculum(db, user_id, curriculum_id)
     db.execute(
         text("DELETE FROM curriculums WHERE id = :cid AND user_id = :uid"),
         {"cid": curriculum_id, "uid": user_id}
     )
+    bump_user_curriculums(db, user_id)
     db.commit()
     return {"status": "success"}
 
 @router.get("/curriculum")
 async def get_curriculum(
+    request: Request,
+    response: Response,
     user_id: str = Query(...),
     curriculum_id: str = Query(None),
     db: Session = Depends(get_session)
 ):
-    if curriculum_id:
+    # Resolving the target and its version only touches curriculums and the
+    # viewer's progress row, so a revalidation never reaches modules or subtopics
+    stamp = get_curriculum_version(db, user_id, curriculum_id)
+    if not stamp:
+        if not curriculum_id:
+            return {"modules": []}
         target_id = curriculum_id
     else:
-        latest = db.execute(
-            text("""
-                SELECT id FROM curriculums
-                WHERE user_id = :uid
-                ORDER BY created_at DESC
-                LIMIT 1
-            """),
-            {"uid": user_id}
-        ).fetchone()
-        
-        if not latest:
-            return {"modules": []}
-        
-        target_id = str(latest.id)
+        target_id = str(stamp.id)
+        version = (stamp.version, stamp.progress_version)
+        etag = make_etag("curriculum", target_id, *version)
+        if not_modified(request, response, etag):
+            return Response(status_code=304, headers=dict(response.headers))
+
+        cached = curriculum_cache.get(("curriculum", user_id, target_id), version)
+        if cached is not None:
+            return cached
     
     modules = db.execute(
         text("""
@@ -125,12 +160,14 @@ async def get_curriculum(
     for module in modules:
         subtopics = db.execute(
             text("""
-                SELECT id, title, score, position
-                FROM subtopics
-                WHERE module_id = :mid
-                ORDER BY position
+                SELECT s.id, s.title, COALESCE(p.score, 0) AS score, s.position
+                FROM subtopics s
+                LEFT JOIN user_subtopic_score_stats p
+                    ON p.user_id = :uid AND p.subtopic_id = s.id
+                WHERE s.module_id = :mid
+                ORDER BY s.position
             """),
-            {"mid": str(module.id)}
+            {"mid": str(module.id), "uid": user_id}
         ).fetchall()
         
         result.append({
@@ -147,4 +184,7 @@ async def get_curriculum(
             ]
         })
     
-    return {"modules": result, "curriculum_id": target_id}
+    result = {"modules": result, "curriculum_id": target_id}
+    if stamp:
+        curriculum_cache.put(("curriculum", user_id, target_id), version, result)
+    return result
@@ -0,0 +1,38 @@
+import asyncio
+import os
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from services.warmup import warmup
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+@router.get("/live")
+async def liveness():
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness():
+    # Serving as soon as startup has returned; warm-up keeps running behind it
+    snapshot = warmup.snapshot()
+    status_code = 200 if snapshot["serving"] else 503
+    return JSONResponse(status_code=status_code, content={"status": "serving" if snapshot["serving"] else "starting", **snapshot})
+
+@router.get("/warm")
+async def warm():
+    snapshot = warmup.snapshot()
+    # A failed step never becomes warm, so the instance stays out of rotation
+    status = "warm" if snapshot["warm"] else "failed" if snapshot["failed"] else "warming"
+    return JSONResponse(status_code=200 if snapshot["warm"] else 503, content={"status": status, **snapshot})
+
+@router.get("/status")
+async def status():
+    # Which process answered and what it runs on; see serve.py
+    loop = type(asyncio.get_running_loop())
+    return {
+        "pid": os.getpid(),
+        "worker_id": int(os.getenv("ORBIT_WORKER_ID", "0")),
+        "workers": int(os.getenv("ORBIT_WORKERS", "1")),
+        "loop": f"{loop.__module__}.{loop.__name__}",
+        "http": os.getenv("ORBIT_HTTP", "unknown"),
+    }
@@ -0,0 +1,13 @@
+import asyncio
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+from services.metrics import CONTENT_TYPE, registry
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Under serve.py this reads every worker's snapshot file
+    content = await asyncio.to_thread(registry.render)
+    return Response(content=content, media_type=CONTENT_TYPE)
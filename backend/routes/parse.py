@@ -6,6 +6,7 @@ from services.manual_parsing import create_modules, get_elements
 from services.unstructured_service import parse_files
 from services.db_services.db import get_session
 from services.db_services.push_to_db import upload_to_db, user_exist
+from services.tracing import span, start_trace, summarize
 from sqlalchemy.orm import Session
 
 router = APIRouter(
@@ -21,31 +22,41 @@ async def parse_pdfs1(
     db: Session = Depends(get_session)
 ):
     try:
-        result = await parse_files(files)
-        
-        elements = get_elements(result)
-        modules = create_modules(elements)
-        
-        if not user_id:
-            raise HTTPException(status_code=400, detail="User ID is required")
-        
-        if not user_name:
-            user_name = "User"
-        
-        import re
-        raw_title = files[0].filename.rsplit('.', 1)[0] if files else "Untitled Curriculum"
-        curriculum_title = re.sub(r'[^a-zA-Z0-9\s-]', '', raw_title).strip()
-        if not curriculum_title:
-            curriculum_title = "Untitled Curriculum"
-        
-        user_exist(db, user_id, user_name)
-        curriculum_id = upload_to_db(db, modules, user_id, curriculum_title)
+        with start_trace("parse", files=len(files)) as trace:
+            result = await parse_files(files)
+            
+            with span("get_elements") as stage:
+                elements = get_elements(result)
+                stage.set(elements=len(elements))
+            with span("create_modules"):
+                modules = create_modules(elements)
+            
+            if not user_id:
+                raise HTTPException(status_code=400, detail="User ID is required")
+            
+            if not user_name:
+                user_name = "User"
+            
+            import re
+            raw_title = files[0].filename.rsplit('.', 1)[0] if files else "Untitled Curriculum"
+            curriculum_title = re.sub(r'[^a-zA-Z0-9\s-]', '', raw_title).strip()
+            if not curriculum_title:
+                curriculum_title = "Untitled Curriculum"
+            
+            with span("upload_to_db", modules=len(modules), subtopics=sum(len(m) for m in modules)) as stage:
+                user_exist(db, user_id, user_name)
+                curriculum_id = upload_to_db(db, modules, user_id, curriculum_title)
+                stage.set(content_bytes=sum(len(sub["content"]) for m in modules for sub in m))
+
+        timings = summarize(trace)
+        print(f"[PARSE] {timings['total_ms']}ms: " + ", ".join(f"{s['name']}={s['duration_ms']}ms" for s in timings["spans"][1:]))
 
         return {
             "message": "Parsing completed successfully",
             "job_id": result.get("job_id"),
             "curriculum_id": curriculum_id,
-            "modules_created": len(modules)
+            "modules_created": len(modules),
+            "timings": timings
         }
     except Exception as e:
         traceback.print_exc()
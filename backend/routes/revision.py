@@ -4,6 +4,7 @@ from sqlalchemy import text
 from pydantic import BaseModel
 from typing import List, Optional
 from services.db_services.db import get_session
+from services.db_services.curriculum_progress import get_user_progress
 from services.Gemini_Services.revision_service import generate_revision_content
 import traceback
 
@@ -22,30 +23,12 @@ async def check_revision_milestone(
     curriculum_id: str = Query(...),
     db: Session = Depends(get_session)
 ):
-    total_subtopics = db.execute(
-        text("""
-            SELECT COUNT(*) as total
-            FROM subtopics s
-            JOIN modules m ON s.module_id = m.id
-            WHERE m.curriculum_id = :cid
-        """),
-        {"cid": curriculum_id}
-    ).fetchone()
+    progress_row = get_user_progress(db, user_id, curriculum_id)
     
-    completed_subtopics = db.execute(
-        text("""
-            SELECT COUNT(*) as completed
-            FROM subtopics s
-            JOIN modules m ON s.module_id = m.id
-            WHERE m.curriculum_id = :cid AND s.score > 0
-        """),
-        {"cid": curriculum_id}
-    ).fetchone()
-    
-    if not total_subtopics or total_subtopics.total == 0:
+    if not progress_row or progress_row.total_subtopics == 0:
         return {"progress": 0, "milestone": None, "ready": False}
     
-    progress = (completed_subtopics.completed / total_subtopics.total) * 100
+    progress = (progress_row.completed_subtopics / progress_row.total_subtopics) * 100
     
     milestones = [25, 50, 75, 100]
     triggered_milestone = None
@@ -58,8 +41,8 @@ async def check_revision_milestone(
         "progress": round(progress, 1),
         "milestone": triggered_milestone,
         "ready": triggered_milestone is not None,
-        "total_subtopics": total_subtopics.total,
-        "completed_subtopics": completed_subtopics.completed
+        "total_subtopics": progress_row.total_subtopics,
+        "completed_subtopics": progress_row.completed_subtopics
     }
 
 
@@ -77,23 +60,30 @@ async def generate_revision(
         if not curriculum:
             raise HTTPException(status_code=404, detail="Curriculum not found")
         
-        all_subtopics = db.execute(
+        # Weakest 30% (at least 3) by this learner's own scores, limited and
+        # truncated in the database so only the excerpts the prompt uses cross the wire
+        weak_subtopics = db.execute(
             text("""
-                SELECT s.id, s.title, s.content, s.score, m.title as module_title
+                SELECT s.id, s.title, SUBSTR(s.content, 1, 500) AS content,
+                       COALESCE(p.score, 0) AS score, m.title as module_title
                 FROM subtopics s
                 JOIN modules m ON s.module_id = m.id
+                LEFT JOIN user_subtopic_score_stats p
+                    ON p.user_id = :uid AND p.subtopic_id = s.id
                 WHERE m.curriculum_id = :cid
-                ORDER BY s.score ASC, s.position ASC
+                ORDER BY COALESCE(p.score, 0) ASC, s.position ASC
+                LIMIT (
+                    SELECT CASE WHEN total_subtopics * 3 / 10 > 3 THEN total_subtopics * 3 / 10 ELSE 3 END
+                    FROM curriculums
+                    WHERE id = :cid
+                )
             """),
-            {"cid": request.curriculum_id}
+            {"cid": request.curriculum_id, "uid": request.user_id}
         ).fetchall()
         
-        if not all_subtopics:
+        if not weak_subtopics:
             raise HTTPException(status_code=404, detail="No subtopics found")
         
-        total = len(all_subtopics)
-        weak_count = max(3, int(total * 0.3))
-        
         weak_topics = [
             {
                 "id": str(s.id),
@@ -101,7 +91,7 @@ async def generate_revision(
                 "content": s.content or "",
                 "score": s.score or 0
             }
-            for s in all_subtopics[:weak_count]
+            for s in weak_subtopics
         ]
         
         print(f"[REVISION] Generating for {len(weak_topics)} weak topics at {request.milestone}% milestone")
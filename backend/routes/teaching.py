@@ -1,16 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from services.db_services.db import get_session
 from services.Gemini_Services.gemini_service import generate_teaching_blocks
-import json
+from services.narration import NARRATION_PREGENERATE, pregenerate_narration
+from services.db_services.score_stats import get_user_attempt_average
+from services.json_response import dumps, loads
+from services.metrics import TEACHING_CACHE
 import traceback
 
 router = APIRouter(prefix="/api", tags=["Teaching"])
 
+
+def teaching_response(blocks_json: bytes, cached: bool, curriculum_id) -> Response:
+    # Splices the already-serialized blocks into the response body
+    body = b"".join([
+        b'{"blocks":', blocks_json,
+        b',"cached":', b"true" if cached else b"false",
+        b',"curriculum_id":', dumps(str(curriculum_id) if curriculum_id is not None else None),
+        b"}",
+    ])
+    return Response(content=body, media_type="application/json")
+
+
 @router.get("/teaching/{subtopic_id}")
 async def get_teaching_content(
     subtopic_id: str,
+    background_tasks: BackgroundTasks,
     user_id: str = Query(...),
     db: Session = Depends(get_session)
 ):
@@ -18,7 +35,7 @@ async def get_teaching_content(
         
         subtopic = db.execute(
             text("""
-                SELECT s.title, s.content, s.score, m.curriculum_id 
+                SELECT s.title, s.content, m.curriculum_id 
                 FROM subtopics s
                 JOIN modules m ON s.module_id = m.id
                 WHERE s.id = :sid
@@ -29,38 +46,25 @@ async def get_teaching_content(
         if not subtopic:
             raise HTTPException(status_code=404, detail="Subtopic not found")
 
+        # Read as text so the stored JSON goes straight into the response
+        # instead of being parsed by the driver and encoded again
         cached = db.execute(
-            text("SELECT blocks_json FROM teaching_blocks WHERE subtopic_id = :sid"),
+            text("SELECT CAST(blocks_json AS TEXT) AS blocks_json FROM teaching_blocks WHERE subtopic_id = :sid"),
             {"sid": subtopic_id}
         ).fetchone()
         
+        TEACHING_CACHE.inc(result="hit" if cached else "miss")
         if cached:
-            # PostgreSQL JSONB returns already-parsed data (list/dict), not a JSON string
-            blocks_data = cached.blocks_json if isinstance(cached.blocks_json, list) else json.loads(cached.blocks_json)
-            print(f"[DEBUG] Returning cached blocks: {len(blocks_data)} blocks")
-            return {
-                "blocks": blocks_data,
-                "cached": True,
-                "curriculum_id": subtopic.curriculum_id
-            }
+            print(f"[DEBUG] Returning cached blocks: {len(cached.blocks_json)} bytes")
+            return teaching_response(cached.blocks_json.encode("utf-8"), True, subtopic.curriculum_id)
         
 
         
-        user_score_result = db.execute(
-            text("""
-                SELECT AVG(score) * 100 as avg_score
-                FROM user_attempts
-                WHERE user_id = :uid
-                  AND subtopic_id = :sid
-            """),
-            {"uid": user_id, "sid": subtopic_id}
-        ).fetchone()
-        
-        user_score = int(user_score_result.avg_score) if user_score_result and user_score_result.avg_score else 0
+        user_score = get_user_attempt_average(db, user_id, subtopic_id)
         
         print(f"Generating teaching blocks for subtopic: {subtopic.title}, score: {user_score}")
         
-        gemini_response = generate_teaching_blocks(
+        gemini_response, blocks_json = generate_teaching_blocks(
             lesson_title=subtopic.title,
             subtopic_title=subtopic.title,
             lesson_content=subtopic.content,
@@ -68,9 +72,6 @@ async def get_teaching_content(
         )
         
         print(f"[DEBUG] Gemini response received: {len(gemini_response.blocks)} blocks")
-        blocks_list = [block.model_dump() for block in gemini_response.blocks]
-        print(f"[DEBUG] Blocks list created: {blocks_list[:2]}")  # First 2 blocks
-        blocks_json = json.dumps(blocks_list)
         print(f"[DEBUG] Blocks JSON length: {len(blocks_json)}")
         
         db.execute(
@@ -78,17 +79,16 @@ async def get_teaching_content(
                 INSERT INTO teaching_blocks (subtopic_id, blocks_json)
                 VALUES (:sid, CAST(:blocks AS jsonb))
             """),
-            {"sid": subtopic_id, "blocks": blocks_json}
+            {"sid": subtopic_id, "blocks": blocks_json.decode("utf-8")}
         )
         db.commit()
         print(f"[DEBUG] Saved to database successfully")
         
-        print(f"[DEBUG] Returning {len(blocks_list)} blocks to frontend")
-        return {
-            "blocks": blocks_list,
-            "cached": False,
-            "curriculum_id": subtopic.curriculum_id
-        }
+        if NARRATION_PREGENERATE:
+            background_tasks.add_task(pregenerate_narration, subtopic_id, loads(blocks_json))
+        
+        print(f"[DEBUG] Returning {len(gemini_response.blocks)} blocks to frontend")
+        return teaching_response(blocks_json, False, subtopic.curriculum_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from pydantic import BaseModel
 from services.db_services.db import get_session
-from datetime import datetime, timedelta
+from services.db_services.user_stats import get_user_stats_row, visible_streak
 
 router = APIRouter(prefix="/api", tags=["Users"])
 
@@ -50,75 +50,22 @@ async def get_user_stats(
     db: Session = Depends(get_session)
 ):
     try:
-        # 1. Lessons Completed & Total
-        # Assuming 'completed' means score >= 70 (or just present in user_attempts with high score?) 
-        # Actually checking subtopics.score is better if we update it.
-        # But subtopics table is shared? No, subtopics table has 'score' column which seems shared in this simple design 
-        # (Wait, if multiple users use the app, subtopics.score as a single column is bad design, but per earlier context, 
-        # we moved to user_attempts. But wait, earlier summary said: "subtopics table (Only Place Score is Stored!)" 
-        # -> This implies single user system or flawed design. 
-        # However, the user asked to "make it functional".
-        # Let's count from user_attempts to be multi-user safeish, or strictly checks subtopics if single user.
-        # Given "The user's OS version is windows" and local running, let's assume single user effectively or Check user_attempts.
-        
-        # Let's use user_attempts for completion count.
-        completion_result = db.execute(
-            text("""
-                SELECT COUNT(DISTINCT subtopic_id) as count 
-                FROM user_attempts 
-                WHERE user_id = :uid 
-                AND score >= 0.7  -- Assuming 70% passing
-            """),
-            {"uid": user_id}
-        ).fetchone()
-        completed = completion_result.count if completion_result else 0
-
-        # Total Lessons
-        total_result = db.execute(text("SELECT COUNT(*) as count FROM subtopics")).fetchone()
-        total = total_result.count if total_result else 0
-
-        # Practice Score (Average Accuracy)
-        score_result = db.execute(
-            text("""
-                SELECT AVG(score) as avg_score 
-                FROM user_attempts 
-                WHERE user_id = :uid
-            """),
-            {"uid": user_id}
-        ).fetchone()
-        avg_score = int(score_result.avg_score * 100) if score_result and score_result.avg_score is not None else 0
+        # Rolled up as attempts and uploads land (see user_stats.py), so this
+        # is one primary-key read instead of scans over user_attempts
+        stats = get_user_stats_row(db, user_id)
+        if not stats:
+            return UserStats(
+                streak=0,
+                lessonsCompleted=0,
+                totalLessons=0,
+                practiceScore=0,
+                estimatedTimeLeft="0m"
+            )
 
-        # Streak Calculation (Simple: Consecutive days with activity)
-        # We need created_at in user_attempts. Assuming it exists.
-        streak = 0
-        try:
-            dates_result = db.execute(
-                text("""
-                    SELECT DISTINCT DATE(created_at) as attempt_date 
-                    FROM user_attempts 
-                    WHERE user_id = :uid 
-                    ORDER BY attempt_date DESC
-                """),
-                {"uid": user_id}
-            ).fetchall()
-            
-            if dates_result:
-                today = datetime.now().date()
-                dates = [d.attempt_date for d in dates_result]
-                
-                # Check if active today or yesterday to start streak
-                if dates[0] == today or dates[0] == today - timedelta(days=1):
-                    streak = 1
-                    current_check = dates[0]
-                    for i in range(1, len(dates)):
-                        if dates[i] == current_check - timedelta(days=1):
-                            streak += 1
-                            current_check = dates[i]
-                        else:
-                            break
-        except Exception as e:
-            print(f"Streak calc failed (maybe no created_at?): {e}")
-            streak = 0 # Fallback
+        completed = stats.completed_count
+        total = stats.total_lessons
+        avg_score = int((stats.attempt_sum / stats.attempt_count) * 100) if stats.attempt_count else 0
+        streak = visible_streak(stats.current_streak, stats.last_activity_date)
 
         # Estimated Time Left
         # Assume 15 min per uncompleted lesson
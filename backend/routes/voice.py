@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Query, HTTPException
-from fastapi.responses import Response
+from fastapi import APIRouter, Query, HTTPException, Header, Depends
+from fastapi.responses import Response, JSONResponse
+from sqlalchemy.orm import Session
+from sqlalchemy import text
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Literal
+import json
+import re
+import struct
+from services.db_services.db import get_session
 from services.tts_service import tts_service, precache_common_phrases
+from services.narration import get_narration_manifest, schedule_narration
+from services.audio_encoding import AUDIO_FORMATS, negotiate_format, detect_format
 
 router = APIRouter(prefix="/api/voice", tags=["voice"])
 
@@ -14,32 +22,52 @@ class BatchSynthesizeRequest(BaseModel):
     texts: list[str]
     rate: Optional[float] = 1.0
 
+AUDIO_FORMAT_QUERY = Query(None, description="Audio encoding: wav, opus or flac (defaults to the Accept header, then wav)")
+
+def resolve_audio_format(audio_format: Optional[str], accept: Optional[str] = None) -> str:
+    try:
+        return negotiate_format(audio_format, accept)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def audio_response(audio_data: bytes) -> Response:
+    fmt = AUDIO_FORMATS[detect_format(audio_data)]
+    return Response(
+        content=audio_data,
+        media_type=fmt["media_type"],
+        headers={
+            "Content-Disposition": f'inline; filename="speech.{fmt["ext"]}"',
+            "Cache-Control": "public, max-age=86400",
+            "Vary": "Accept"
+        }
+    )
+
 @router.post("/synthesize")
-async def synthesize_speech(request: SynthesizeRequest):
+async def synthesize_speech(
+    request: SynthesizeRequest,
+    audio_format: Optional[str] = AUDIO_FORMAT_QUERY,
+    accept: Optional[str] = Header(None)
+):
     if not request.text or not request.text.strip():
         raise HTTPException(status_code=400, detail="Text is required")
     
     if len(request.text) > 5000:
         raise HTTPException(status_code=400, detail="Text too long (max 5000 characters)")
     
-    audio_data = await tts_service.synthesize(request.text, request.rate or 1.0)
+    fmt = resolve_audio_format(audio_format, accept)
+    audio_data = await tts_service.synthesize(request.text, request.rate or 1.0, fmt)
     
     if not audio_data:
         raise HTTPException(status_code=500, detail="Failed to synthesize speech")
     
-    return Response(
-        content=audio_data,
-        media_type="audio/wav",
-        headers={
-            "Content-Disposition": 'inline; filename="speech.wav"',
-            "Cache-Control": "public, max-age=86400"
-        }
-    )
+    return audio_response(audio_data)
 
 @router.get("/synthesize")
 async def synthesize_speech_get(
     text: str = Query(..., description="Text to synthesize"),
-    rate: float = Query(1.0, description="Speech rate (0.5-2.0)")
+    rate: float = Query(1.0, description="Speech rate (0.5-2.0)"),
+    audio_format: Optional[str] = AUDIO_FORMAT_QUERY,
+    accept: Optional[str] = Header(None)
 ):
     if not text or not text.strip():
         raise HTTPException(status_code=400, detail="Text is required")
@@ -49,29 +77,55 @@ async def synthesize_speech_get(
     
     rate = max(0.5, min(2.0, rate))
     
-    audio_data = await tts_service.synthesize(text, rate)
+    fmt = resolve_audio_format(audio_format, accept)
+    audio_data = await tts_service.synthesize(text, rate, fmt)
     
     if not audio_data:
         raise HTTPException(status_code=500, detail="Failed to synthesize speech")
     
-    return Response(
-        content=audio_data,
-        media_type="audio/wav",
-        headers={
-            "Content-Disposition": 'inline; filename="speech.wav"',
-            "Cache-Control": "public, max-age=86400"
-        }
-    )
+    return audio_response(audio_data)
+
+BINARY_BATCH_MEDIA_TYPE = "application/octet-stream"
+
+def pack_audio_batch(audio_results: list[bytes]) -> bytes:
+    # Each entry is a 4-byte big-endian length followed by the audio bytes;
+    # a zero length marks a text that failed to synthesize
+    parts = []
+    for audio in audio_results:
+        parts.append(struct.pack(">I", len(audio or b"")))
+        if audio:
+            parts.append(audio)
+    return b"".join(parts)
 
 @router.post("/batch")
-async def batch_synthesize(request: BatchSynthesizeRequest):
+async def batch_synthesize(
+    request: BatchSynthesizeRequest,
+    format: Optional[Literal["json", "binary"]] = Query(None, description="Response encoding: base64 JSON or length-prefixed binary"),
+    audio_format: Optional[str] = AUDIO_FORMAT_QUERY,
+    accept: Optional[str] = Header(None)
+):
     if not request.texts:
         raise HTTPException(status_code=400, detail="Texts array is required")
     
     if len(request.texts) > 20:
         raise HTTPException(status_code=400, detail="Maximum 20 texts per batch")
     
-    audio_results = await tts_service.synthesize_batch(request.texts, request.rate or 1.0)
+    fmt = resolve_audio_format(audio_format, accept)
+    audio_results = await tts_service.synthesize_batch(request.texts, request.rate or 1.0, fmt)
+    formats = [detect_format(audio) if audio else None for audio in audio_results]
+    
+    if format is None:
+        format = "binary" if accept and BINARY_BATCH_MEDIA_TYPE in accept else "json"
+    
+    if format == "binary":
+        return Response(
+            content=pack_audio_batch(audio_results),
+            media_type=BINARY_BATCH_MEDIA_TYPE,
+            headers={
+                "X-Audio-Count": str(len(audio_results)),
+                "X-Audio-Formats": ",".join(f or "" for f in formats)
+            }
+        )
     
     import base64
     encoded_results = []
@@ -81,7 +135,51 @@ async def batch_synthesize(request: BatchSynthesizeRequest):
         else:
             encoded_results.append(None)
     
-    return {"audio": encoded_results}
+    return {"audio": encoded_results, "formats": formats}
+
+AUDIO_KEY_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+@router.get("/audio/{key}")
+async def get_audio_by_key(
+    key: str,
+    audio_format: Optional[str] = AUDIO_FORMAT_QUERY,
+    accept: Optional[str] = Header(None)
+):
+    if not AUDIO_KEY_PATTERN.match(key):
+        raise HTTPException(status_code=400, detail="Invalid audio key")
+    
+    fmt = resolve_audio_format(audio_format, accept)
+    audio_data = await tts_service.get_audio(key, fmt)
+    
+    if not audio_data:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    
+    response = audio_response(audio_data)
+    # Keys are content-addressed, so the bytes behind one never change
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+@router.get("/lesson/{subtopic_id}")
+async def get_lesson_narration(
+    subtopic_id: str,
+    db: Session = Depends(get_session)
+):
+    manifest = get_narration_manifest(subtopic_id)
+    if manifest:
+        return {"status": "ready", **manifest}
+    
+    cached = db.execute(
+        text("SELECT blocks_json FROM teaching_blocks WHERE subtopic_id = :sid"),
+        {"sid": subtopic_id}
+    ).fetchone()
+    
+    if not cached:
+        raise HTTPException(status_code=404, detail="Lesson has not been generated yet")
+    
+    blocks_data = cached.blocks_json if isinstance(cached.blocks_json, list) else json.loads(cached.blocks_json)
+    schedule_narration(subtopic_id, blocks_data)
+    
+    return JSONResponse(status_code=202, content={"status": "pending", "subtopic_id": subtopic_id})
 
 @router.post("/precache")
 async def precache_phrases():
@@ -90,12 +188,9 @@ async def precache_phrases():
 
 @router.get("/cache/stats")
 async def get_cache_stats():
-    file_count, total_size = tts_service.get_cache_size()
-    return {
-        "cached_files": file_count,
-        "total_size_bytes": total_size,
-        "total_size_mb": round(total_size / (1024 * 1024), 2)
-    }
+    stats = tts_service.cache.stats()
+    stats["total_size_mb"] = round(stats["total_size_bytes"] / (1024 * 1024), 2)
+    return stats
 
 @router.delete("/cache")
 async def clear_cache():
@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.db_services.db import SessionLocal
+from services.db_services.score_stats import create_score_stats_tables, backfill_score_stats
+
+
+def main():
+    print("Rebuilding score aggregates from user_attempts and camera_metrics...")
+    db = SessionLocal()
+    try:
+        create_score_stats_tables(db)
+        subtopics, user_rows = backfill_score_stats(db)
+        db.commit()
+        print(f"Backfill complete: {subtopics} subtopics, {user_rows} user/subtopic rows")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
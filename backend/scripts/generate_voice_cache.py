@@ -1,13 +1,23 @@
 import os
 import sys
+import asyncio
 import hashlib
-import subprocess
 from pathlib import Path
 
 BACKEND_DIR = Path(__file__).parent.parent
-PIPER_BINARY = BACKEND_DIR / "piper" / "piper.exe"
-PIPER_MODEL = BACKEND_DIR / "piper_models" / "en_US-amy-medium.onnx"
-OUTPUT_DIR = BACKEND_DIR.parent / "frontend" / "public" / "voice_cache"
+PIPER_BINARY = Path(os.getenv("PIPER_BINARY_PATH", str(BACKEND_DIR / "piper" / "piper.exe")))
+PIPER_MODEL = Path(os.getenv("PIPER_MODEL_PATH", str(BACKEND_DIR / "piper_models" / "en_US-amy-medium.onnx")))
+
+# The runtime service reads these at import time; point it at the same Piper
+# install so both write the same keys into the same phrase store
+os.environ["PIPER_BINARY_PATH"] = str(PIPER_BINARY)
+os.environ["PIPER_MODEL_PATH"] = str(PIPER_MODEL)
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.phrase_store import STATIC_VOICE_CACHE_DIR, export_manifest, normalize_phrase, phrase_key
+from services.tts_service import TTSService, COMMON_PHRASES
+
+OUTPUT_DIR = STATIC_VOICE_CACHE_DIR
 
 PHRASES = [
     "Visual impairment mode on. Hold Control to speak commands. Say help for available commands.",
@@ -52,74 +62,20 @@ PHRASES = [
 ]
 
 
-def get_cache_filename(text: str) -> str:
+def legacy_cache_filename(text: str) -> str:
+    # Naming used before the shared phrase store; only read to adopt old files
     return hashlib.md5(text.lower().strip().encode()).hexdigest() + ".wav"
 
 
-def generate_voice(text: str, output_path: Path) -> bool:
-    if output_path.exists():
-        print(f"  [SKIP] Already exists: {text[:50]}...")
-        return True
-    
-    try:
-        cmd = [
-            str(PIPER_BINARY),
-            "--model", str(PIPER_MODEL),
-            "--output_file", str(output_path),
-        ]
-        
-        process = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            cwd=str(PIPER_BINARY.parent)
-        )
-        
-        stdout, stderr = process.communicate(input=text.encode("utf-8"), timeout=30)
-        
-        if process.returncode != 0:
-            print(f"  [ERROR] Failed: {text[:50]}... - {stderr.decode()}")
-            return False
-        
-        if output_path.exists() and output_path.stat().st_size > 100:
-            print(f"  [OK] Generated: {text[:50]}...")
-            return True
-        else:
-            print(f"  [ERROR] Empty file: {text[:50]}...")
-            return False
-            
-    except subprocess.TimeoutExpired:
-        print(f"  [ERROR] Timeout: {text[:50]}...")
-        process.kill()
-        return False
-    except Exception as e:
-        print(f"  [ERROR] Exception: {text[:50]}... - {e}")
-        return False
-
-
-def generate_manifest(phrases: list, output_dir: Path) -> None:
-    manifest = {}
+def unique_phrases(phrases: list) -> list:
+    seen = set()
+    result = []
     for phrase in phrases:
-        key = phrase.lower().strip()
-        filename = get_cache_filename(phrase)
-        if (output_dir / filename).exists():
-            manifest[key] = filename
-    
-    manifest_path = output_dir / "manifest.json"
-    import json
-    with open(manifest_path, "w") as f:
-        json.dump(manifest, f, indent=2)
-    print(f"\nManifest saved to: {manifest_path}")
-
-
-def clean_old_files(output_dir: Path, valid_files: set) -> int:
-    removed = 0
-    for f in output_dir.glob("*.wav"):
-        if f.name not in valid_files:
-            f.unlink()
-            removed += 1
-    return removed
+        normalized = normalize_phrase(phrase)
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            result.append(phrase)
+    return result
 
 
 def main():
@@ -127,45 +83,56 @@ def main():
     print("Piper Voice Cache Generator (Essential Phrases)")
     print("=" * 60)
     
-    if not PIPER_BINARY.exists():
-        print(f"ERROR: Piper binary not found at {PIPER_BINARY}")
-        print("Run: python scripts/setup_piper.py first")
-        sys.exit(1)
-    
-    if not PIPER_MODEL.exists():
-        print(f"ERROR: Piper model not found at {PIPER_MODEL}")
-        print("Run: python scripts/setup_piper.py first")
-        sys.exit(1)
+    phrases = unique_phrases(PHRASES + COMMON_PHRASES)
+    service = TTSService(static_dir=OUTPUT_DIR)
     
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    print(f"\nOutput directory: {OUTPUT_DIR}")
-    print(f"Total phrases to generate: {len(PHRASES)}")
+    print(f"\nPhrase store: {service.cache.cache_dir}")
+    print(f"Output directory: {OUTPUT_DIR}")
+    print(f"Voice: {service.voice}")
+    print(f"Total phrases: {len(phrases)}")
     print()
     
-    valid_files = set()
-    success_count = 0
-    fail_count = 0
-    
-    for i, phrase in enumerate(PHRASES, 1):
-        filename = get_cache_filename(phrase)
-        valid_files.add(filename)
-        output_path = OUTPUT_DIR / filename
-        print(f"[{i}/{len(PHRASES)}]", end="")
+    pending = []
+    adopted = 0
+    for phrase in phrases:
+        key = phrase_key(phrase, service.voice)
+        if service._get_cached_audio(key):
+            print(f"  [SKIP] Already in store: {phrase[:50]}...")
+            continue
+        
+        legacy_path = OUTPUT_DIR / legacy_cache_filename(phrase)
+        if legacy_path.exists() and legacy_path.stat().st_size > 100:
+            service.cache.put(key, legacy_path.read_bytes())
+            adopted += 1
+            print(f"  [ADOPT] {phrase[:50]}...")
+            continue
         
-        if generate_voice(phrase, output_path):
-            success_count += 1
-        else:
-            fail_count += 1
+        pending.append(phrase)
     
-    removed = clean_old_files(OUTPUT_DIR, valid_files)
-    if removed > 0:
-        print(f"\nCleaned up {removed} old files")
+    success_count = 0
+    fail_count = 0
+    if pending and not (PIPER_BINARY.exists() and PIPER_MODEL.exists()):
+        print(f"\nWARNING: Piper not found at {PIPER_BINARY} / {PIPER_MODEL}")
+        print("Run: python scripts/setup_piper.py first")
+        print(f"Skipping {len(pending)} phrases that are not in the store yet")
+        fail_count = len(pending)
+    elif pending:
+        print(f"\nSynthesizing {len(pending)} phrases...")
+        results = asyncio.run(service.synthesize_batch(pending))
+        for phrase, audio in zip(pending, results):
+            if audio and len(audio) > 100:
+                print(f"  [OK] Generated: {phrase[:50]}...")
+                success_count += 1
+            else:
+                print(f"  [ERROR] Failed: {phrase[:50]}...")
+                fail_count += 1
     
-    generate_manifest(PHRASES, OUTPUT_DIR)
+    manifest = export_manifest(service.cache, phrases, service.voice, OUTPUT_DIR)
+    print(f"\nManifest saved to: {OUTPUT_DIR / 'manifest.json'} ({len(manifest)} phrases)")
     
     print()
     print("=" * 60)
-    print(f"Complete! Success: {success_count}, Failed: {fail_count}")
+    print(f"Complete! Generated: {success_count}, Adopted: {adopted}, Failed: {fail_count}")
     print("=" * 60)
 
 
@@ -0,0 +1,30 @@
+import sys
+import argparse
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.db_services.db import engine
+from services.db_services.migrations import MIGRATIONS, applied_versions, run_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--list", action="store_true", help="Show migrations and whether they are applied")
+    parser.add_argument("--target", type=int, default=None, help="Stop after this version")
+    args = parser.parse_args()
+
+    if args.list:
+        done = applied_versions(engine)
+        for migration in MIGRATIONS:
+            status = "applied" if migration.version in done else "pending"
+            print(f"{migration.version:04d}_{migration.name}: {status}")
+        return
+
+    applied = run_migrations(engine, target=args.target)
+    print(f"[MIGRATE] {len(applied)} migration(s) applied")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import argparse
+import importlib.util
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from collections import deque
+
+import uvicorn
+
+# Production entry point: binds the socket and imports the app once, then forks
+# worker processes that share both (heavy modules and the spaCy model stay
+# copy-on-write). run_server.py remains the single-process Windows launcher.
+
+
+def default_workers() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, cpus)
+
+
+def pick_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def pick_http() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def preload(preload_models: bool):
+    import main
+
+    if preload_models:
+        from services.manual_parsing import get_nlp
+        get_nlp()
+    return main.app
+
+
+def runtime_dir() -> tuple[str, bool]:
+    # State the workers share for one run: metric snapshots (services/metrics.py)
+    # and stored profiles plus the profiling toggle (services/profiling.py).
+    # Leftovers from an earlier run would be counted or applied again, so they
+    # are cleared.
+    root = os.getenv("ORBIT_RUNTIME_DIR")
+    created = not root
+    if created:
+        root = tempfile.mkdtemp(prefix="orbit-")
+    for name, env in (("metrics", "ORBIT_METRICS_DIR"), ("profiles", "ORBIT_PROFILE_DIR")):
+        path = os.path.join(root, name)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        os.environ[env] = path
+    return root, created
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+# Exit code of a worker whose app startup failed (uvicorn logs it and returns)
+STARTUP_FAILED = 3
+
+
+# Restarts workers that exit, with exponential backoff per worker slot: a
+# worker that dies within stable_after seconds of starting waits twice as long
+# as the last one in its slot, up to max_backoff. More than max_crashes exits
+# within crash_window (bad env, database down at startup) stops everything
+# with a non-zero exit, so the orchestrator sees the failure.
+class Supervisor:
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        sock: socket.socket,
+        workers: int,
+        stop_timeout: float,
+        restart_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        stable_after: float = 30.0,
+        max_crashes: int = 10,
+        crash_window: float = 60.0,
+    ):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.stop_timeout = stop_timeout
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.max_crashes = max_crashes
+        self.crash_window = crash_window
+        self.children: dict[int, int] = {}
+        self.started_at: dict[int, float] = {}
+        self.failures: dict[int, int] = {}
+        self.pending: dict[int, float] = {}
+        self.crashes: deque[float] = deque()
+        self.stopping = False
+        self.exit_code = 0
+
+    def spawn(self, worker_id: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = worker_id
+            self.started_at[worker_id] = time.monotonic()
+            return
+
+        # Worker: uvicorn installs its own SIGTERM/SIGINT handlers, which stop
+        # accepting, wait for in-flight requests, then run app shutdown hooks
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        os.environ["ORBIT_WORKER_ID"] = str(worker_id)
+        code = 1
+        try:
+            code = self.serve()
+        finally:
+            os._exit(code)
+
+    def serve(self) -> int:
+        # Connections opened while preloading belong to the master; the TTS
+        # cache index reopens itself per process on first use
+        from services.db_services.db import engine
+        engine.dispose(close=False)
+        server = uvicorn.Server(self.config)
+        server.run(sockets=[self.sock])
+        return 0 if server.started else STARTUP_FAILED
+
+    def stop(self, signum, frame) -> None:
+        if self.stopping:
+            return
+        print(f"[SERVE] Signal {signum}: draining {len(self.children)} worker(s)")
+        self.drain()
+
+    def drain(self) -> None:
+        self.stopping = True
+        self.pending.clear()
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def exited(self, pid: int, worker_id: int, status: int) -> None:
+        now = time.monotonic()
+        code = os.waitstatus_to_exitcode(status)
+        uptime = now - self.started_at.pop(worker_id, now)
+
+        self.crashes.append(now)
+        while self.crashes and now - self.crashes[0] > self.crash_window:
+            self.crashes.popleft()
+        if len(self.crashes) > self.max_crashes:
+            print(f"[SERVE] {len(self.crashes)} worker exits in {self.crash_window:.0f}s, giving up")
+            self.exit_code = 1
+            self.drain()
+            return
+
+        failures = 1 if uptime >= self.stable_after else self.failures.get(worker_id, 0) + 1
+        self.failures[worker_id] = failures
+        delay = min(self.max_backoff, self.restart_backoff * 2 ** (failures - 1))
+        self.pending[worker_id] = now + delay
+        print(f"[SERVE] Worker {worker_id} (pid {pid}) exited with {code} after {uptime:.1f}s, restarting in {delay:.1f}s")
+
+    def respawn_due(self) -> None:
+        now = time.monotonic()
+        for worker_id, due in list(self.pending.items()):
+            if due <= now:
+                del self.pending[worker_id]
+                self.spawn(worker_id)
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for worker_id in range(self.workers):
+            self.spawn(worker_id)
+        print(f"[SERVE] {self.workers} worker(s) on {self.config.loop}/{self.config.http}, master pid {os.getpid()}")
+
+        deadline = None
+        while self.children or self.pending:
+            if self.stopping and deadline is None:
+                deadline = time.monotonic() + self.stop_timeout
+            self.respawn_due()
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                # Every slot is waiting out its backoff
+                pid = 0
+            if pid == 0:
+                if deadline is not None and time.monotonic() > deadline:
+                    for child in list(self.children):
+                        print(f"[SERVE] Worker {child} did not drain in time, killing")
+                        os.kill(child, signal.SIGKILL)
+                    deadline = float("inf")
+                time.sleep(0.2)
+                continue
+
+            worker_id = self.children.pop(pid)
+            if not self.stopping:
+                self.exited(pid, worker_id, status)
+        return self.exit_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Orbit with multiple worker processes")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")) or default_workers())
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.getenv("GRACEFUL_TIMEOUT", "60")),
+                        help="Seconds a worker waits for in-flight requests on SIGTERM")
+    parser.add_argument("--max-crashes", type=int, default=int(os.getenv("MAX_WORKER_CRASHES", "10")),
+                        help="Worker exits within a minute before the supervisor gives up")
+    parser.add_argument("--no-preload-models", action="store_true", help="Skip loading spaCy before forking")
+    args = parser.parse_args()
+
+    loop, http = pick_loop(), pick_http()
+    os.environ["ORBIT_WORKERS"] = str(args.workers)
+    os.environ["ORBIT_HTTP"] = http
+
+    if not hasattr(os, "fork"):
+        # Windows: no fork, so one process with the Proactor loop Piper needs
+        print("[SERVE] fork() unavailable, running a single worker")
+        os.environ["ORBIT_WORKERS"] = "1"
+        uvicorn.run("main:app", host=args.host, port=args.port, loop="asyncio", http=http)
+        return
+
+    runtime, created = runtime_dir()
+    sock = bind(args.host, args.port)
+    app = preload(not args.no_preload_models)
+    config = uvicorn.Config(
+        app,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+    )
+    drain = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+    supervisor = Supervisor(
+        config, sock, args.workers,
+        stop_timeout=args.graceful_timeout + drain + 10,
+        max_crashes=args.max_crashes,
+    )
+    code = supervisor.run()
+    if created:
+        shutil.rmtree(runtime, ignore_errors=True)
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,64 +11,24 @@ from pathlib import Path
 
 
 from services.Gemini_Services.teaching_prompt import teachingPrompt
-from services.Gemini_Services.key_manager import key_manager
-from services.db_services.db import get_session
-
-GENERATED_DIR = Path(os.environ.get("GENERATED_DIR", "/tmp/generated"))
-GENERATED_DIR.mkdir(parents=True, exist_ok=True)
-
-class Paragraph(BaseModel):
-    type: Literal["paragraph"]
-    content: str
-
-class Formula(BaseModel):
-    type: Literal["formula"]
-    formula: str
-    explanation: str
-
-class Insight(BaseModel):
-    type: Literal["insight"]
-    content: str
-
-class ListBlock(BaseModel):
-    type: Literal["list"]
-    items: List[str]
-
-class Simulation(BaseModel):
-    type: Literal["simulation"]
-    html: str
-    description: str
-
-
-
-class QuestionExplanations(BaseModel):
-    correct: str
-    incorrect: Optional[List[str]] = None
-
-class Question(BaseModel):
-    type: Literal["question"]
-    questionType: Literal["mcq", "fill_in_blank"]
-    question: str
-    options: Optional[List[str]] = None
-    correctIndex: Optional[int] = None
-    correctAnswer: Optional[str] = None
-    acceptedAnswers: Optional[List[str]] = None
-    explanations: QuestionExplanations
-    hint: str
-
-TeachingBlock = Union[
+from services.Gemini_Services.teaching_models import (
     Paragraph,
     Formula,
     Insight,
     ListBlock,
     Simulation,
+    QuestionExplanations,
     Question,
-]
-
-class TeachingResponse(BaseModel):
-    blocks: List[TeachingBlock]
-
+    TeachingBlock,
+    TeachingResponse,
+    parse_teaching_response,
+)
+from services.Gemini_Services.key_manager import generate_content, key_manager
+from services.Gemini_Services.token_budget import fit_content, record_prompt
+from services.db_services.db import get_session
 
+GENERATED_DIR = Path(os.environ.get("GENERATED_DIR", "/tmp/generated"))
+GENERATED_DIR.mkdir(parents=True, exist_ok=True)
 
 def generate_teaching_blocks(
         lesson_title: str,
@@ -76,10 +36,11 @@ def generate_teaching_blocks(
         lesson_content: str,
         learner_score: int,
         nearby_context: str = "",
-) -> TeachingResponse:
+) -> tuple[TeachingResponse, bytes]:
     print(f"Generating blocks for: {subtopic_title}, score: {learner_score}")
     
-    prompt = f"""
+    def _build_prompt(content: str) -> str:
+        return f"""
 {teachingPrompt}
 
 LESSON: {lesson_title}
@@ -90,10 +51,13 @@ CONTEXT (from nearby subtopics):
 {nearby_context[:500] if nearby_context else "None"}
 
 CONTENT TO TEACH:
-{lesson_content}
+{content}
 
 Generate structured teaching blocks as JSON array.
 """
+
+    prompt = _build_prompt(fit_content("teaching", _build_prompt(""), lesson_content))
+    record_prompt("teaching", prompt)
     
     def _call_content(api_key: str):
         client = genai.Client(api_key=api_key)
@@ -113,7 +77,8 @@ Generate structured teaching blocks as JSON array.
         try:
             
             print(f"[DEBUG] Attempting generation with gemini-3-flash-preview...")
-            response = client.models.generate_content(
+            response = generate_content(
+                client,
                 model="gemini-3-flash-preview",
                 contents=prompt,
                 config=config
@@ -127,7 +92,8 @@ Generate structured teaching blocks as JSON array.
             print(f"[DEBUG] Falling back to gemini-2.5-flash...")
             
             # Fallback to Gemini 2.5 Flash
-            response = client.models.generate_content(
+            response = generate_content(
+                client,
                 model="gemini-2.5-flash",
                 contents=prompt,
                 config=config
@@ -139,17 +105,8 @@ Generate structured teaching blocks as JSON array.
     try:
         raw_response = key_manager.execute_with_retry(_call_content)
         
-        parsed = json.loads(raw_response)
-        result = TeachingResponse(**parsed)
-        
-        for i, block in enumerate(result.blocks):
-            if isinstance(block, Simulation):
-                html = block.html.strip()
-                if html.endswith("```"):
-                    html = html[:-3]
-                block.html = html.strip()
-
-        return result
+        result, blocks_json = parse_teaching_response(raw_response)
+        return result, blocks_json
         
     except Exception as e:
         print(f"Generation failed: {str(e)}")
@@ -2,6 +2,8 @@ import os
 from typing import List
 from dotenv import load_dotenv
 
+from services.metrics import GEMINI_KEY_EXHAUSTED, GEMINI_KEY_REQUESTS, GEMINI_LATENCY, key_label
+
 load_dotenv()
 
 
@@ -48,17 +50,33 @@ class GeminiKeyManager:
         for _ in range(len(self.keys)):
             key = self.get_next_key()
             
+            label = key_label(key)
             try:
-                return func(key, *args, **kwargs)
+                result = func(key, *args, **kwargs)
+                GEMINI_KEY_REQUESTS.inc(key=label, outcome="ok")
+                GEMINI_KEY_EXHAUSTED.set(0, key=label)
+                return result
             except Exception as e:
                 error_str = str(e)
                 if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
+                    GEMINI_KEY_REQUESTS.inc(key=label, outcome="quota")
+                    GEMINI_KEY_EXHAUSTED.set(1, key=label)
                     print(f"[WARNING] Quota exhausted for key ending in ...{key[-4:]}, trying next key")
                     last_error = e
                     continue
                 else:
+                    GEMINI_KEY_REQUESTS.inc(key=label, outcome="error")
                     raise e
         
         raise Exception(f"All API keys exhausted. Last error: {str(last_error)}")
 
+def generate_content(client, model: str, **kwargs):
+    # client.models.generate_content, timed per model
+    with GEMINI_LATENCY.time(model=model, outcome="ok") as labels:
+        try:
+            return client.models.generate_content(model=model, **kwargs)
+        except Exception:
+            labels["outcome"] = "error"
+            raise
+
 key_manager = GeminiKeyManager()
@@ -4,7 +4,9 @@ from typing import List, Optional, Literal
 import json
 import traceback
 
-from services.Gemini_Services.key_manager import key_manager
+from services.Gemini_Services.key_manager import generate_content, key_manager
+from services.Gemini_Services.token_budget import INPUT_BUDGETS, estimate_tokens, record_prompt
+from services.metrics import GEMINI_PROMPT_TRIMMED
 
 
 class RevisionQuestion(BaseModel):
@@ -44,12 +46,13 @@ def generate_revision_content(
     question_count = 15 if is_final_test else 8
     revision_type = "Final Comprehensive Test" if is_final_test else f"{milestone}% Progress Revision"
     
-    topics_formatted = "\n".join([
+    topic_lines = [
         f"- {t['title']} (Score: {t['score']}%): {t['content'][:500]}..."
         for t in weak_topics
-    ])
-    
-    prompt = f"""You are creating a {revision_type} for a student learning {curriculum_title}.
+    ]
+
+    def _build_prompt(topics_formatted: str) -> str:
+        return f"""You are creating a {revision_type} for a student learning {curriculum_title}.
 
 The student is struggling with these topics (sorted by lowest score):
 {topics_formatted}
@@ -73,6 +76,19 @@ Generate revision content with:
 Return as JSON with 'notes' and 'questions' arrays.
 """
 
+    # Topics come weakest first, so over budget the strongest ones are dropped
+    available = INPUT_BUDGETS["revision"] - estimate_tokens(_build_prompt(""))
+    kept, used = [], 0
+    for line in topic_lines:
+        used += estimate_tokens(line) + 1
+        if kept and used > available:
+            GEMINI_PROMPT_TRIMMED.inc(endpoint="revision")
+            print(f"[REVISION] Prompt over budget, keeping {len(kept)} of {len(topic_lines)} topics")
+            break
+        kept.append(line)
+    prompt = _build_prompt("\n".join(kept))
+    record_prompt("revision", prompt)
+
     def _call_gemini(api_key: str):
         client = genai.Client(api_key=api_key)
         
@@ -90,7 +106,8 @@ Return as JSON with 'notes' and 'questions' arrays.
 
         try:
             print(f"[REVISION] Attempting with gemini-2.5-flash...")
-            response = client.models.generate_content(
+            response = generate_content(
+                client,
                 model="gemini-2.5-flash",
                 contents=prompt,
                 config=config
@@ -100,7 +117,8 @@ Return as JSON with 'notes' and 'questions' arrays.
             return response.text
         except Exception as e:
             print(f"[REVISION] gemini-2.5-flash failed: {str(e)}, trying fallback...")
-            response = client.models.generate_content(
+            response = generate_content(
+                client,
                 model="gemini-1.5-flash",
                 contents=prompt,
                 config=config
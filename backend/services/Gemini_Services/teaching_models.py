@@ -0,0 +1,88 @@
+from typing import Annotated, List, Literal, Optional, Union
+
+from pydantic import BaseModel, Field, TypeAdapter
+from typing_extensions import TypedDict
+
+
+class Paragraph(BaseModel):
+    type: Literal["paragraph"]
+    content: str
+
+class Formula(BaseModel):
+    type: Literal["formula"]
+    formula: str
+    explanation: str
+
+class Insight(BaseModel):
+    type: Literal["insight"]
+    content: str
+
+class ListBlock(BaseModel):
+    type: Literal["list"]
+    items: List[str]
+
+class Simulation(BaseModel):
+    type: Literal["simulation"]
+    html: str
+    description: str
+
+
+
+class QuestionExplanations(BaseModel):
+    correct: str
+    incorrect: Optional[List[str]] = None
+
+class Question(BaseModel):
+    type: Literal["question"]
+    questionType: Literal["mcq", "fill_in_blank"]
+    question: str
+    options: Optional[List[str]] = None
+    correctIndex: Optional[int] = None
+    correctAnswer: Optional[str] = None
+    acceptedAnswers: Optional[List[str]] = None
+    explanations: QuestionExplanations
+    hint: str
+
+TeachingBlock = Union[
+    Paragraph,
+    Formula,
+    Insight,
+    ListBlock,
+    Simulation,
+    Question,
+]
+
+class TeachingResponse(BaseModel):
+    blocks: List[TeachingBlock]
+
+
+
+# Validation-only view of the same blocks. TeachingResponse keeps the plain
+# Union because it is also sent to Gemini as response_schema; parsing uses a
+# discriminated union so each block is checked against exactly one model.
+DiscriminatedBlock = Annotated[TeachingBlock, Field(discriminator="type")]
+
+
+class TeachingEnvelope(TypedDict):
+    blocks: List[DiscriminatedBlock]
+
+
+teaching_envelope_adapter = TypeAdapter(TeachingEnvelope)
+teaching_blocks_adapter = TypeAdapter(List[DiscriminatedBlock])
+
+
+def clean_simulation_html(html: str) -> str:
+    html = html.strip()
+    if html.endswith("```"):
+        html = html[:-3]
+    return html.strip()
+
+
+def parse_teaching_response(raw: Union[str, bytes]) -> tuple[TeachingResponse, bytes]:
+    # One pass from Gemini's text to models, one pass back to the JSON bytes
+    # that are stored and returned as-is
+    blocks = teaching_envelope_adapter.validate_json(raw)["blocks"]
+    for block in blocks:
+        if isinstance(block, Simulation):
+            block.html = clean_simulation_html(block.html)
+    return TeachingResponse.model_construct(blocks=blocks), teaching_blocks_adapter.dump_json(blocks)
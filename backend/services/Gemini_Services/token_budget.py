@@ -0,0 +1,115 @@
+import math
+import os
+import re
+from collections import Counter
+
+from services.metrics import GEMINI_PROMPT_TOKENS, GEMINI_PROMPT_TRIMMED
+
+# Input budgets for Gemini prompts. Tokens are estimated locally (Gemini
+# averages about four characters per English token, more for formulas and
+# symbols) so checking a prompt costs no extra API round trip. Content over
+# budget is split when subtopics are stored and compressed extractively
+# (highest scoring sentences, original order) when a prompt is built.
+
+INPUT_BUDGETS = {
+    "teaching": int(os.getenv("TEACHING_INPUT_TOKENS", "4000")),
+    "revision": int(os.getenv("REVISION_INPUT_TOKENS", "6000")),
+    "chat": int(os.getenv("CHAT_INPUT_TOKENS", "1500")),
+}
+# Largest subtopic upload_to_db stores; bigger merged sections become parts
+SUBTOPIC_MAX_TOKENS = int(os.getenv("SUBTOPIC_MAX_TOKENS", "1500"))
+# Content is never squeezed below this, however long the template gets
+MIN_CONTENT_TOKENS = 200
+
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\s{2,}|\n+")
+WORD = re.compile(r"[a-z][a-z'-]{3,}")
+
+
+def _tokens(chars: int, words: int) -> int:
+    return math.ceil(max(chars / 4, words * 4 / 3))
+
+
+def estimate_tokens(text: str) -> int:
+    return _tokens(len(text), len(text.split())) if text else 0
+
+
+def sentences(text: str) -> list[str]:
+    return [part.strip() for part in SENTENCE_BREAK.split(text) if part.strip()]
+
+
+def _pack(pieces: list[str], max_tokens: int, target: int) -> list[str]:
+    # Joins pieces with spaces into chunks of at most max_tokens, closing a
+    # chunk once it reaches target; counts run incrementally so long
+    # sections stay linear
+    chunks, current, chars, words = [], [], 0, 0
+    for piece in pieces:
+        piece_words = len(piece.split())
+        if current and (_tokens(chars + 1 + len(piece), words + piece_words) > max_tokens or _tokens(chars, words) >= target):
+            chunks.append(" ".join(current))
+            current = []
+        chars = chars + 1 + len(piece) if current else len(piece)
+        words = words + piece_words if current else piece_words
+        current.append(piece)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _units(text: str, max_tokens: int) -> list[str]:
+    units = []
+    for sentence in sentences(text):
+        if estimate_tokens(sentence) > max_tokens:
+            # For runs with no sentence breaks (tables, long lists)
+            units += _pack(sentence.split(), max_tokens, max_tokens)
+        else:
+            units.append(sentence)
+    return units
+
+
+def split_to_budget(text: str, max_tokens: int) -> list[str]:
+    total = estimate_tokens(text)
+    if total <= max_tokens:
+        return [text]
+    # Aim for even parts so the last one isn't a stub
+    target = math.ceil(total / math.ceil(total / max_tokens))
+    return _pack(_units(text, target), max_tokens, target)
+
+
+def compress_to_budget(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    units = _units(text, max_tokens)
+    frequencies = Counter(word for unit in units for word in WORD.findall(unit.lower()))
+
+    def score(index: int) -> float:
+        words = WORD.findall(units[index].lower())
+        if not words:
+            return 0.0
+        # Mean term frequency, with the opening sentence (usually the
+        # definition) always first in line
+        return math.inf if index == 0 else sum(frequencies[w] for w in words) / len(words)
+
+    kept, used = set(), 0
+    for index in sorted(range(len(units)), key=score, reverse=True):
+        cost = estimate_tokens(units[index]) + 1
+        if used + cost <= max_tokens:
+            kept.add(index)
+            used += cost
+    return " ".join(units[i] for i in sorted(kept))
+
+
+def fit_content(endpoint: str, template: str, content: str) -> str:
+    # template is the prompt with the content left out
+    available = max(MIN_CONTENT_TOKENS, INPUT_BUDGETS[endpoint] - estimate_tokens(template))
+    if estimate_tokens(content) <= available:
+        return content
+    GEMINI_PROMPT_TRIMMED.inc(endpoint=endpoint)
+    fitted = compress_to_budget(content, available)
+    print(f"[BUDGET] {endpoint}: content {estimate_tokens(content)} -> {estimate_tokens(fitted)} tokens")
+    return fitted
+
+
+def record_prompt(endpoint: str, prompt: str) -> int:
+    tokens = estimate_tokens(prompt)
+    GEMINI_PROMPT_TOKENS.observe(tokens, endpoint=endpoint)
+    return tokens
@@ -0,0 +1,206 @@
+import asyncio
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, DataError, DisconnectionError, IntegrityError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from services.db_services.score_stats import record_attempts
+from services.db_services import user_stats
+
+
+@dataclass
+class PendingAttempt:
+    user_id: str
+    subtopic_id: str
+    final_score: int
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    @property
+    def score(self) -> float:
+        return self.final_score / 100.0
+
+
+def write_attempts(db: Session, attempts: list[PendingAttempt]) -> None:
+    # Everything one answer used to write, for a whole batch; the caller commits
+    db.execute(
+        text("""
+            INSERT INTO user_attempts (user_id, subtopic_id, score, created_at)
+            VALUES (:uid, :sid, :score, :created_at)
+        """),
+        [
+            {"uid": a.user_id, "sid": a.subtopic_id, "score": a.score, "created_at": a.created_at}
+            for a in attempts
+        ]
+    )
+    record_attempts(db, [(a.user_id, a.subtopic_id, a.score) for a in attempts])
+    for a in attempts:
+        user_stats.record_attempt(db, a.user_id, a.subtopic_id, a.score, on=a.created_at.date())
+
+
+# Rows that fail on their own with these are dropped; anything else means the
+# database is unreachable or unhappy, and the batch is kept and retried
+BAD_ROW_ERRORS = (IntegrityError, DataError)
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, (OperationalError, InterfaceError, DisconnectionError, PoolTimeoutError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+def _rollback(db: Session) -> None:
+    try:
+        db.rollback()
+    except Exception:
+        # The connection may already be gone
+        pass
+
+
+def _default_session_factory() -> Session:
+    from services.db_services.db import SessionLocal
+    return SessionLocal()
+
+
+# Collects attempts in memory and commits them in batches every flush_interval
+# seconds or max_batch records. submit() returns False when the buffer is not
+# running or is full, and the caller then writes synchronously. While the
+# database is unreachable, batches stay queued and are retried with
+# exponential backoff, so an outage fills the buffer and then surfaces as
+# errors on the synchronous path instead of silently losing scores.
+class AttemptBuffer:
+    def __init__(
+            self,
+            session_factory: Callable[[], Session] = _default_session_factory,
+            flush_interval: float = 0.25,
+            max_batch: int = 200,
+            max_pending: int = 10000,
+            retry_backoff: float = 0.5,
+            max_backoff: float = 30.0,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self._backoff = 0.0
+        self._pending: list[PendingAttempt] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.flushed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._closing
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    def submit(self, attempt: PendingAttempt) -> bool:
+        if not self.running or len(self._pending) >= self.max_pending:
+            return False
+        self._pending.append(attempt)
+        if len(self._pending) >= self.max_batch and not self._backoff:
+            self._wakeup.set()
+        return True
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._backoff or self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+        # Drain whatever arrived while the last batch was being written
+        await self.flush()
+
+    async def flush(self) -> int:
+        written = 0
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            count, retry = await asyncio.to_thread(self._write, batch)
+            written += count
+            if retry:
+                # Back at the front, ahead of anything submitted meanwhile
+                self._pending[:0] = retry
+                self._backoff = min(self.max_backoff, max(self.retry_backoff, self._backoff * 2))
+                print(f"[ATTEMPTS] Database unavailable, retrying {len(self._pending)} attempt(s) in {self._backoff:.1f}s")
+                return written
+        self._backoff = 0.0
+        return written
+
+    def _write(self, batch: list[PendingAttempt]) -> tuple[int, list[PendingAttempt]]:
+        # Returns how many were written and the attempts to retry later
+        db = self.session_factory()
+        try:
+            try:
+                write_attempts(db, batch)
+                db.commit()
+                self.flushed += len(batch)
+                return len(batch), []
+            except Exception as e:
+                _rollback(db)
+                if is_transient(e):
+                    print(f"[ATTEMPTS] Batch of {len(batch)} failed, will retry: {e}")
+                    return 0, batch
+                print(f"[ATTEMPTS] Batch of {len(batch)} failed, retrying one by one: {e}")
+
+            # One bad row (e.g. a subtopic deleted mid-session) must not drop the batch
+            written = 0
+            for index, attempt in enumerate(batch):
+                try:
+                    write_attempts(db, [attempt])
+                    db.commit()
+                    written += 1
+                except BAD_ROW_ERRORS:
+                    _rollback(db)
+                    self.failed += 1
+                    print(f"[ATTEMPTS] Dropped attempt {attempt.user_id}/{attempt.subtopic_id}")
+                    print(traceback.format_exc())
+                except Exception as e:
+                    _rollback(db)
+                    print(f"[ATTEMPTS] Write failed, will retry {len(batch) - index} attempt(s): {e}")
+                    self.flushed += written
+                    return written, batch[index:]
+            self.flushed += written
+            return written, []
+        finally:
+            db.close()
+
+    async def close(self) -> None:
+        # Called on shutdown: stop accepting, then flush everything still queued
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        if self._pending:
+            print(f"[ATTEMPTS] {len(self._pending)} attempt(s) could not be written before shutdown")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": self.pending,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "retry_in_seconds": self._backoff,
+        }
+
+
+attempt_buffer = AttemptBuffer()
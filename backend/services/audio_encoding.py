@@ -0,0 +1,128 @@
+import os
+import shutil
+import subprocess
+from functools import lru_cache
+from typing import Optional
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY_PATH", "ffmpeg")
+TTS_OPUS_BITRATE = os.getenv("TTS_OPUS_BITRATE", "24k")
+
+# format name -> cache extension, media type and ffmpeg output arguments
+AUDIO_FORMATS = {
+    "wav": {"ext": "wav", "media_type": "audio/wav", "args": None},
+    "opus": {
+        "ext": "opus",
+        "media_type": "audio/ogg",
+        "args": ["-c:a", "libopus", "-b:a", TTS_OPUS_BITRATE, "-application", "voip", "-f", "ogg"],
+    },
+    "flac": {"ext": "flac", "media_type": "audio/flac", "args": ["-c:a", "flac", "-f", "flac"]},
+}
+
+ACCEPT_TO_FORMAT = {
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "audio/webm": "opus",
+    "audio/flac": "flac",
+    "audio/x-flac": "flac",
+}
+
+
+@lru_cache
+def encoder_available() -> bool:
+    return shutil.which(FFMPEG_BINARY) is not None
+
+
+def parse_accept(accept: str) -> list[tuple[str, float]]:
+    # Media ranges with their q-values, in header order; other parameters
+    # (codecs=...) are ignored and a range with a malformed q is dropped
+    ranges = []
+    for part in accept.lower().split(","):
+        media_range, *params = [piece.strip() for piece in part.split(";")]
+        if not media_range:
+            continue
+        quality = 1.0
+        try:
+            for param in params:
+                name, _, value = param.partition("=")
+                if name.strip() == "q":
+                    quality = min(max(float(value), 0.0), 1.0)
+        except ValueError:
+            continue
+        ranges.append((media_range, quality))
+    return ranges
+
+
+def _specificity(media_range: str, media_type: str) -> int:
+    if media_range == media_type:
+        return 2
+    if media_range == media_type.split("/")[0] + "/*":
+        return 1
+    if media_range == "*/*":
+        return 0
+    return -1
+
+
+def negotiate_format(requested: Optional[str], accept: Optional[str]) -> str:
+    if requested:
+        fmt = requested.lower()
+        if fmt not in AUDIO_FORMATS:
+            raise ValueError(f"Unsupported audio format: {fmt}")
+        if fmt != "wav" and not encoder_available():
+            return "wav"
+        return fmt
+    if not accept:
+        return "wav"
+
+    # Each format takes the q of the most specific range naming any of its
+    # media types; the highest q wins, then an exact match over a wildcard,
+    # then header order, then AUDIO_FORMATS order (wav first for */*)
+    ranges = parse_accept(accept)
+    best, best_rank = "wav", None
+    for preference, name in enumerate(AUDIO_FORMATS):
+        if name != "wav" and not encoder_available():
+            continue
+        matches = [
+            (_specificity(media_range, media_type), -position, quality)
+            for media_type, fmt in ACCEPT_TO_FORMAT.items() if fmt == name
+            for position, (media_range, quality) in enumerate(ranges)
+            if _specificity(media_range, media_type) >= 0
+        ]
+        if not matches:
+            continue
+        specificity, position, quality = max(matches)
+        if quality <= 0:
+            continue
+        rank = (quality, specificity, position, -preference)
+        if best_rank is None or rank > best_rank:
+            best, best_rank = name, rank
+    return best
+
+
+def detect_format(audio_data: bytes) -> str:
+    if audio_data.startswith(b"OggS"):
+        return "opus"
+    if audio_data.startswith(b"fLaC"):
+        return "flac"
+    return "wav"
+
+
+def encode_wav(wav_data: bytes, fmt: str) -> bytes:
+    args = AUDIO_FORMATS[fmt]["args"]
+    if not args or not wav_data:
+        return wav_data
+
+    cmd = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-f", "wav", "-i", "pipe:0", *args, "pipe:1"]
+    try:
+        process = subprocess.run(cmd, input=wav_data, capture_output=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Audio encoding to {fmt} failed: {repr(e)}")
+        return b""
+
+    if process.returncode != 0:
+        print(f"ffmpeg failed with code {process.returncode}")
+        print(f"Stderr: {process.stderr.decode(errors='replace')}")
+        return b""
+    return process.stdout
@@ -0,0 +1,96 @@
+import gzip
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional; falls back to gzip only
+    brotli = None
+
+# Already-compressed payloads gain nothing from a second pass
+SKIP_CONTENT_TYPES = ("audio/", "image/", "video/", "application/zip", "application/octet-stream")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            offered[name] = quality
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, brotli_quality: int = 4, gzip_level: int = 6) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+# Buffers single-message responses and compresses them with Brotli or gzip
+# when the client accepts it and the body is at least minimum_size bytes.
+# Streaming responses pass through untouched.
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, brotli_quality: int = 4, gzip_level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip_level = gzip_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or headers.get("content-type", "").startswith(SKIP_CONTENT_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding, self.brotli_quality, self.gzip_level)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers and not headers["etag"].startswith("W/"):
+                # The representation changed, so a strong validator must not be reused
+                headers["ETag"] = "W/" + headers["etag"]
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
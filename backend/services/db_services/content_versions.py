@@ -0,0 +1,54 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+# Version stamps for conditional GETs. users.curriculums_version moves when the
+# user's curriculum list changes (upload, pin, archive, delete);
+# curriculums.version moves when the curriculum itself is edited, and
+# user_curriculum_progress.version with every change to the viewer's own
+# scores, the only thing that changes their view of the tree after upload.
+
+
+def bump_user_curriculums(db: Session, user_id: str) -> None:
+    db.execute(
+        text("UPDATE users SET curriculums_version = curriculums_version + 1 WHERE id = :uid"),
+        {"uid": user_id}
+    )
+
+
+def bump_curriculum(db: Session, curriculum_id: str) -> None:
+    db.execute(
+        text("UPDATE curriculums SET version = version + 1 WHERE id = :cid"),
+        {"cid": curriculum_id}
+    )
+
+
+def get_user_curriculums_version(db: Session, user_id: str) -> int:
+    version = db.execute(
+        text("SELECT curriculums_version FROM users WHERE id = :uid"),
+        {"uid": user_id}
+    ).scalar()
+    return version or 0
+
+
+CURRICULUM_VERSION_SQL = """
+    SELECT c.id, c.version, COALESCE(p.version, 0) AS progress_version
+    FROM curriculums c
+    LEFT JOIN user_curriculum_progress p ON p.user_id = :uid AND p.curriculum_id = c.id
+    WHERE {target}
+"""
+
+
+def get_curriculum_version(db: Session, user_id: str, curriculum_id: Optional[str] = None):
+    # Resolves "latest" the same way get_curriculum does, from curriculums alone
+    target = "c.id = :cid" if curriculum_id else """c.id = (
+        SELECT id FROM curriculums
+        WHERE user_id = :uid
+        ORDER BY created_at DESC
+        LIMIT 1
+    )"""
+    return db.execute(
+        text(CURRICULUM_VERSION_SQL.format(target=target)),
+        {"uid": user_id, "cid": curriculum_id}
+    ).fetchone()
@@ -0,0 +1,92 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+# curriculums.total_subtopics mirrors COUNT(*) over the curriculum's
+# subtopics and is set when the curriculum is stored. curriculums.completed_subtopics
+# and subtopics.score date from before scores were per learner; migration 7
+# still fills them, but nothing writes or reads them any more.
+PROGRESS_SQL = """
+    SELECT m.curriculum_id,
+           COUNT(*) AS total,
+           COUNT(*) FILTER (WHERE s.score > 0) AS completed
+    FROM subtopics s
+    JOIN modules m ON s.module_id = m.id
+    {where}
+    GROUP BY m.curriculum_id
+"""
+
+
+# Scores are per learner (user_subtopic_score_stats), and anyone may open a
+# shared curriculum, so progress is kept per (user, curriculum).
+# completed_subtopics mirrors COUNT(*) FILTER (WHERE score > 0) over the
+# learner's rows for the curriculum and moves only when a score crosses zero;
+# version moves with every change to the learner's scores and stamps their
+# view of the curriculum. Both are maintained by score_stats._add_to_stats.
+USER_PROGRESS_DDL = """
+    CREATE TABLE IF NOT EXISTS user_curriculum_progress (
+        user_id TEXT NOT NULL,
+        curriculum_id {uuid} NOT NULL REFERENCES curriculums(id) ON DELETE CASCADE,
+        completed_subtopics INTEGER NOT NULL DEFAULT 0,
+        version INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, curriculum_id)
+    )
+"""
+
+USER_PROGRESS_SQL = """
+    SELECT c.total_subtopics, COALESCE(p.completed_subtopics, 0) AS completed_subtopics
+    FROM curriculums c
+    LEFT JOIN user_curriculum_progress p ON p.user_id = :uid AND p.curriculum_id = c.id
+    WHERE c.id = :cid
+"""
+
+# One row per changed (user, subtopic) score; delta is +1 / -1 on a zero
+# crossing and 0 otherwise
+BUMP_USER_PROGRESS = text("""
+    INSERT INTO user_curriculum_progress (user_id, curriculum_id, completed_subtopics, version)
+    SELECT :user_id, m.curriculum_id, :delta, 1
+    FROM subtopics s
+    JOIN modules m ON s.module_id = m.id
+    WHERE s.id = :subtopic_id
+    ON CONFLICT (user_id, curriculum_id) DO UPDATE SET
+        completed_subtopics = user_curriculum_progress.completed_subtopics + EXCLUDED.completed_subtopics,
+        version = user_curriculum_progress.version + 1
+""")
+
+
+def get_user_progress(db: Session, user_id: str, curriculum_id: str):
+    return db.execute(text(USER_PROGRESS_SQL), {"uid": user_id, "cid": curriculum_id}).fetchone()
+
+
+def bump_user_progress(db: Session, changes: list[dict]) -> None:
+    if changes:
+        db.execute(BUMP_USER_PROGRESS, changes)
+
+
+def set_total_subtopics(db: Session, curriculum_id: str, total: int) -> None:
+    db.execute(
+        text("UPDATE curriculums SET total_subtopics = :total WHERE id = :cid"),
+        {"total": total, "cid": curriculum_id}
+    )
+
+
+def backfill_user_progress(db) -> int:
+    db.execute(text("DELETE FROM user_curriculum_progress"))
+    return db.execute(text("""
+        INSERT INTO user_curriculum_progress (user_id, curriculum_id, completed_subtopics, version)
+        SELECT p.user_id, m.curriculum_id, COUNT(*) FILTER (WHERE p.score > 0), 1
+        FROM user_subtopic_score_stats p
+        JOIN subtopics s ON s.id = p.subtopic_id
+        JOIN modules m ON s.module_id = m.id
+        GROUP BY p.user_id, m.curriculum_id
+    """)).rowcount
+
+
+def backfill_curriculum_progress(db) -> int:
+    rows = db.execute(text(PROGRESS_SQL.format(where=""))).fetchall()
+    db.execute(text("UPDATE curriculums SET total_subtopics = 0, completed_subtopics = 0"))
+    if rows:
+        db.execute(
+            text("UPDATE curriculums SET total_subtopics = :total, completed_subtopics = :completed WHERE id = :cid"),
+            [{"total": r.total, "completed": r.completed, "cid": r.curriculum_id} for r in rows]
+        )
+    return len(rows)
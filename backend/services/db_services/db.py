@@ -1,12 +1,21 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 from config import get_settings
+from services.metrics import instrument_engine
 settings = get_settings()
-engine = create_engine(
- settings.DATABASE_URL,
- poolclass=NullPool
-)
+if settings.DB_POOL_SIZE > 0:
+ engine = create_engine(
+  settings.DATABASE_URL,
+  pool_size=settings.DB_POOL_SIZE,
+  pool_pre_ping=True
+ )
+else:
+ engine = create_engine(
+  settings.DATABASE_URL,
+  poolclass=NullPool
+ )
+instrument_engine(engine)
 SessionLocal = sessionmaker(bind=engine,autocommit=False,autoflush=False)
 
 def get_session():
@@ -17,7 +26,14 @@ def get_session():
  finally:
   db.close()
 
-
-
-
-
+def warm_up_db():
+ # Check out pool_size connections at once so the pool is full before traffic
+ connections = []
+ try:
+  for _ in range(max(1, settings.DB_POOL_SIZE)):
+   connection = engine.connect()
+   connections.append(connection)
+   connection.execute(text("SELECT 1"))
+ finally:
+  for connection in connections:
+   connection.close()
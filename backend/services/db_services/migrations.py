@@ -0,0 +1,372 @@
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from services.db_services.score_stats import create_score_stats_tables, backfill_score_stats, refresh_user_scores
+from services.db_services.user_stats import create_user_stats_tables, backfill_user_stats
+from services.db_services.curriculum_progress import (
+    USER_PROGRESS_DDL,
+    backfill_curriculum_progress,
+    backfill_user_progress,
+)
+
+
+def dialect_types(dialect: str) -> dict[str, str]:
+    if dialect == "postgresql":
+        return {
+            "uuid": "UUID",
+            "json": "JSONB",
+            "serial_pk": "BIGSERIAL PRIMARY KEY",
+            "uuid_pk": "UUID PRIMARY KEY DEFAULT gen_random_uuid()",
+        }
+    return {
+        "uuid": "TEXT",
+        "json": "TEXT",
+        "serial_pk": "INTEGER PRIMARY KEY AUTOINCREMENT",
+        "uuid_pk": "TEXT PRIMARY KEY",
+    }
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    statements: list[str] = field(default_factory=list)
+    apply: Optional[Callable[[Connection], None]] = None
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so these
+    # run on an autocommit connection, one statement at a time
+    concurrent: bool = False
+    dialects: Optional[set[str]] = None
+
+
+# Baseline mirrors the tables the app already runs against; every statement is
+# IF NOT EXISTS so it is a no-op on existing databases. User ids are Clerk
+# ("user_...") or guest ("guest_<uuid>") ids, so they are TEXT everywhere.
+BASELINE = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS curriculums (
+        id {uuid} PRIMARY KEY,
+        user_id TEXT REFERENCES users(id),
+        title TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_pinned BOOLEAN DEFAULT FALSE,
+        is_archived BOOLEAN DEFAULT FALSE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS modules (
+        id {uuid} PRIMARY KEY,
+        curriculum_id {uuid} REFERENCES curriculums(id) ON DELETE CASCADE,
+        title TEXT,
+        position INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS subtopics (
+        id {uuid} PRIMARY KEY,
+        module_id {uuid} REFERENCES modules(id) ON DELETE CASCADE,
+        title TEXT,
+        content TEXT,
+        score SMALLINT DEFAULT 0,
+        position INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS teaching_blocks (
+        id {uuid_pk},
+        subtopic_id {uuid} REFERENCES subtopics(id) ON DELETE CASCADE,
+        blocks_json {json},
+        generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_attempts (
+        id {serial_pk},
+        user_id TEXT,
+        subtopic_id {uuid} REFERENCES subtopics(id) ON DELETE CASCADE,
+        score REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS camera_metrics (
+        id {serial_pk},
+        user_id TEXT,
+        subtopic_id {uuid} REFERENCES subtopics(id) ON DELETE CASCADE,
+        session_duration INTEGER,
+        focus_score REAL,
+        confusion_level REAL,
+        fatigue_score REAL,
+        engagement REAL,
+        frustration REAL,
+        blink_rate REAL,
+        head_stability REAL,
+        engagement_score REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+
+def _score_stats(connection: Connection) -> None:
+    create_score_stats_tables(connection)
+    backfill_score_stats(connection, refresh_scores=False)
+
+
+def _user_stats(connection: Connection) -> None:
+    create_user_stats_tables(connection)
+    backfill_user_stats(connection)
+
+
+USER_ID_COLUMNS = [
+    ("users", "id"),
+    ("curriculums", "user_id"),
+    ("user_attempts", "user_id"),
+    ("camera_metrics", "user_id"),
+    ("user_subtopic_score_stats", "user_id"),
+    ("user_stats", "user_id"),
+    ("user_completions", "user_id"),
+]
+
+FOREIGN_KEYS_SQL = """
+    SELECT con.conname,
+           con.conrelid::regclass::text AS table_name,
+           con.confrelid::regclass::text AS ref_table,
+           ARRAY(SELECT attname FROM pg_attribute WHERE attrelid = con.conrelid AND attnum = ANY(con.conkey)) AS columns,
+           ARRAY(SELECT attname FROM pg_attribute WHERE attrelid = con.confrelid AND attnum = ANY(con.confkey)) AS ref_columns,
+           pg_get_constraintdef(con.oid) AS definition
+    FROM pg_constraint con
+    WHERE con.contype = 'f'
+"""
+
+
+def _text_user_ids(connection: Connection) -> None:
+    # Databases created before user ids were TEXT have UUID columns, which
+    # reject guest ids. Each ALTER rewrites its table and rebuilds that
+    # table's indexes (primary keys included) under an ACCESS EXCLUSIVE lock,
+    # so this only touches columns that are still UUID (a fresh database does
+    # nothing) and gives up after lock_timeout rather than queueing every query
+    # behind a long transaction; on large tables run scripts/migrate.py
+    # off-peak before deploying. Foreign keys can't span TEXT and UUID
+    # mid-change, so every one on or referencing these columns is dropped
+    # and re-added around the ALTERs.
+    types = dict(
+        ((row.table_name, row.column_name), row.data_type)
+        for row in connection.execute(text("""
+            SELECT table_name, column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = current_schema()
+        """))
+    )
+    pending = {column for column in USER_ID_COLUMNS if types.get(column) not in (None, "text")}
+    if not pending:
+        return
+
+    connection.execute(text("SET LOCAL lock_timeout = '10s'"))
+    foreign_keys = [
+        fk for fk in connection.execute(text(FOREIGN_KEYS_SQL))
+        if any((fk.table_name, c) in pending for c in fk.columns)
+        or any((fk.ref_table, c) in pending for c in fk.ref_columns)
+    ]
+    for fk in foreign_keys:
+        connection.execute(text(f'ALTER TABLE {fk.table_name} DROP CONSTRAINT "{fk.conname}"'))
+    for table, column in USER_ID_COLUMNS:
+        if (table, column) in pending:
+            print(f"[MIGRATE] Rewriting {table}.{column} as TEXT")
+            connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE TEXT USING {column}::text"))
+    for fk in foreign_keys:
+        connection.execute(text(f'ALTER TABLE {fk.table_name} ADD CONSTRAINT "{fk.conname}" {fk.definition}'))
+
+
+MIGRATIONS = [
+    Migration(1, "baseline_schema", statements=BASELINE),
+    Migration(
+        2,
+        "curriculum_pin_archive_flags",
+        statements=[
+            "ALTER TABLE curriculums ADD COLUMN IF NOT EXISTS is_pinned BOOLEAN DEFAULT FALSE",
+            "ALTER TABLE curriculums ADD COLUMN IF NOT EXISTS is_archived BOOLEAN DEFAULT FALSE",
+        ],
+        # Fresh SQLite databases get the columns from the baseline
+        dialects={"postgresql"},
+    ),
+    Migration(3, "score_stats", apply=_score_stats),
+    Migration(
+        4,
+        "hot_path_indexes",
+        statements=[
+            "CREATE INDEX {concurrently} IF NOT EXISTS idx_modules_curriculum_position ON modules (curriculum_id, position)",
+            "CREATE INDEX {concurrently} IF NOT EXISTS idx_subtopics_module_position ON subtopics (module_id, position)",
+            "CREATE INDEX {concurrently} IF NOT EXISTS idx_user_attempts_user_subtopic ON user_attempts (user_id, subtopic_id)",
+            "CREATE INDEX {concurrently} IF NOT EXISTS idx_camera_metrics_subtopic ON camera_metrics (subtopic_id)",
+            "CREATE INDEX {concurrently} IF NOT EXISTS idx_teaching_blocks_subtopic ON teaching_blocks (subtopic_id)",
+            "CREATE INDEX {concurrently} IF NOT EXISTS idx_curriculums_user_created ON curriculums (user_id, created_at DESC)",
+        ],
+        concurrent=True,
+    ),
+    Migration(5, "user_stats", apply=_user_stats),
+    Migration(
+        6,
+        "user_attempts_activity_index",
+        statements=[
+            "CREATE INDEX {concurrently} IF NOT EXISTS idx_user_attempts_user_created ON user_attempts (user_id, created_at)",
+        ],
+        concurrent=True,
+    ),
+    Migration(
+        7,
+        "curriculum_progress_counters",
+        statements=[
+            "ALTER TABLE curriculums ADD COLUMN total_subtopics INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE curriculums ADD COLUMN completed_subtopics INTEGER NOT NULL DEFAULT 0",
+        ],
+        apply=backfill_curriculum_progress,
+    ),
+    Migration(
+        8,
+        "user_subtopic_progress_score",
+        statements=[
+            "ALTER TABLE user_subtopic_score_stats ADD COLUMN score SMALLINT NOT NULL DEFAULT 0",
+        ],
+        apply=refresh_user_scores,
+    ),
+    Migration(
+        9,
+        "user_subtopic_progress_index",
+        statements=[
+            # Covers the curriculum view's per-user score lookup without touching the table
+            "CREATE INDEX {concurrently} IF NOT EXISTS idx_user_subtopic_progress ON user_subtopic_score_stats (user_id, subtopic_id, score)",
+        ],
+        concurrent=True,
+    ),
+    Migration(
+        10,
+        "content_versions",
+        statements=[
+            "ALTER TABLE curriculums ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+            "ALTER TABLE users ADD COLUMN curriculums_version INTEGER NOT NULL DEFAULT 1",
+        ],
+    ),
+    # SQLite ids were TEXT from the start
+    Migration(11, "text_user_ids", apply=_text_user_ids, dialects={"postgresql"}),
+    Migration(12, "user_curriculum_progress", statements=[USER_PROGRESS_DDL], apply=backfill_user_progress),
+]
+
+# Arbitrary constant identifying the schema migration advisory lock
+MIGRATION_LOCK_KEY = 0x4F524254
+
+
+def _render(statement: str, dialect: str) -> str:
+    return statement.format(
+        concurrently="CONCURRENTLY" if dialect == "postgresql" else "",
+        **dialect_types(dialect)
+    )
+
+
+def ensure_migrations_table(engine: Engine) -> None:
+    with engine.begin() as connection:
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL
+            )
+        """))
+
+
+def applied_versions(engine: Engine) -> set[int]:
+    ensure_migrations_table(engine)
+    with engine.connect() as connection:
+        return {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def _record(connection: Connection, migration: Migration) -> None:
+    connection.execute(
+        text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :at)"),
+        {"v": migration.version, "n": migration.name, "at": datetime.now(timezone.utc)}
+    )
+
+
+INDEX_NAME = re.compile(r"IF NOT EXISTS (\w+)")
+
+
+def _drop_invalid_index(connection: Connection, statement: str) -> None:
+    # A CREATE INDEX CONCURRENTLY that failed or was interrupted leaves an
+    # INVALID index behind, which IF NOT EXISTS would then skip forever
+    name = INDEX_NAME.search(statement).group(1)
+    valid = connection.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name}
+    ).scalar()
+    if valid is False:
+        print(f"[MIGRATE] Rebuilding invalid index {name}")
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+def apply_migration(engine: Engine, migration: Migration) -> None:
+    dialect = engine.dialect.name
+    applies = migration.dialects is None or dialect in migration.dialects
+
+    if migration.concurrent and applies:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for statement in migration.statements:
+                if dialect == "postgresql":
+                    _drop_invalid_index(connection, statement)
+                connection.execute(text(_render(statement, dialect)))
+        with engine.begin() as connection:
+            _record(connection, migration)
+        return
+
+    with engine.begin() as connection:
+        if applies:
+            for statement in migration.statements:
+                connection.execute(text(_render(statement, dialect)))
+            if migration.apply:
+                migration.apply(connection)
+        _record(connection, migration)
+
+
+@contextmanager
+def migration_lock(engine: Engine):
+    # Every replica runs scripts/migrate.py at boot; the advisory lock makes the
+    # others wait and then find the versions already recorded. The lock
+    # connection stays in autocommit so it holds no open transaction, which
+    # CREATE INDEX CONCURRENTLY would otherwise wait on forever.
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def run_migrations(engine: Engine, target: Optional[int] = None) -> list[Migration]:
+    with migration_lock(engine):
+        done = applied_versions(engine)
+        applied = []
+        for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+            if target is not None and migration.version > target:
+                break
+            if migration.version in done:
+                continue
+            print(f"[MIGRATE] Applying {migration.version:04d}_{migration.name}")
+            apply_migration(engine, migration)
+            applied.append(migration)
+        return applied
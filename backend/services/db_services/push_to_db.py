@@ -4,6 +4,11 @@ from uuid import uuid4
 from datetime import datetime, timezone
 import re
 
+from services.db_services.user_stats import add_lessons
+from services.db_services.curriculum_progress import set_total_subtopics
+from services.db_services.content_versions import bump_user_curriculums
+from services.Gemini_Services.token_budget import SUBTOPIC_MAX_TOKENS, split_to_budget
+
 def sanitize_title(title: str) -> str:
     if not title: return ""
     title = re.sub(r'^\s*[\d.]+\s+', '', title)
@@ -49,6 +54,7 @@ def upload_to_db(
             }
         )
 
+        lesson_count = 0
         for module_pos, module in enumerate(modules, start=1):
             buffer_content = ""
             buffer_title = None
@@ -67,10 +73,13 @@ def upload_to_db(
                     buffer_content += " " + content
 
                 if len(buffer_content) >= 80:
-                    pending_topics.append({
-                        "title": buffer_title,
-                        "content": buffer_content
-                    })
+                    # Oversized sections become parts so no prompt outgrows its budget
+                    parts = split_to_budget(buffer_content, SUBTOPIC_MAX_TOKENS)
+                    for part_number, part in enumerate(parts, start=1):
+                        pending_topics.append({
+                            "title": buffer_title if len(parts) == 1 else f"{buffer_title} - Part {part_number}",
+                            "content": part
+                        })
                     module_has_valid_content = True
                     buffer_content = ""
                     buffer_title = None
@@ -119,7 +128,11 @@ def upload_to_db(
                     }
                 )
                 subtopic_position += 1
+                lesson_count += 1
 
+        set_total_subtopics(dbstuf, curriculum_id, lesson_count)
+        add_lessons(dbstuf, user_id, lesson_count)
+        bump_user_curriculums(dbstuf, user_id)
         dbstuf.commit()
         return curriculum_id
 
@@ -0,0 +1,249 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from services.db_services.curriculum_progress import bump_user_progress
+
+# Running sums/counts per subtopic and per (user, subtopic), kept in step with
+# user_attempts and camera_metrics so scores never need an AVG over history.
+# User ids are Clerk ("user_...") or guest ("guest_<uuid>") ids, so always TEXT.
+SCORE_STATS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS subtopic_score_stats (
+        subtopic_id {id_type} PRIMARY KEY,
+        attempt_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+        attempt_count INTEGER NOT NULL DEFAULT 0,
+        engagement_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+        engagement_count INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_subtopic_score_stats (
+        user_id TEXT NOT NULL,
+        subtopic_id {id_type} NOT NULL,
+        attempt_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+        attempt_count INTEGER NOT NULL DEFAULT 0,
+        engagement_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+        engagement_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, subtopic_id)
+    )
+    """,
+]
+
+_UPSERT = """
+    INSERT INTO {table} ({keys}, attempt_sum, attempt_count, engagement_sum, engagement_count)
+    VALUES ({key_params}, :attempt_sum, :attempt_count, :engagement_sum, :engagement_count)
+    ON CONFLICT ({keys}) DO UPDATE SET
+        attempt_sum = {table}.attempt_sum + EXCLUDED.attempt_sum,
+        attempt_count = {table}.attempt_count + EXCLUDED.attempt_count,
+        engagement_sum = {table}.engagement_sum + EXCLUDED.engagement_sum,
+        engagement_count = {table}.engagement_count + EXCLUDED.engagement_count
+"""
+
+UPSERT_SUBTOPIC_STATS = text(_UPSERT.format(
+    table="subtopic_score_stats", keys="subtopic_id", key_params=":subtopic_id"
+))
+# Returns the new sums next to the score they last produced; the upsert holds
+# the row lock until commit, so the old score can't move underneath the caller
+UPSERT_USER_SUBTOPIC_STATS = text(_UPSERT.format(
+    table="user_subtopic_score_stats", keys="user_id, subtopic_id", key_params=":user_id, :subtopic_id"
+) + " RETURNING attempt_sum, attempt_count, engagement_sum, engagement_count, score")
+
+SET_USER_SCORE = text(
+    "UPDATE user_subtopic_score_stats SET score = :score WHERE user_id = :user_id AND subtopic_id = :subtopic_id"
+)
+
+# user_subtopic_score_stats.score is the learner's own weighted_score(), kept
+# next to the sums it comes from so curriculum views read it straight off the
+# covering index. Writes compute it from the upserted sums; this rebuilds it
+# for backfills, with the same 70/30 rules and truncation as weighted_score().
+REFRESH_USER_SCORE = """
+    UPDATE user_subtopic_score_stats SET score = CASE
+        WHEN attempt_count > 0 AND engagement_count > 0 AND engagement_sum <> 0
+            THEN {trunc_open}((attempt_sum / attempt_count) * 100 * 0.7 + (engagement_sum / engagement_count) * 0.3{trunc_close})
+        WHEN attempt_count > 0
+            THEN {trunc_open}((attempt_sum / attempt_count) * 100{trunc_close})
+        WHEN engagement_count > 0
+            THEN {trunc_open}(engagement_sum / engagement_count{trunc_close})
+        ELSE 0
+    END
+    WHERE {where}
+"""
+
+
+def _truncate(db) -> dict[str, str]:
+    if dialect_name(db) == "postgresql":
+        return {"trunc_open": "TRUNC", "trunc_close": ""}
+    return {"trunc_open": "CAST", "trunc_close": " AS INTEGER"}
+
+
+def _add_to_stats(db: Session, deltas: dict[tuple[str, str], list[float]]) -> None:
+    # deltas: (user_id, subtopic_id) -> [attempt_sum, attempt_count, engagement_sum, engagement_count]
+    per_subtopic: dict[str, list[float]] = {}
+    user_rows = []
+    for (user_id, subtopic_id), values in deltas.items():
+        totals = per_subtopic.setdefault(subtopic_id, [0.0, 0, 0.0, 0])
+        for i, value in enumerate(values):
+            totals[i] += value
+        user_rows.append({
+            "user_id": user_id,
+            "subtopic_id": subtopic_id,
+            "attempt_sum": values[0],
+            "attempt_count": values[1],
+            "engagement_sum": values[2],
+            "engagement_count": values[3],
+        })
+
+    subtopic_rows = [
+        {
+            "subtopic_id": subtopic_id,
+            "attempt_sum": totals[0],
+            "attempt_count": totals[1],
+            "engagement_sum": totals[2],
+            "engagement_count": totals[3],
+        }
+        # Sorted so concurrent batches lock rows in the same order
+        for subtopic_id, totals in sorted(per_subtopic.items())
+    ]
+    user_rows.sort(key=lambda row: (row["user_id"], row["subtopic_id"]))
+
+    if subtopic_rows:
+        db.execute(UPSERT_SUBTOPIC_STATS, subtopic_rows)
+
+    changes = []
+    for row in user_rows:
+        stats = db.execute(UPSERT_USER_SUBTOPIC_STATS, row).fetchone()
+        score = weighted_score(stats.attempt_sum, stats.attempt_count, stats.engagement_sum, stats.engagement_count)
+        if score != stats.score:
+            changes.append({
+                "user_id": row["user_id"],
+                "subtopic_id": row["subtopic_id"],
+                "score": score,
+                "delta": int(score > 0) - int(stats.score > 0),
+            })
+    if changes:
+        db.execute(SET_USER_SCORE, changes)
+        bump_user_progress(db, changes)
+
+
+def record_attempt(db: Session, user_id: str, subtopic_id: str, score: float) -> None:
+    _add_to_stats(db, {(user_id, subtopic_id): [score, 1, 0.0, 0]})
+
+
+def record_attempts(db: Session, attempts: list[tuple[str, str, float]]) -> None:
+    deltas: dict[tuple[str, str], list[float]] = {}
+    for user_id, subtopic_id, score in attempts:
+        values = deltas.setdefault((user_id, subtopic_id), [0.0, 0, 0.0, 0])
+        values[0] += score
+        values[1] += 1
+    _add_to_stats(db, deltas)
+
+
+def record_engagement(db: Session, samples: list[tuple[str, str, float]]) -> None:
+    deltas: dict[tuple[str, str], list[float]] = {}
+    for user_id, subtopic_id, engagement_score in samples:
+        values = deltas.setdefault((user_id, subtopic_id), [0.0, 0, 0.0, 0])
+        values[2] += engagement_score
+        values[3] += 1
+    _add_to_stats(db, deltas)
+
+
+def weighted_score(attempt_sum: float, attempt_count: int, engagement_sum: float, engagement_count: int) -> int:
+    # If no questions attempted, use 100% camera score
+    # If no camera data, use 100% question score
+    # If both, use weighted average (70% Q, 30% C)
+    question_score = (attempt_sum / attempt_count) * 100 if attempt_count else None
+    camera_score = engagement_sum / engagement_count if engagement_count else 0
+
+    if question_score is not None:
+        if camera_score:
+            return int((question_score * 0.7) + (camera_score * 0.3))
+        return int(question_score)
+    if camera_score:
+        return int(camera_score)
+    return 0
+
+
+def get_subtopic_stats(db: Session, subtopic_id: str):
+    return db.execute(
+        text("""
+            SELECT attempt_sum, attempt_count, engagement_sum, engagement_count
+            FROM subtopic_score_stats
+            WHERE subtopic_id = :sid
+        """),
+        {"sid": subtopic_id}
+    ).fetchone()
+
+
+def get_subtopic_weighted_score(db: Session, subtopic_id: str) -> int:
+    stats = get_subtopic_stats(db, subtopic_id)
+    if not stats:
+        return 0
+    return weighted_score(stats.attempt_sum, stats.attempt_count, stats.engagement_sum, stats.engagement_count)
+
+
+def get_user_attempt_average(db: Session, user_id: str, subtopic_id: str) -> int:
+    stats = db.execute(
+        text("""
+            SELECT attempt_sum, attempt_count
+            FROM user_subtopic_score_stats
+            WHERE user_id = :uid AND subtopic_id = :sid
+        """),
+        {"uid": user_id, "sid": subtopic_id}
+    ).fetchone()
+    if not stats or not stats.attempt_count:
+        return 0
+    return int((stats.attempt_sum / stats.attempt_count) * 100)
+
+
+def dialect_name(db) -> str:
+    # Accepts a Session or a bare Connection (used by the migration runner)
+    return db.get_bind().dialect.name if isinstance(db, Session) else db.dialect.name
+
+
+def id_type(db) -> str:
+    return "UUID" if dialect_name(db) == "postgresql" else "TEXT"
+
+
+def create_score_stats_tables(db: Session) -> None:
+    for statement in SCORE_STATS_DDL:
+        db.execute(text(statement.format(id_type=id_type(db))))
+
+
+def refresh_user_scores(db) -> None:
+    db.execute(text(REFRESH_USER_SCORE.format(where="1 = 1", **_truncate(db))))
+
+
+def backfill_score_stats(db: Session, refresh_scores: bool = True) -> tuple[int, int]:
+    # Rebuilds both tables from history inside the caller's transaction
+    db.execute(text("DELETE FROM user_subtopic_score_stats"))
+    db.execute(text("DELETE FROM subtopic_score_stats"))
+
+    for table, keys in (
+            ("user_subtopic_score_stats", "user_id, subtopic_id"),
+            ("subtopic_score_stats", "subtopic_id"),
+    ):
+        db.execute(text(f"""
+            INSERT INTO {table} ({keys}, attempt_sum, attempt_count)
+            SELECT {keys}, SUM(score), COUNT(score)
+            FROM user_attempts
+            WHERE score IS NOT NULL
+            GROUP BY {keys}
+        """))
+        db.execute(text(f"""
+            INSERT INTO {table} ({keys}, engagement_sum, engagement_count)
+            SELECT {keys}, SUM(engagement_score), COUNT(engagement_score)
+            FROM camera_metrics
+            WHERE engagement_score IS NOT NULL
+            GROUP BY {keys}
+            ON CONFLICT ({keys}) DO UPDATE SET
+                engagement_sum = EXCLUDED.engagement_sum,
+                engagement_count = EXCLUDED.engagement_count
+        """))
+
+    # Migration 3 runs this before the score column exists (migration 8)
+    if refresh_scores:
+        refresh_user_scores(db)
+
+    subtopics = db.execute(text("SELECT COUNT(*) FROM subtopic_score_stats")).scalar()
+    user_rows = db.execute(text("SELECT COUNT(*) FROM user_subtopic_score_stats")).scalar()
+    return subtopics, user_rows
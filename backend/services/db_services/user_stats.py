@@ -0,0 +1,277 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+
+from services.db_services.score_stats import dialect_name, id_type
+
+PASSING_SCORE = 0.7
+
+# One row per user, kept current as attempts and uploads happen, so the
+# dashboard stats endpoint is a single primary-key read. User ids are Clerk or
+# guest ids, not UUIDs, so they are TEXT on every dialect.
+USER_STATS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS user_stats (
+        user_id TEXT PRIMARY KEY,
+        completed_count INTEGER NOT NULL DEFAULT 0,
+        total_lessons INTEGER NOT NULL DEFAULT 0,
+        attempt_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+        attempt_count INTEGER NOT NULL DEFAULT 0,
+        current_streak INTEGER NOT NULL DEFAULT 0,
+        last_activity_date DATE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_completions (
+        user_id TEXT NOT NULL,
+        subtopic_id {id_type} NOT NULL,
+        PRIMARY KEY (user_id, subtopic_id)
+    )
+    """,
+]
+
+
+def today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def as_date(value) -> Optional[date]:
+    # SQLite hands dates back as ISO strings
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def record_attempt(db: Session, user_id: str, subtopic_id: str, score: float, on: Optional[date] = None) -> None:
+    on = on or today()
+    newly_completed = 0
+    if score >= PASSING_SCORE:
+        newly_completed = db.execute(
+            text("""
+                INSERT INTO user_completions (user_id, subtopic_id)
+                VALUES (:uid, :sid)
+                ON CONFLICT (user_id, subtopic_id) DO NOTHING
+            """),
+            {"uid": user_id, "sid": subtopic_id}
+        ).rowcount
+
+    db.execute(
+        text("""
+            INSERT INTO user_stats (
+                user_id, completed_count, attempt_sum, attempt_count,
+                current_streak, last_activity_date
+            )
+            VALUES (:uid, :completed, :score, 1, 1, :today)
+            ON CONFLICT (user_id) DO UPDATE SET
+                completed_count = user_stats.completed_count + EXCLUDED.completed_count,
+                attempt_sum = user_stats.attempt_sum + EXCLUDED.attempt_sum,
+                attempt_count = user_stats.attempt_count + 1,
+                current_streak = CASE
+                    WHEN user_stats.last_activity_date IS NULL THEN 1
+                    WHEN user_stats.last_activity_date >= EXCLUDED.last_activity_date THEN user_stats.current_streak
+                    WHEN user_stats.last_activity_date = :yesterday THEN user_stats.current_streak + 1
+                    ELSE 1
+                END,
+                last_activity_date = CASE
+                    WHEN user_stats.last_activity_date IS NULL
+                      OR user_stats.last_activity_date < EXCLUDED.last_activity_date
+                    THEN EXCLUDED.last_activity_date
+                    ELSE user_stats.last_activity_date
+                END
+        """),
+        {
+            "uid": user_id,
+            "completed": newly_completed,
+            "score": score,
+            "today": on,
+            "yesterday": on - timedelta(days=1),
+        }
+    )
+
+
+def add_lessons(db: Session, user_id: str, count: int) -> None:
+    if not count:
+        return
+    db.execute(
+        text("""
+            INSERT INTO user_stats (user_id, total_lessons)
+            VALUES (:uid, :count)
+            ON CONFLICT (user_id) DO UPDATE SET
+                total_lessons = CASE
+                    WHEN user_stats.total_lessons + EXCLUDED.total_lessons < 0 THEN 0
+                    ELSE user_stats.total_lessons + EXCLUDED.total_lessons
+                END
+        """),
+        {"uid": user_id, "count": count}
+    )
+
+
+def remove_curriculum(db: Session, user_id: str, curriculum_id: str) -> None:
+    # Call before deleting the curriculum: its subtopics, attempts and
+    # completions go with it via ON DELETE CASCADE
+    params = {"uid": user_id, "cid": curriculum_id}
+    owned = """
+        SELECT s.id
+        FROM subtopics s
+        JOIN modules m ON m.id = s.module_id
+        JOIN curriculums c ON c.id = m.curriculum_id
+        WHERE c.id = :cid AND c.user_id = :uid
+    """
+    lessons = db.execute(text(f"SELECT COUNT(*) FROM ({owned}) owned"), params).scalar() or 0
+    if not lessons:
+        return
+    attempts = db.execute(
+        text(f"""
+            SELECT COALESCE(SUM(score), 0) AS attempt_sum, COUNT(score) AS attempt_count
+            FROM user_attempts
+            WHERE user_id = :uid AND subtopic_id IN ({owned})
+        """),
+        params
+    ).fetchone()
+    completed = db.execute(
+        text(f"DELETE FROM user_completions WHERE user_id = :uid AND subtopic_id IN ({owned})"),
+        params
+    ).rowcount
+
+    db.execute(
+        text("""
+            UPDATE user_stats SET
+                total_lessons = CASE WHEN total_lessons > :lessons THEN total_lessons - :lessons ELSE 0 END,
+                completed_count = CASE WHEN completed_count > :completed THEN completed_count - :completed ELSE 0 END,
+                attempt_sum = attempt_sum - :attempt_sum,
+                attempt_count = CASE WHEN attempt_count > :attempt_count THEN attempt_count - :attempt_count ELSE 0 END
+            WHERE user_id = :uid
+        """),
+        {
+            "uid": user_id,
+            "lessons": lessons,
+            "completed": completed,
+            "attempt_sum": attempts.attempt_sum,
+            "attempt_count": attempts.attempt_count,
+        }
+    )
+
+
+def get_user_stats_row(db: Session, user_id: str):
+    return db.execute(
+        text("""
+            SELECT completed_count, total_lessons, attempt_sum, attempt_count,
+                   current_streak, last_activity_date
+            FROM user_stats
+            WHERE user_id = :uid
+        """),
+        {"uid": user_id}
+    ).fetchone()
+
+
+def visible_streak(current_streak: int, last_activity_date, on: Optional[date] = None) -> int:
+    # A streak only counts while the learner was active today or yesterday
+    on = on or today()
+    last = as_date(last_activity_date)
+    if last is None or last < on - timedelta(days=1):
+        return 0
+    return current_streak
+
+
+def _previous_day(dialect: str, column: str) -> str:
+    if dialect == "postgresql":
+        return f"({column} - 1)"
+    return f"DATE({column}, '-1 day')"
+
+
+def streak_runs_sql(dialect: str, latest: str) -> str:
+    # Walk back from each user's latest activity day one day at a time, each
+    # step an index probe on (user_id, created_at) for the day before, and stop
+    # at the first gap. Only the current run is ever read, so the cost follows
+    # the streak rather than the whole attempt history. `latest` yields
+    # (user_id, d) with d the latest activity date.
+    previous = _previous_day(dialect, "run.d")
+    return f"""
+        WITH RECURSIVE run (user_id, d, streak) AS (
+            SELECT user_id, d, 1 FROM ({latest}) latest
+            UNION ALL
+            SELECT run.user_id, {previous}, run.streak + 1
+            FROM run
+            WHERE EXISTS (
+                SELECT 1 FROM user_attempts a
+                WHERE a.user_id = run.user_id
+                  AND a.created_at >= {previous} AND a.created_at < run.d
+            )
+        )
+        SELECT user_id, MAX(streak) AS streak, MAX(d) AS last_activity_date
+        FROM run
+        GROUP BY user_id
+    """
+
+
+LATEST_ACTIVITY_SQL = """
+    SELECT user_id, DATE(created_at) AS d
+    FROM user_attempts
+    WHERE user_id = :uid AND created_at IS NOT NULL
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
+
+
+def compute_streak(db, user_id: str) -> tuple[int, Optional[date]]:
+    dialect = dialect_name(db)
+    row = db.execute(text(streak_runs_sql(dialect, LATEST_ACTIVITY_SQL)), {"uid": user_id}).fetchone()
+    if not row:
+        return 0, None
+    return row.streak, as_date(row.last_activity_date)
+
+
+def create_user_stats_tables(db) -> None:
+    for statement in USER_STATS_DDL:
+        db.execute(text(statement.format(id_type=id_type(db))))
+
+
+def backfill_user_stats(db) -> int:
+    db.execute(text("DELETE FROM user_completions"))
+    db.execute(text("DELETE FROM user_stats"))
+
+    db.execute(text(f"""
+        INSERT INTO user_completions (user_id, subtopic_id)
+        SELECT DISTINCT user_id, subtopic_id
+        FROM user_attempts
+        WHERE score >= {PASSING_SCORE}
+    """))
+    db.execute(text("""
+        INSERT INTO user_stats (user_id, attempt_sum, attempt_count, last_activity_date)
+        SELECT user_id, COALESCE(SUM(score), 0), COUNT(score), MAX(DATE(created_at))
+        FROM user_attempts
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+    """))
+    db.execute(text("""
+        INSERT INTO user_stats (user_id, total_lessons)
+        SELECT c.user_id, COUNT(s.id)
+        FROM curriculums c
+        JOIN modules m ON m.curriculum_id = c.id
+        JOIN subtopics s ON s.module_id = m.id
+        WHERE c.user_id IS NOT NULL
+        GROUP BY c.user_id
+        ON CONFLICT (user_id) DO UPDATE SET total_lessons = EXCLUDED.total_lessons
+    """))
+    db.execute(text("""
+        UPDATE user_stats SET completed_count = (
+            SELECT COUNT(*) FROM user_completions c WHERE c.user_id = user_stats.user_id
+        )
+    """))
+
+    dialect = dialect_name(db)
+    # Starts from the last_activity_date filled in above
+    streaks = db.execute(text(streak_runs_sql(dialect, """
+        SELECT user_id, last_activity_date AS d
+        FROM user_stats
+        WHERE last_activity_date IS NOT NULL
+    """))).fetchall()
+    if streaks:
+        db.execute(
+            text("UPDATE user_stats SET current_streak = :streak WHERE user_id = :uid"),
+            [{"streak": row.streak, "uid": row.user_id} for row in streaks]
+        )
+
+    return db.execute(text("SELECT COUNT(*) FROM user_stats")).scalar()
@@ -1,12 +1,18 @@
 import ftfy
 import spacy
 import re
+from functools import lru_cache
 from services.garbage_removal import is_garbage
+from services.tracing import current_span, span
 
-try:
-    nlp = spacy.load('en_core_web_md')
-except OSError:
-    raise RuntimeError("spacy model en core web md is not installed maybe")
+
+@lru_cache
+def get_nlp():
+    # Loaded lazily so the app can start serving while warmup loads the model
+    try:
+        return spacy.load('en_core_web_md')
+    except OSError:
+        raise RuntimeError("spacy model en core web md is not installed maybe")
 
 MAX_SUBTOPICS_PER_MODULE = 6
 MIN_SUBTOPICS_PER_MODULE = 2
@@ -53,9 +59,11 @@ def extract_title_text(text: str) -> str:
 def cosine_similarity(text1: str, text2: str) -> float:
     if not text1 or not text2:
         return 0.0
-    t1 = nlp(text1)
-    t2 = nlp(text2)
-    return t1.similarity(t2)
+    with current_span().timer("similarity"):
+        nlp = get_nlp()
+        t1 = nlp(text1)
+        t2 = nlp(text2)
+        return t1.similarity(t2)
 
 
 def find_best_split_point(subtopics: list[dict], start_idx: int = 0) -> int:
@@ -127,14 +135,18 @@ def create_modules(intake: list):
     current_module: list[dict] = []
     previous_title: str | None = None
     content: str = ""
+    trace = current_span()
     
     for element in intake:
         type_of_element: str = element["type"]
-        clean_text: str = ftfy.fix_text(element["text"])
+        with trace.timer("ftfy"):
+            clean_text: str = ftfy.fix_text(element["text"])
         
         if not clean_text:
             continue
-        if is_garbage(clean_text, 10, 0.5) and type_of_element != "Formula":
+        with trace.timer("garbage_filter"):
+            garbage = is_garbage(clean_text, 10, 0.5)
+        if garbage and type_of_element != "Formula":
             continue
 
         if is_likely_title(clean_text, type_of_element):
@@ -174,8 +186,13 @@ def create_modules(intake: list):
     if current_module:
         raw_modules.append(current_module)
 
-    balanced_modules = balance_modules(raw_modules)
-    final_modules = merge_small_modules(balanced_modules)
+    trace.set(elements=len(intake), raw_modules=len(raw_modules))
+    with span("balance_modules", modules_in=len(raw_modules)) as balance_span:
+        balanced_modules = balance_modules(raw_modules)
+        balance_span.set(modules_out=len(balanced_modules))
+    with span("merge_small_modules", modules_in=len(balanced_modules)) as merge_span:
+        final_modules = merge_small_modules(balanced_modules)
+        merge_span.set(modules_out=len(final_modules))
     
     return final_modules
 
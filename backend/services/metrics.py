@@ -0,0 +1,403 @@
+import copy
+import glob
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Iterable, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Prometheus text exposition (format 0.0.4) without the client library. Values
+# live in this process. Under serve.py, ORBIT_METRICS_DIR names a directory
+# every worker writes a snapshot to each METRICS_FLUSH_SECONDS, and the worker
+# answering a scrape merges them, much like prometheus_client's multiprocess
+# mode: counters and histograms are summed, keeping the last snapshot of
+# workers that have exited so totals never go backwards; gauges describe one
+# process, so they get a worker label and only live workers report.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+SHARED_DIR_ENV = "ORBIT_METRICS_DIR"
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        ...
+
+    @abstractmethod
+    def dump(self) -> list:
+        # JSON-safe values for the worker snapshot
+        ...
+
+    @abstractmethod
+    def absorb(self, dumped: list, extra: tuple = ()) -> None:
+        # Adds another worker's dump(), with extra appended to every key
+        ...
+
+    def empty_copy(self, extra_labels: tuple = ()) -> "Metric":
+        merged = copy.copy(self)
+        merged.label_names = self.label_names + tuple(extra_labels)
+        merged._lock = Lock()
+        merged._values = {}
+        return merged
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def absorb(self, dumped: list, extra: tuple = ()) -> None:
+        with self._lock:
+            for key, value in dumped:
+                key = tuple(key) + extra
+                self._values[key] = self._values.get(key, 0) + value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count], sum
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, seconds: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += seconds
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), list(counts), total[0]] for key, (counts, total) in self._values.items()]
+
+    def absorb(self, dumped: list, extra: tuple = ()) -> None:
+        with self._lock:
+            for key, counts, total in dumped:
+                if len(counts) != len(self.buckets) + 1:
+                    # Written by a build with different buckets
+                    continue
+                merged, merged_total = self._values.setdefault(tuple(key) + extra, ([0] * len(counts), [0.0]))
+                for i, count in enumerate(counts):
+                    merged[i] += count
+                merged_total[0] += total
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self._sharing: Optional[threading.Event] = None
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collect: Callable[[], None]) -> None:
+        # Runs on every scrape, for gauges read from elsewhere (pool sizes, cache counters)
+        self._collectors.append(collect)
+
+    def collect(self) -> None:
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"[METRICS] Collector failed: {repr(e)}")
+
+    def render(self, shared_dir: Optional[str] = None) -> str:
+        self.collect()
+        shared_dir = shared_dir or os.getenv(SHARED_DIR_ENV)
+        metrics = self.merge_snapshots(shared_dir) if shared_dir else list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, shared_dir: str) -> None:
+        snapshot = {
+            "pid": os.getpid(),
+            "worker": os.getenv("ORBIT_WORKER_ID", "0"),
+            "metrics": {name: metric.dump() for name, metric in self._metrics.items()},
+        }
+        path = os.path.join(shared_dir, f"{os.getpid()}.json")
+        # Written aside and renamed, so readers never see half a file
+        partial = f"{path}.{threading.get_ident()}.tmp"
+        with open(partial, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(partial, path)
+
+    def merge_snapshots(self, shared_dir: str) -> list[Metric]:
+        # This worker's own snapshot is written first so the scrape is current for it
+        self.write_snapshot(shared_dir)
+        merged = {
+            name: metric.empty_copy(("worker",) if isinstance(metric, Gauge) else ())
+            for name, metric in self._metrics.items()
+        }
+        for path in sorted(glob.glob(os.path.join(shared_dir, "*.json"))):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            live = _alive(snapshot["pid"])
+            for name, dumped in snapshot["metrics"].items():
+                metric = merged.get(name)
+                if metric is None:
+                    continue
+                if isinstance(metric, Gauge):
+                    if live:
+                        metric.absorb(dumped, (snapshot["worker"],))
+                else:
+                    metric.absorb(dumped)
+        return list(merged.values())
+
+    def start_sharing(self, interval: float = METRICS_FLUSH_SECONDS) -> None:
+        shared_dir = os.getenv(SHARED_DIR_ENV)
+        if not shared_dir or self._sharing is not None:
+            return
+        stop = threading.Event()
+
+        def flush() -> None:
+            while not stop.wait(interval):
+                try:
+                    self.collect()
+                    self.write_snapshot(shared_dir)
+                except Exception as e:
+                    print(f"[METRICS] Snapshot failed: {repr(e)}")
+
+        self._sharing = stop
+        threading.Thread(target=flush, name="metrics-snapshot", daemon=True).start()
+
+    def stop_sharing(self) -> None:
+        # Final snapshot, so what this worker counted outlives it
+        shared_dir = os.getenv(SHARED_DIR_ENV)
+        if self._sharing is None or not shared_dir:
+            return
+        self._sharing.set()
+        self._sharing = None
+        self.collect()
+        self.write_snapshot(shared_dir)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter("orbit_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_LATENCY = registry.histogram("orbit_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+DB_QUERY_LATENCY = registry.histogram(
+    "orbit_db_query_duration_seconds", "Database statement time by the route that issued it.", ("route",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+DB_POOL = registry.gauge("orbit_db_pool_connections", "Database pool connections by state.", ("state",))
+
+GEMINI_LATENCY = registry.histogram("orbit_gemini_request_duration_seconds", "Gemini generate_content latency by model and outcome.", ("model", "outcome"))
+GEMINI_KEY_REQUESTS = registry.counter("orbit_gemini_key_requests_total", "Gemini calls per API key by outcome (ok, quota, error).", ("key", "outcome"))
+GEMINI_KEY_EXHAUSTED = registry.gauge("orbit_gemini_key_exhausted", "1 while the key's last call hit its quota.", ("key",))
+GEMINI_PROMPT_TOKENS = registry.histogram(
+    "orbit_gemini_prompt_tokens", "Estimated prompt tokens per Gemini call by endpoint.", ("endpoint",),
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+GEMINI_PROMPT_TRIMMED = registry.counter("orbit_gemini_prompt_trimmed_total", "Prompts whose content was compressed to fit the input budget.", ("endpoint",))
+
+UNSTRUCTURED_STAGE_LATENCY = registry.histogram(
+    "orbit_unstructured_stage_duration_seconds", "Unstructured job stage latency (create, wait, download).", ("stage",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+UNSTRUCTURED_JOBS = registry.counter("orbit_unstructured_jobs_total", "Unstructured jobs by final status.", ("status",))
+
+PIPER_LATENCY = registry.histogram("orbit_piper_synthesis_duration_seconds", "Piper synthesis time per phrase by outcome.", ("outcome",))
+TTS_CACHE = registry.counter("orbit_tts_cache_requests_total", "TTS lookups answered from cache (hit) or Piper (miss).", ("result",))
+TEACHING_CACHE = registry.counter("orbit_teaching_blocks_cache_total", "Teaching block lookups served from teaching_blocks (hit) or Gemini (miss).", ("result",))
+
+# The ASGI scope of the request being served. Starlette's router adds the
+# matched route to it in place, so code further down (the SQLAlchemy hooks)
+# can label by route template rather than raw path.
+current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+
+
+def route_label(scope: Optional[dict]) -> str:
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def key_label(api_key: str) -> str:
+    return f"...{api_key[-4:]}"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        token = current_scope.set(scope)
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_scope.reset(token)
+            route = route_label(scope)
+            HTTP_LATENCY.observe(elapsed, method=scope["method"], route=route)
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status)
+
+
+def instrument_engine(engine) -> None:
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        DB_QUERY_LATENCY.observe(time.perf_counter() - started, route=route_label(current_scope.get()))
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
+
+    def collect_pool() -> None:
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            return
+        DB_POOL.set(pool.size(), state="size")
+        DB_POOL.set(pool.checkedout(), state="checked_out")
+        DB_POOL.set(pool.checkedin(), state="idle")
+        DB_POOL.set(max(0, pool.overflow()), state="overflow")
+
+    registry.add_collector(collect_pool)
@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import asyncio
+from typing import Optional
+
+from services.tts_service import tts_service
+from services.phrase_store import phrase_key
+
+NARRATION_PREGENERATE = os.getenv("TTS_PREGENERATE_NARRATION", "1") == "1"
+NARRATION_EXT = "narration.json"
+
+_running: dict[str, asyncio.Task] = {}
+
+# Spoken scripts mirror VoiceContentConverter.ts at 'normal' verbosity so the
+# frontend's per-segment requests land on the audio generated here. JS \w is
+# ASCII-only, hence re.ASCII on the word-boundary patterns.
+
+_MARKDOWN = [
+    (re.compile(r"\*\*(.*?)\*\*"), r"\1"),
+    (re.compile(r"\*(.*?)\*"), r"\1"),
+    (re.compile(r"`(.*?)`"), r"\1"),
+    (re.compile(r"\[(.*?)\]\(.*?\)"), r"\1"),
+]
+
+_FORMULA = [
+    (re.compile(r"(\w)\^2", re.ASCII), r"\1 squared"),
+    (re.compile(r"(\w)\^3", re.ASCII), r"\1 cubed"),
+    (re.compile(r"(\w)\^(\d+)", re.ASCII), r"\1 to the power of \2"),
+    (re.compile(r"(\w)\^(\w)", re.ASCII), r"\1 to the power of \2"),
+    (re.compile(r"sqrt\((.*?)\)", re.IGNORECASE), r"square root of \1"),
+    (re.compile(r"√\((.*?)\)"), r"square root of \1"),
+    (re.compile(r"√(\w)", re.ASCII), r"square root of \1"),
+    (re.compile(r"\bpi\b", re.IGNORECASE | re.ASCII), "pie"),
+    (re.compile(r"π"), "pie"),
+    (re.compile(r"θ"), "theta"),
+    (re.compile(r"α"), "alpha"),
+    (re.compile(r"β"), "beta"),
+    (re.compile(r"γ"), "gamma"),
+    (re.compile(r"Δ"), "delta"),
+    (re.compile(r"δ"), "delta"),
+    (re.compile(r"λ"), "lambda"),
+    (re.compile(r"μ"), "mu"),
+    (re.compile(r"σ"), "sigma"),
+    (re.compile(r"Σ"), "sigma"),
+    (re.compile(r"ω"), "omega"),
+    (re.compile(r"∞"), "infinity"),
+    (re.compile(r"∫"), "integral of"),
+    (re.compile(r"∑"), "sum of"),
+    (re.compile(r"∏"), "product of"),
+    (re.compile(r"≈"), "is approximately equal to"),
+    (re.compile(r"≠"), "is not equal to"),
+    (re.compile(r"≤"), "is less than or equal to"),
+    (re.compile(r"≥"), "is greater than or equal to"),
+    (re.compile(r"<="), "is less than or equal to"),
+    (re.compile(r">="), "is greater than or equal to"),
+    (re.compile(r"<"), "is less than"),
+    (re.compile(r">"), "is greater than"),
+    (re.compile(r"="), " equals "),
+    (re.compile(r"\+"), " plus "),
+    (re.compile(r"(?<!\w)-(?!\w)", re.ASCII), " minus "),
+    (re.compile(r"\*"), " times "),
+    (re.compile(r"×"), " times "),
+    (re.compile(r"÷"), " divided by "),
+    (re.compile(r"/"), " over "),
+    (re.compile(r"\("), ", open parenthesis, "),
+    (re.compile(r"\)"), ", close parenthesis, "),
+    (re.compile(r"\["), ", open bracket, "),
+    (re.compile(r"\]"), ", close bracket, "),
+    (re.compile(r"\{"), ", open brace, "),
+    (re.compile(r"\}"), ", close brace, "),
+    (re.compile(r","), ", "),
+    (re.compile(r"\s+"), " "),
+]
+
+ORDINALS = ["First", "Second", "Third", "Fourth", "Fifth", "Sixth", "Seventh", "Eighth", "Ninth", "Tenth"]
+
+
+def clean_markdown(content: str) -> str:
+    for pattern, replacement in _MARKDOWN:
+        content = pattern.sub(replacement, content)
+    return content.strip()
+
+
+def verbalize_formula(formula: str) -> str:
+    for pattern, replacement in _FORMULA:
+        formula = pattern.sub(replacement, formula)
+    return formula.strip()
+
+
+def block_to_script(block: dict, index: int, total: int) -> list[dict]:
+    scripts = []
+    block_type = block.get("type")
+
+    if block_type == "paragraph":
+        scripts.append({"text": clean_markdown(block.get("content") or ""), "pause_after": 500})
+    elif block_type == "formula":
+        scripts.append({"text": "Here is a formula:", "pause_after": 300})
+        scripts.append({"text": verbalize_formula(block.get("formula") or ""), "pause_after": 600})
+        if block.get("explanation"):
+            scripts.append({"text": clean_markdown(block["explanation"]), "pause_after": 500})
+    elif block_type == "insight":
+        scripts.append({"text": f"Key insight: {clean_markdown(block.get('content') or '')}", "pause_after": 600})
+    elif block_type == "list":
+        items = block.get("items") or []
+        scripts.append({"text": f"Here are {len(items)} points:", "pause_after": 300})
+        for i, item in enumerate(items):
+            ordinal = ORDINALS[i] if i < len(ORDINALS) else f"Number {i + 1}"
+            scripts.append({"text": f"{ordinal}: {clean_markdown(item)}", "pause_after": 400})
+    elif block_type == "simulation":
+        scripts.append({"text": f"There is an interactive simulation: {clean_markdown(block.get('description') or '')}", "pause_after": 400})
+        scripts.append({"text": "You can explore it on screen. Say next to continue.", "pause_after": 300})
+    elif block_type == "question":
+        scripts.append({"text": "Question time!", "pause_after": 400})
+        scripts.append({"text": clean_markdown(block.get("question") or ""), "pause_after": 600})
+        if block.get("questionType") == "mcq" and block.get("options"):
+            scripts.append({"text": "Your options are:", "pause_after": 300})
+            for i, option in enumerate(block["options"]):
+                scripts.append({"text": f"{chr(65 + i)}: {clean_markdown(option)}", "pause_after": 400})
+            scripts.append({"text": "Say the letter of your answer, like A, B, C, or D.", "pause_after": 400})
+        elif block.get("questionType") == "fill_in_blank":
+            scripts.append({"text": "Speak your answer when ready.", "pause_after": 400})
+
+    if index < total - 1:
+        scripts.append({"text": "Say next to continue, or repeat to hear again.", "pause_after": 300})
+    else:
+        scripts.append({"text": "This is the last section. Say next to complete the lesson.", "pause_after": 300})
+
+    return [s for s in scripts if s["text"]]
+
+
+def lesson_segments(blocks: list[dict]) -> list[dict]:
+    segments = []
+    for index, block in enumerate(blocks):
+        for script in block_to_script(block, index, len(blocks)):
+            segments.append({"block_index": index, **script})
+    return segments
+
+
+def get_narration_manifest(subtopic_id: str) -> Optional[dict]:
+    data = tts_service.cache.get(subtopic_id, NARRATION_EXT)
+    return json.loads(data) if data else None
+
+
+async def narrate_lesson(subtopic_id: str, blocks: list[dict], rate: float = 1.0) -> dict:
+    segments = lesson_segments(blocks)
+    audio = await tts_service.synthesize_batch([s["text"] for s in segments], rate)
+
+    for segment, audio_data in zip(segments, audio):
+        key = phrase_key(segment["text"], tts_service.voice, rate)
+        segment["key"] = key
+        segment["url"] = f"/api/voice/audio/{key}"
+        segment["cached"] = bool(audio_data)
+
+    manifest = {
+        "subtopic_id": subtopic_id,
+        "voice": tts_service.voice,
+        "rate": rate,
+        "segments": segments,
+    }
+    tts_service.cache.put(subtopic_id, json.dumps(manifest).encode("utf-8"), NARRATION_EXT)
+    print(f"[NARRATION] {subtopic_id}: {sum(s['cached'] for s in segments)}/{len(segments)} segments ready")
+    return manifest
+
+
+def schedule_narration(subtopic_id: str, blocks: list[dict]) -> asyncio.Task:
+    # One narration job per lesson at a time; later callers join the running one
+    task = _running.get(subtopic_id)
+    if task is None or task.done():
+        task = asyncio.create_task(narrate_lesson(subtopic_id, blocks))
+        task.add_done_callback(lambda t: _running.pop(subtopic_id) if _running.get(subtopic_id) is t else None)
+        _running[subtopic_id] = task
+    return task
+
+
+async def pregenerate_narration(subtopic_id: str, blocks: list[dict]) -> None:
+    try:
+        await schedule_narration(subtopic_id, blocks)
+    except Exception as e:
+        print(f"[NARRATION] Failed for {subtopic_id}: {repr(e)}")
+
+
+async def drain_narration(timeout: float) -> int:
+    # Lets lessons being narrated finish so their manifests are written
+    pending = [task for task in _running.values() if not task.done()]
+    if not pending:
+        return 0
+    _, not_done = await asyncio.wait(pending, timeout=timeout)
+    return len(not_done)
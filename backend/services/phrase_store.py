@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Iterable, Optional
+
+from services.tts_cache import AudioCache
+
+BACKEND_DIR = Path(__file__).parent.parent
+PHRASE_STORE_DIR = Path(os.getenv("PHRASE_STORE_DIR", str(BACKEND_DIR / "tts_cache")))
+STATIC_VOICE_CACHE_DIR = Path(os.getenv(
+    "STATIC_VOICE_CACHE_DIR",
+    str(BACKEND_DIR.parent / "frontend" / "public" / "voice_cache")
+))
+MANIFEST_FILENAME = "manifest.json"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+# Must stay in sync with normalizePhrase in frontend/src/lib/voice/PiperVoiceEngine.ts
+def normalize_phrase(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE.sub(" ", text.lower()).strip()
+
+
+def voice_id(model_path: str) -> str:
+    # The model file name, so the build script and the container agree no
+    # matter where the .onnx lives on disk
+    name = Path(model_path).name
+    return name[:-len(".onnx")] if name.endswith(".onnx") else name
+
+
+def phrase_key(text: str, voice: str, rate: float = 1.0) -> str:
+    content = f"{normalize_phrase(text)}|{voice}|{rate:.2f}"
+    return hashlib.md5(content.encode("utf-8")).hexdigest()
+
+
+def phrase_filename(key: str) -> str:
+    return AudioCache.entry_name(key, "wav")
+
+
+def import_static_file(cache: AudioCache, key: str, static_dir: Optional[Path] = STATIC_VOICE_CACHE_DIR) -> Optional[bytes]:
+    # Exported phrases are named by key, so a miss in the store can be
+    # satisfied from the static bundle with a single path lookup
+    if static_dir is None:
+        return None
+    try:
+        audio_data = (static_dir / phrase_filename(key)).read_bytes()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    cache.put(key, audio_data)
+    return audio_data
+
+
+def export_manifest(
+        cache: AudioCache,
+        phrases: Iterable[str],
+        voice: str,
+        output_dir: Path = STATIC_VOICE_CACHE_DIR,
+        rate: float = 1.0,
+) -> dict[str, str]:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+    for phrase in phrases:
+        key = phrase_key(phrase, voice, rate)
+        audio_data = cache.get(key)
+        if not audio_data:
+            continue
+        filename = phrase_filename(key)
+        target = output_dir / filename
+        if not target.exists():
+            tmp_path = target.with_suffix(".tmp")
+            tmp_path.write_bytes(audio_data)
+            os.replace(tmp_path, target)
+        manifest[normalize_phrase(phrase)] = filename
+
+    with open(output_dir / MANIFEST_FILENAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    for stale in output_dir.glob("*.wav"):
+        if stale.name not in manifest.values():
+            stale.unlink()
+
+    return manifest
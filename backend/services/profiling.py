@@ -0,0 +1,318 @@
+import asyncio
+import glob
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Opt-in request profiling. A sampled or explicitly requested request runs
+# with a background thread that snapshots every thread's Python stack at a
+# fixed interval; the result is stored as folded stacks ("a;b;c 42"), which
+# flamegraph.pl, speedscope and inferno read directly. Requests that are not
+# profiled pay one header lookup and one random() call.
+#
+# The event loop thread interleaves every in-flight request, so its samples are
+# kept only when the profiled request's own frames are on the stack. Samples
+# from other threads (the threadpool running sync endpoints and to_thread work)
+# can't be tied to a request; they are kept under a "<thread> [process-wide]"
+# root and counted separately as thread_samples.
+#
+# Under serve.py, ORBIT_PROFILE_DIR names a directory all workers share: stored
+# profiles live there so any worker can list and serve them, and the runtime
+# toggle is written there and picked up by every worker within POLL_SECONDS.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Leaf frames in these files belong to parked threads (idle pool workers)
+IDLE_FILES = ("threading.py", "queue.py")
+REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+SETTINGS_FILE = "settings.json"
+POLL_SECONDS = 1.0
+
+
+def _write_atomic(path: str, content: str) -> None:
+    partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(partial, "w") as f:
+        f.write(content)
+    os.replace(partial, path)
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    if path.startswith(BACKEND_DIR):
+        path = os.path.relpath(path, BACKEND_DIR)
+    else:
+        path = os.path.basename(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    def __init__(self, interval: float = 0.005, loop_thread: Optional[int] = None, request_frame=None):
+        self.interval = interval
+        # With both set, loop_thread samples count only while request_frame is running
+        self.loop_thread = loop_thread
+        self.request_frame = request_frame
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.request_samples = 0
+        self.thread_samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own or frame.f_code.co_filename.endswith(IDLE_FILES):
+                    continue
+                stack = []
+                ours = False
+                while frame is not None:
+                    ours = ours or frame is self.request_frame
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                name = names.get(ident, str(ident))
+                if self.request_frame is None or ident != self.loop_thread:
+                    if self.request_frame is not None:
+                        name += " [process-wide]"
+                    self.thread_samples += 1
+                elif ours:
+                    self.request_samples += 1
+                else:
+                    # The loop was running another request
+                    continue
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    # In memory, or with a directory as a .profile (metadata) and .folded
+    # (stacks) file per profile, newest kept by mtime
+    def __init__(self, max_entries: int = 50, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._profiles: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str, ext: str) -> Optional[str]:
+        # Ids come from the URL on reads, so only well-formed ones map to files
+        if not REQUEST_ID.match(profile_id):
+            return None
+        return os.path.join(self.directory, f"{profile_id}.{ext}")
+
+    def _stored(self) -> list[str]:
+        # Oldest first
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*.profile")):
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        return [path for _, path in sorted(entries)]
+
+    def _remove(self, profile_path: str) -> None:
+        for path in (profile_path, profile_path[:-len(".profile")] + ".folded"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def put(self, profile_id: str, profile: dict) -> None:
+        if self.directory is None:
+            with self._lock:
+                self._profiles[profile_id] = profile
+                while len(self._profiles) > self.max_entries:
+                    self._profiles.popitem(last=False)
+            return
+        meta = {k: v for k, v in profile.items() if k != "folded"}
+        _write_atomic(self._path(profile_id, "folded"), profile["folded"])
+        # Metadata last, so a listed profile is always complete
+        _write_atomic(self._path(profile_id, "profile"), json.dumps(meta))
+        for path in self._stored()[:-self.max_entries]:
+            self._remove(path)
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        if self.directory is None:
+            return self._profiles.get(profile_id)
+        path = self._path(profile_id, "profile")
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                meta = json.load(f)
+            with open(self._path(profile_id, "folded")) as f:
+                return {**meta, "folded": f.read()}
+        except (OSError, ValueError):
+            return None
+
+    def list(self) -> list[dict]:
+        if self.directory is None:
+            with self._lock:
+                profiles = list(self._profiles.items())
+            return [
+                {"id": profile_id, **{k: v for k, v in profile.items() if k != "folded"}}
+                for profile_id, profile in reversed(profiles)
+            ]
+        listed = []
+        for path in reversed(self._stored()):
+            try:
+                with open(path) as f:
+                    listed.append({"id": os.path.basename(path)[:-len(".profile")], **json.load(f)})
+            except (OSError, ValueError):
+                continue
+        return listed
+
+    def clear(self) -> None:
+        if self.directory is None:
+            with self._lock:
+                self._profiles.clear()
+            return
+        for path in self._stored():
+            self._remove(path)
+
+
+class ProfilingState:
+    def __init__(self):
+        self.sample_rate = 0.0
+        self.interval_ms = 5.0
+        self.admin_token: Optional[str] = None
+        self.store = ProfileStore()
+        # The sampler sees every thread, so only one request is profiled at a time
+        self._busy = threading.Lock()
+        self.shared_dir: Optional[str] = None
+        self._settings_mtime: Optional[int] = None
+        self._polled = 0.0
+
+    def share(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.shared_dir = directory
+        self.store.directory = directory
+
+    def update(self, sample_rate: Optional[float] = None, interval_ms: Optional[float] = None) -> None:
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if interval_ms is not None:
+            self.interval_ms = interval_ms
+        if self.shared_dir:
+            _write_atomic(
+                os.path.join(self.shared_dir, SETTINGS_FILE),
+                json.dumps({"sample_rate": self.sample_rate, "interval_ms": self.interval_ms})
+            )
+
+    def poll(self) -> None:
+        # One stat per POLL_SECONDS; the file only exists once an admin has changed something
+        now = time.monotonic()
+        if not self.shared_dir or now - self._polled < POLL_SECONDS:
+            return
+        self._polled = now
+        path = os.path.join(self.shared_dir, SETTINGS_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            if mtime == self._settings_mtime:
+                return
+            with open(path) as f:
+                settings = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._settings_mtime = mtime
+        self.sample_rate = settings["sample_rate"]
+        self.interval_ms = settings["interval_ms"]
+
+    def snapshot(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval_ms,
+            "stored": len(self.store.list()),
+            "max_stored": self.store.max_entries,
+        }
+
+
+profiling = ProfilingState()
+
+
+def is_admin(token: Optional[str], state: ProfilingState) -> bool:
+    return bool(state.admin_token and token) and secrets.compare_digest(token, state.admin_token)
+
+
+def wants_profile(headers: Headers, state: ProfilingState) -> bool:
+    state.poll()
+    requested = headers.get("x-profile")
+    if requested and is_admin(headers.get("x-admin-token"), state):
+        return requested not in ("0", "false")
+    return state.sample_rate > 0 and random.random() < state.sample_rate
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, state: ProfilingState = profiling):
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not wants_profile(Headers(scope=scope), self.state):
+            await self.app(scope, receive, send)
+            return
+        if not self.state._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("x-request-id", "")
+        profile_id = request_id if REQUEST_ID.match(request_id) else uuid.uuid4().hex
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        sampler = StackSampler(
+            self.state.interval_ms / 1000,
+            loop_thread=threading.get_ident(),
+            request_frame=sys._getframe(),
+        )
+        started_at = time.time()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Joining waits up to one interval; keep that off the event loop
+            await asyncio.to_thread(sampler.stop)
+            self.state._busy.release()
+            route = scope.get("route")
+            await asyncio.to_thread(self.state.store.put, profile_id, {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": status,
+                "started_at": started_at,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "samples": sampler.samples,
+                "request_samples": sampler.request_samples,
+                "thread_samples": sampler.thread_samples,
+                "folded": sampler.folded(),
+            })
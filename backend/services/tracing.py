@@ -0,0 +1,183 @@
+import json
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+except ImportError:  # optional; traces still go to the response and PARSE_TRACE_FILE
+    otel_trace = None
+
+# Span tracing for request pipelines (upload parsing). Spans nest through a
+# contextvar, so stages only need `with span(...)`; outside a trace they are
+# no-ops. A finished trace is summarized for the response, appended to
+# PARSE_TRACE_FILE as JSON lines and, when the OpenTelemetry SDK and OTLP
+# exporter are installed and OTEL_EXPORTER_OTLP_ENDPOINT is set, exported.
+
+TRACE_FILE = os.getenv("PARSE_TRACE_FILE")
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.attributes = dict(attributes)
+        self.children: list[Span] = []
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self.duration = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    @contextmanager
+    def timer(self, name: str):
+        # Accumulates time for work repeated inside one span (per-element
+        # cleaning, similarity calls) without a child span per call
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.attributes[f"{name}_ms"] = self.attributes.get(f"{name}_ms", 0.0) + (time.perf_counter() - started) * 1000
+            self.attributes[f"{name}_calls"] = self.attributes.get(f"{name}_calls", 0) + 1
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._started
+
+    @property
+    def end_ns(self) -> int:
+        return self.start_ns + int((self.duration or 0) * 1e9)
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    attributes: dict = {}
+
+    def set(self, **attributes) -> None:
+        pass
+
+    @contextmanager
+    def timer(self, name: str):
+        yield
+
+
+NOOP_SPAN = _NoopSpan()
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span():
+    return _current.get() or NOOP_SPAN
+
+
+@contextmanager
+def span(name: str, **attributes):
+    parent = _current.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    child = Span(name, parent.trace_id, parent, **attributes)
+    parent.children.append(child)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = repr(e)
+        raise
+    finally:
+        child.finish()
+        _current.reset(token)
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    root = Span(name, secrets.token_hex(16), **attributes)
+    token = _current.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.error = repr(e)
+        raise
+    finally:
+        root.finish()
+        _current.reset(token)
+        export(root)
+
+
+def summarize(root: Span) -> dict:
+    return {
+        "trace_id": root.trace_id,
+        "total_ms": round((root.duration or 0) * 1000, 2),
+        "spans": [
+            {
+                "name": s.name,
+                "depth": s.depth,
+                "duration_ms": round((s.duration or 0) * 1000, 2),
+                "attributes": {k: round(v, 2) if isinstance(v, float) else v for k, v in s.attributes.items()},
+            }
+            for s in root.walk()
+        ],
+    }
+
+
+_file_lock = Lock()
+_otel_tracer = None
+
+
+def _get_otel_tracer():
+    global _otel_tracer
+    if _otel_tracer is None and otel_trace is not None and os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "orbit-backend")}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        _otel_tracer = provider.get_tracer("orbit.parse")
+    return _otel_tracer
+
+
+def _export_otel(tracer, node: Span, parent_context=None) -> None:
+    otel_span = tracer.start_span(node.name, context=parent_context, start_time=node.start_ns, attributes=node.attributes)
+    if node.error:
+        otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, node.error))
+    context = otel_trace.set_span_in_context(otel_span)
+    for child in node.children:
+        _export_otel(tracer, child, context)
+    otel_span.end(end_time=node.end_ns)
+
+
+def export(root: Span) -> None:
+    try:
+        if TRACE_FILE:
+            lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in root.walk())
+            with _file_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(lines)
+        tracer = _get_otel_tracer()
+        if tracer is not None:
+            _export_otel(tracer, root)
+    except Exception as e:
+        print(f"[TRACE] Export failed: {repr(e)}")
@@ -0,0 +1,306 @@
+import os
+import time
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+TTS_CACHE_MAX_BYTES = int(float(os.getenv("TTS_CACHE_MAX_MB", "512")) * 1024 * 1024)
+TTS_MEMORY_CACHE_BYTES = int(float(os.getenv("TTS_MEMORY_CACHE_MB", "32")) * 1024 * 1024)
+INDEX_FILENAME = "index.sqlite3"
+# Hits are written to the index in batches: every this many phrases, or this
+# often, and always before eviction picks victims
+ACCESS_FLUSH_BATCH = 64
+ACCESS_FLUSH_SECONDS = 5.0
+# Oldest entries fetched per round while evicting
+EVICT_BATCH = 32
+
+
+class MemoryLRU:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+
+    def get(self, name: str) -> Optional[bytes]:
+        data = self._items.get(name)
+        if data is not None:
+            self._items.move_to_end(name)
+        return data
+
+    def put(self, name: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        self.discard(name)
+        self._items[name] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.size -= len(evicted)
+
+    def discard(self, name: str) -> None:
+        old = self._items.pop(name, None)
+        if old is not None:
+            self.size -= len(old)
+
+    def clear(self) -> None:
+        self._items.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# In-memory LRU of hot phrases in front of a size-capped, sharded disk store.
+# Entries are tracked in a small SQLite index so stats and eviction never
+# have to scan the directory; a one-row totals table keeps the entry count and
+# byte total in step with it, so a write never sums the index. serve.py forks
+# workers after building the service, and SQLite connections must not cross
+# fork(), so each process opens its own index connection on first use. The
+# index is shared by all workers, so counts and the size budget are read from
+# it, not kept per process.
+class AudioCache:
+    def __init__(
+            self,
+            cache_dir: Path,
+            max_bytes: int = TTS_CACHE_MAX_BYTES,
+            memory_bytes: int = TTS_MEMORY_CACHE_BYTES,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.memory = MemoryLRU(memory_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._inherited: list[sqlite3.Connection] = []
+        # name -> [last access time, hits] not yet in the index
+        self._accessed: dict[str, list] = {}
+        self._flushed_at = time.monotonic()
+
+        db = self._connect()
+        try:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    name TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    entries INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                )
+            """)
+            # Indexes written before the totals table are counted once here
+            db.execute("INSERT OR IGNORE INTO totals (id, entries, bytes) SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM entries")
+            db.commit()
+            self._adopt_legacy_files(db)
+        finally:
+            db.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self.cache_dir / INDEX_FILENAME), timeout=30, check_same_thread=False)
+        # Workers read while another writes
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            if self._conn is not None:
+                # Opened before a fork: closing it here could disturb the
+                # parent's locks, so it is only set aside
+                self._inherited.append(self._conn)
+            self._conn = self._connect()
+            self._pid = os.getpid()
+        return self._conn
+
+    def _totals(self) -> tuple[int, int]:
+        return self._db.execute("SELECT entries, bytes FROM totals").fetchone()
+
+    def totals(self) -> tuple[int, int]:
+        with self._lock:
+            return self._totals()
+
+    @property
+    def count(self) -> int:
+        return self.totals()[0]
+
+    @property
+    def size(self) -> int:
+        return self.totals()[1]
+
+    @staticmethod
+    def entry_name(key: str, ext: str = "wav") -> str:
+        return f"{key}.{ext}"
+
+    def _path_for(self, name: str) -> Path:
+        return self.cache_dir / name[:2] / name
+
+    def _adopt_legacy_files(self, db: sqlite3.Connection) -> None:
+        # Earlier versions wrote every file flat into cache_dir; move them
+        # into their shard and index them once
+        legacy = [p for p in self.cache_dir.iterdir()
+                  if p.is_file() and not p.name.startswith(INDEX_FILENAME)]
+        if not legacy:
+            return
+        now = time.time()
+        for path in legacy:
+            target = self._path_for(path.name)
+            target.parent.mkdir(exist_ok=True)
+            os.replace(path, target)
+            db.execute(
+                "INSERT OR REPLACE INTO entries (name, size, last_access) VALUES (?, ?, ?)",
+                (path.name, target.stat().st_size, now)
+            )
+        db.execute("UPDATE totals SET entries = (SELECT COUNT(*) FROM entries), bytes = (SELECT COALESCE(SUM(size), 0) FROM entries)")
+        db.commit()
+
+    def get(self, key: str, ext: str = "wav") -> Optional[bytes]:
+        name = self.entry_name(key, ext)
+        with self._lock:
+            data = self.memory.get(name)
+        if data is None:
+            # Read outside the lock so concurrent hits don't queue behind disk I/O
+            try:
+                data = self._path_for(name).read_bytes()
+            except FileNotFoundError:
+                with self._lock:
+                    self.misses += 1
+                return None
+            with self._lock:
+                self.memory.put(name, data)
+
+        with self._lock:
+            # Memory hits count too, or the hottest phrases would look oldest
+            # to eviction
+            self.hits += 1
+            access = self._accessed.setdefault(name, [0.0, 0])
+            access[0] = time.time()
+            access[1] += 1
+            if len(self._accessed) >= ACCESS_FLUSH_BATCH or time.monotonic() - self._flushed_at >= ACCESS_FLUSH_SECONDS:
+                self._flush_access_locked()
+                self._db.commit()
+            return data
+
+    def _flush_access_locked(self) -> None:
+        self._flushed_at = time.monotonic()
+        if not self._accessed:
+            return
+        self._db.executemany(
+            "UPDATE entries SET last_access = MAX(last_access, ?), hits = hits + ? WHERE name = ?",
+            [(last_access, hits, name) for name, (last_access, hits) in self._accessed.items()]
+        )
+        self._accessed.clear()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_access_locked()
+            self._db.commit()
+
+    def put(self, key: str, data: bytes, ext: str = "wav") -> None:
+        if not data:
+            return
+        name = self.entry_name(key, ext)
+        path = self._path_for(name)
+        path.parent.mkdir(exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            db = self._db
+            if db.in_transaction:
+                db.commit()
+            # Takes the write lock up front so the old size read below can't
+            # go stale under another worker before the totals move
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                old = db.execute("SELECT size FROM entries WHERE name = ?", (name,)).fetchone()
+                db.execute(
+                    "INSERT OR REPLACE INTO entries (name, size, last_access) VALUES (?, ?, ?)",
+                    (name, len(data), time.time())
+                )
+                db.execute(
+                    "UPDATE totals SET entries = entries + ?, bytes = bytes + ?",
+                    (0 if old else 1, len(data) - (old[0] if old else 0))
+                )
+                self.memory.put(name, data)
+                self._evict_locked()
+                db.commit()
+            except BaseException:
+                db.rollback()
+                raise
+
+    def _evict_locked(self) -> None:
+        size = self._totals()[1]
+        if size <= self.max_bytes:
+            return
+        self._flush_access_locked()
+        while size > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT name, size FROM entries ORDER BY last_access ASC LIMIT ?", (EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+            evicted = []
+            for name, entry_size in rows:
+                if size <= self.max_bytes:
+                    break
+                evicted.append((name,))
+                size -= entry_size
+                self.memory.discard(name)
+                try:
+                    self._path_for(name).unlink()
+                except FileNotFoundError:
+                    pass
+            self._db.executemany("DELETE FROM entries WHERE name = ?", evicted)
+            self._db.execute(
+                "UPDATE totals SET entries = entries - ?, bytes = bytes - ?",
+                (len(evicted), sum(entry_size for _, entry_size in rows[:len(evicted)]))
+            )
+
+    def clear(self) -> int:
+        with self._lock:
+            names = [row[0] for row in self._db.execute("SELECT name FROM entries")]
+            for name in names:
+                try:
+                    self._path_for(name).unlink()
+                except FileNotFoundError:
+                    pass
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("UPDATE totals SET entries = 0, bytes = 0")
+            self._db.commit()
+            self._accessed.clear()
+            self.memory.clear()
+            return len(names)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        count, size = self.totals()
+        return {
+            "cached_files": count,
+            "total_size_bytes": size,
+            "max_size_bytes": self.max_bytes,
+            "memory_entries": len(self.memory),
+            "memory_size_bytes": self.memory.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
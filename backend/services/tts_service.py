@@ -1,53 +1,110 @@
 import os
-import hashlib
 import sys
 from pathlib import Path
 from typing import Optional
 import subprocess
 import tempfile
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from services.tts_cache import AudioCache
+from services.audio_encoding import AUDIO_FORMATS, encode_wav
+from services.metrics import PIPER_LATENCY, TTS_CACHE
+from services.phrase_store import PHRASE_STORE_DIR, STATIC_VOICE_CACHE_DIR, phrase_key, voice_id, import_static_file
 
 PIPER_BINARY = os.getenv("PIPER_BINARY_PATH", "piper")
 PIPER_MODEL = os.getenv("PIPER_MODEL_PATH", "en_US-amy-medium.onnx")
-CACHE_DIR = Path(__file__).parent.parent / "tts_cache"
-CACHE_DIR.mkdir(exist_ok=True)
+TTS_MAX_WORKERS = max(1, int(os.getenv("TTS_MAX_WORKERS", str(min(4, os.cpu_count() or 1)))))
+CACHE_DIR = PHRASE_STORE_DIR
 
 class TTSService:
-    def __init__(self):
+    def __init__(self, cache_dir: Path = CACHE_DIR, static_dir: Optional[Path] = STATIC_VOICE_CACHE_DIR):
         self.model_path = PIPER_MODEL
-        self.cache_dir = CACHE_DIR
+        self.voice = voice_id(PIPER_MODEL)
+        self.cache = AudioCache(cache_dir)
+        self.static_dir = static_dir
         self._rate = 1.0
-        self._lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=TTS_MAX_WORKERS, thread_name_prefix="piper")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # cache_key -> future for syntheses already running, so concurrent
+        # requests for the same phrase share one Piper process
+        self._in_flight: dict[str, asyncio.Future] = {}
         
     def _get_cache_key(self, text: str, rate: float = 1.0) -> str:
-        content = f"{text}:{rate}:{self.model_path}"
-        return hashlib.md5(content.encode()).hexdigest()
+        return phrase_key(text, self.voice, rate)
     
     def _get_cached_audio(self, cache_key: str) -> Optional[bytes]:
-        cache_path = self.cache_dir / f"{cache_key}.wav"
-        if cache_path.exists():
-            return cache_path.read_bytes()
-        return None
+        cached = self.cache.get(cache_key)
+        if cached:
+            return cached
+        return import_static_file(self.cache, cache_key, self.static_dir)
     
     def _save_to_cache(self, cache_key: str, audio_data: bytes) -> None:
-        cache_path = self.cache_dir / f"{cache_key}.wav"
-        cache_path.write_bytes(audio_data)
+        self.cache.put(cache_key, audio_data)
     
-    async def synthesize(self, text: str, rate: float = 1.0) -> bytes:
+    async def synthesize(self, text: str, rate: float = 1.0, audio_format: str = "wav") -> bytes:
         if not text or not text.strip():
             return b""
         
         cache_key = self._get_cache_key(text, rate)
-        cached = self._get_cached_audio(cache_key)
-        if cached:
-            return cached
+        if audio_format != "wav":
+            encoded = self.cache.get(cache_key, AUDIO_FORMATS[audio_format]["ext"])
+            if encoded:
+                TTS_CACHE.inc(result="hit")
+                return encoded
         
-        audio_data = await self._generate_audio(text, rate)
+        wav_data = self._get_cached_audio(cache_key)
+        TTS_CACHE.inc(result="hit" if wav_data else "miss")
+        if not wav_data:
+            wav_data = await self._synthesize_miss(cache_key, text, rate)
         
-        if audio_data:
-            self._save_to_cache(cache_key, audio_data)
+        return await self._encode(cache_key, wav_data, audio_format)
+    
+    async def get_audio(self, cache_key: str, audio_format: str = "wav") -> Optional[bytes]:
+        # Lookup by key only, for audio that was synthesized ahead of time
+        if audio_format != "wav":
+            encoded = self.cache.get(cache_key, AUDIO_FORMATS[audio_format]["ext"])
+            if encoded:
+                return encoded
         
-        return audio_data
+        wav_data = self._get_cached_audio(cache_key)
+        if not wav_data:
+            return None
+        return await self._encode(cache_key, wav_data, audio_format)
+    
+    async def _encode(self, cache_key: str, wav_data: bytes, audio_format: str) -> bytes:
+        # Falls back to the WAV bytes if encoding fails; callers sniff the
+        # actual format from the payload
+        if audio_format == "wav" or not wav_data:
+            return wav_data
+        
+        loop = asyncio.get_running_loop()
+        encoded = await loop.run_in_executor(self._executor, encode_wav, wav_data, audio_format)
+        if not encoded:
+            return wav_data
+        
+        self.cache.put(cache_key, encoded, AUDIO_FORMATS[audio_format]["ext"])
+        return encoded
+    
+    async def _synthesize_miss(self, cache_key: str, text: str, rate: float) -> bytes:
+        pending = self._in_flight.get(cache_key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[cache_key] = future
+        try:
+            audio_data = await self._generate_audio(text, rate)
+            if audio_data:
+                self._save_to_cache(cache_key, audio_data)
+            future.set_result(audio_data)
+            return audio_data
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a batch with no other waiters doesn't log it
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(cache_key, None)
     
     def _generate_audio_sync(self, text: str, rate: float = 1.0) -> bytes:
         output_path = None
@@ -104,28 +161,64 @@ class TTSService:
                     pass
 
     async def _generate_audio(self, text: str, rate: float = 1.0) -> bytes:
-        async with self._lock:
-            loop = asyncio.get_event_loop()
-            return await loop.run_in_executor(None, self._generate_audio_sync, text, rate)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(TTS_MAX_WORKERS)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            with PIPER_LATENCY.time(outcome="ok") as labels:
+                audio_data = await loop.run_in_executor(self._executor, self._generate_audio_sync, text, rate)
+                if not audio_data:
+                    labels["outcome"] = "failed"
+            return audio_data
     
-    async def synthesize_batch(self, texts: list[str], rate: float = 1.0) -> list[bytes]:
-        results = []
+    async def synthesize_batch(self, texts: list[str], rate: float = 1.0, audio_format: str = "wav") -> list[bytes]:
+        # Dedupe by cache key, answer cache hits straight away and fan the
+        # misses out across the worker pool
+        resolved: dict[str, bytes] = {}
+        misses: dict[str, str] = {}
+        keys = []
+        
         for text in texts:
-            result = await self.synthesize(text, rate)
-            results.append(result)
-        return results
+            if not text or not text.strip():
+                keys.append(None)
+                continue
+            cache_key = self._get_cache_key(text, rate)
+            keys.append(cache_key)
+            if cache_key in resolved or cache_key in misses:
+                continue
+            cached = self.cache.get(cache_key, AUDIO_FORMATS[audio_format]["ext"])
+            if cached:
+                TTS_CACHE.inc(result="hit")
+                resolved[cache_key] = cached
+            else:
+                misses[cache_key] = text
+        
+        if misses:
+            generated = await asyncio.gather(
+                *(self.synthesize(text, rate, audio_format) for text in misses.values()),
+                return_exceptions=True
+            )
+            for key, audio in zip(misses, generated):
+                if isinstance(audio, BaseException):
+                    print(f"Batch synthesis failed for {key}: {repr(audio)}")
+                    audio = b""
+                resolved[key] = audio
+        
+        return [resolved.get(key, b"") if key else b"" for key in keys]
+    
+    async def drain(self, timeout: float) -> int:
+        # Waits for Piper jobs already running; returns how many were still pending
+        pending = list(self._in_flight.values())
+        if not pending:
+            return 0
+        _, not_done = await asyncio.wait(pending, timeout=timeout)
+        return len(not_done)
     
     def clear_cache(self) -> int:
-        count = 0
-        for cache_file in self.cache_dir.glob("*.wav"):
-            cache_file.unlink()
-            count += 1
-        return count
+        return self.cache.clear()
     
     def get_cache_size(self) -> tuple[int, int]:
-        files = list(self.cache_dir.glob("*.wav"))
-        total_size = sum(f.stat().st_size for f in files)
-        return len(files), total_size
+        return self.cache.totals()
 
 
 tts_service = TTSService()
@@ -154,5 +247,4 @@ COMMON_PHRASES = [
 ]
 
 async def precache_common_phrases():
-    for phrase in COMMON_PHRASES:
-        await tts_service.synthesize(phrase)
+    await tts_service.synthesize_batch(COMMON_PHRASES)
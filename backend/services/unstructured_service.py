@@ -8,6 +8,9 @@ load_dotenv()
 
 from fastapi import UploadFile, HTTPException
 
+from services.metrics import UNSTRUCTURED_JOBS, UNSTRUCTURED_STAGE_LATENCY
+from services.tracing import current_span, span
+
 from unstructured_client import UnstructuredClient
 from unstructured_client.models.operations import (
     CreateJobRequest,
@@ -24,6 +27,8 @@ if UNSTRUCTURED_API_KEY:
     UNSTRUCTURED_API_KEY = UNSTRUCTURED_API_KEY.strip().lstrip('=')
 if not UNSTRUCTURED_API_KEY:
     raise RuntimeError("UNSTRUCTURED_API_KEY is not set")
+# Points the client at another deployment (or benchmarks/fake_services.py)
+UNSTRUCTURED_API_URL = os.getenv("UNSTRUCTURED_API_URL") or None
 
 SUPPORTED_TYPES = {
     "application/pdf",
@@ -80,6 +85,8 @@ def run_on_demand_job(
             )
         )
 
+    current_span().set(files=len(input_files), bytes=sum(len(f.content) for f in input_files))
+
     response = client.jobs.create_job(
         request=CreateJobRequest(
             body_create_job=BodyCreateJob(
@@ -100,14 +107,17 @@ def poll_for_job_status(
     job_id: str,
 ) -> JobInformation:
 
+    polls = 0
     while True:
         job = client.jobs.get_job(
             request={"job_id": job_id}
         ).job_information
+        polls += 1
 
         if job.status in ("SCHEDULED", "IN_PROGRESS"):
             time.sleep(2.5)
         else:
+            current_span().set(polls=polls, status=getattr(job.status, "value", job.status))
             return job
 
 
@@ -128,11 +138,16 @@ def download_job_output(
         )
         outputs[file_id] = response.any
 
+    elements = [element for file_elements in outputs.values() for element in file_elements or []]
+    current_span().set(
+        elements=len(elements),
+        text_bytes=sum(len(element.get("text") or "") for element in elements),
+    )
     return outputs
 
 
 async def parse_files(files: List[UploadFile]) -> dict:
-    with UnstructuredClient(api_key_auth=UNSTRUCTURED_API_KEY) as client:
+    with UnstructuredClient(api_key_auth=UNSTRUCTURED_API_KEY, server_url=UNSTRUCTURED_API_URL) as client:
         vlm_partitioner_node = {
             "name": "Partitioner",
             "subtype": "unstructured_api",
@@ -148,22 +163,26 @@ async def parse_files(files: List[UploadFile]) -> dict:
             }
         }
 
-        job_id, input_file_ids = run_on_demand_job(
-            client=client,
-            uploaded_files=files,
-            job_nodes=[vlm_partitioner_node],
-        )
+        with span("unstructured.create_job"), UNSTRUCTURED_STAGE_LATENCY.time(stage="create"):
+            job_id, input_file_ids = run_on_demand_job(
+                client=client,
+                uploaded_files=files,
+                job_nodes=[vlm_partitioner_node],
+            )
 
-        job = poll_for_job_status(client, job_id)
+        with span("unstructured.poll_job", job_id=job_id), UNSTRUCTURED_STAGE_LATENCY.time(stage="wait"):
+            job = poll_for_job_status(client, job_id)
+        UNSTRUCTURED_JOBS.inc(status=getattr(job.status, "value", job.status))
 
         if job.status != "COMPLETED":
             raise RuntimeError(f"Job failed with status {job.status}")
 
-        outputs = download_job_output(
-            client=client,
-            job_id=job_id,
-            input_file_ids=input_file_ids,
-        )
+        with span("unstructured.download_output"), UNSTRUCTURED_STAGE_LATENCY.time(stage="download"):
+            outputs = download_job_output(
+                client=client,
+                job_id=job_id,
+                input_file_ids=input_file_ids,
+            )
 
         return {
             "job_id": job_id,
@@ -0,0 +1,74 @@
+import asyncio
+import time
+import traceback
+from typing import Awaitable, Callable, Optional, Union
+
+WarmupTask = Callable[[], Union[Awaitable[None], None]]
+
+
+# Runs registered warmup steps in the background after startup so the app
+# can accept traffic immediately. Sync steps run in a worker thread.
+class WarmupManager:
+    def __init__(self):
+        self._steps: dict[str, WarmupTask] = {}
+        self.status: dict[str, dict] = {}
+        self.serving = False
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, step: WarmupTask) -> None:
+        self._steps[name] = step
+        self.status[name] = {"state": "pending", "duration_ms": None, "error": None}
+
+    @property
+    def is_warm(self) -> bool:
+        return all(s["state"] == "done" for s in self.status.values())
+
+    @property
+    def failed(self) -> list[str]:
+        return [name for name, s in self.status.items() if s["state"] == "failed"]
+
+    async def _run_step(self, name: str, step: WarmupTask, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            self.status[name]["state"] = "running"
+            started = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(step):
+                    await step()
+                else:
+                    await asyncio.to_thread(step)
+                self.status[name]["state"] = "done"
+                print(f"[WARMUP] {name} ready")
+            except Exception as e:
+                self.status[name]["state"] = "failed"
+                self.status[name]["error"] = str(e)
+                print(f"[WARMUP] {name} failed: {e}")
+                print(traceback.format_exc())
+            finally:
+                self.status[name]["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def _run_all(self, concurrency: int) -> None:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        await asyncio.gather(*(
+            self._run_step(name, step, semaphore) for name, step in self._steps.items()
+        ))
+
+    def start(self, concurrency: int = 4) -> asyncio.Task:
+        self.serving = True
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_all(concurrency))
+        return self._task
+
+    async def wait(self) -> None:
+        if self._task is not None:
+            await self._task
+
+    def snapshot(self) -> dict:
+        return {
+            "serving": self.serving,
+            "warm": self.is_warm,
+            "failed": self.failed,
+            "steps": {name: dict(s) for name, s in self.status.items()},
+        }
+
+
+warmup = WarmupManager()
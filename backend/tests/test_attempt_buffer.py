@@ -0,0 +1,107 @@
+import asyncio
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from services import attempt_buffer as attempt_buffer_module
+from services.attempt_buffer import AttemptBuffer, PendingAttempt
+from services.db_services.migrations import run_migrations
+from services.db_services.curriculum_progress import get_user_progress, set_total_subtopics
+
+
+def make_factory():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    run_migrations(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.execute(text("INSERT INTO curriculums (id, title) VALUES ('c1', 'C')"))
+        db.execute(text("INSERT INTO modules (id, curriculum_id, title, position) VALUES ('m1', 'c1', 'M', 1)"))
+        db.execute(text("INSERT INTO subtopics (id, module_id, title, score, position) VALUES ('s1', 'm1', 'S', 0, 1)"))
+        set_total_subtopics(db, "c1", 1)
+        db.commit()
+    return factory
+
+
+def test_buffer_batches_and_drains_on_close():
+    factory = make_factory()
+
+    async def scenario():
+        buffer = AttemptBuffer(factory, flush_interval=0.02, max_batch=3)
+        assert not buffer.submit(PendingAttempt("u1", "s1", 50))
+        buffer.start()
+        for score in (40, 60, 90):
+            assert buffer.submit(PendingAttempt("u1", "s1", score))
+        await asyncio.sleep(0.1)
+        assert buffer.flushed == 3
+        buffer.submit(PendingAttempt("u1", "s1", 80))
+        await buffer.close()
+        assert not buffer.submit(PendingAttempt("u1", "s1", 10))
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert buffer.stats() == {"running": False, "pending": 0, "flushed": 4, "failed": 0, "retry_in_seconds": 0.0}
+
+    with factory() as db:
+        assert db.execute(text("SELECT COUNT(*) FROM user_attempts")).scalar() == 4
+        assert db.execute(text("SELECT score FROM user_subtopic_score_stats WHERE user_id = 'u1'")).scalar() == 67
+        assert tuple(get_user_progress(db, "u1", "c1")) == (1, 1)
+        assert db.execute(text("SELECT attempt_count FROM user_stats WHERE user_id = 'u1'")).scalar() == 4
+
+
+def test_outage_requeues_batch_until_the_database_is_back(monkeypatch):
+    factory = make_factory()
+    write_attempts = attempt_buffer_module.write_attempts
+    outages = []
+
+    def flaky(db, attempts):
+        if len(outages) < 3:
+            outages.append(len(attempts))
+            raise OperationalError("INSERT INTO user_attempts", {}, Exception("connection refused"))
+        write_attempts(db, attempts)
+
+    monkeypatch.setattr(attempt_buffer_module, "write_attempts", flaky)
+
+    async def scenario():
+        buffer = AttemptBuffer(factory, flush_interval=0.01, max_batch=2, retry_backoff=0.01, max_backoff=0.05)
+        buffer.start()
+        for score in (40, 60, 90):
+            buffer.submit(PendingAttempt("u1", "s1", score))
+        await asyncio.sleep(0.3)
+        await buffer.close()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+
+    assert (buffer.flushed, buffer.failed, buffer.pending) == (3, 0, 0)
+    # Whole batches were retried, never split into per-row writes
+    assert outages == [2, 2, 2]
+    with factory() as db:
+        assert db.execute(text("SELECT COUNT(*) FROM user_attempts")).scalar() == 3
+
+
+def test_only_rows_failing_on_their_own_are_dropped(monkeypatch):
+    factory = make_factory()
+    write_attempts = attempt_buffer_module.write_attempts
+
+    def reject_missing(db, attempts):
+        if any(a.subtopic_id == "gone" for a in attempts):
+            raise IntegrityError("INSERT INTO user_attempts", {}, Exception("foreign key"))
+        write_attempts(db, attempts)
+
+    monkeypatch.setattr(attempt_buffer_module, "write_attempts", reject_missing)
+
+    async def scenario():
+        buffer = AttemptBuffer(factory, flush_interval=0.01, max_batch=3)
+        buffer.start()
+        for subtopic_id in ("s1", "gone", "s1"):
+            buffer.submit(PendingAttempt("u1", subtopic_id, 70))
+        await buffer.close()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+
+    assert (buffer.flushed, buffer.failed) == (2, 1)
+    with factory() as db:
+        assert db.execute(text("SELECT COUNT(*) FROM user_attempts")).scalar() == 2
@@ -0,0 +1,96 @@
+import json
+import os
+
+os.environ.setdefault("UNSTRUCTURED_API_KEY", "test")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from routes import camera
+from routes.camera import router
+from services.db_services.db import get_session
+from services.db_services.migrations import run_migrations
+
+SAMPLE = {
+    "session_duration": 30, "focus_score": 0.8, "confusion_level": 0.2, "fatigue_score": 0.1,
+    "engagement": 0.7, "frustration": 0.1, "blink_rate": 14.0, "head_stability": 0.9, "engagement_score": 60.0,
+}
+
+
+def sample(subtopic_id="s1", **overrides):
+    return {"user_id": "guest_1", "subtopic_id": subtopic_id, **SAMPLE, **overrides}
+
+
+def make_client():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    run_migrations(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.execute(text("INSERT INTO curriculums (id, title) VALUES ('c1', 'C')"))
+        db.execute(text("INSERT INTO modules (id, curriculum_id, title, position) VALUES ('m1', 'c1', 'M', 1)"))
+        for sid in ("s1", "s2"):
+            db.execute(text("INSERT INTO subtopics (id, module_id, title, score, position) VALUES (:id, 'm1', 'S', 0, 1)"), {"id": sid})
+        db.commit()
+
+    def session():
+        with factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_session] = session
+    return TestClient(app), factory
+
+
+def stored(factory) -> int:
+    with factory() as db:
+        return db.execute(text("SELECT COUNT(*) FROM camera_metrics")).scalar()
+
+
+def test_json_array_batch():
+    client, factory = make_client()
+
+    response = client.post("/api/camera/metrics/batch", json=[sample("s1"), sample("s2"), sample("s1")])
+
+    assert response.json() == {"success": True, "inserted": 3, "subtopics_updated": 2}
+    assert stored(factory) == 3
+
+
+def test_ndjson_batch():
+    client, factory = make_client()
+    body = "\n".join(json.dumps(sample(sid)) for sid in ("s1", "s2")) + "\n\n"
+
+    response = client.post("/api/camera/metrics/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.json()["inserted"] == 2
+    assert stored(factory) == 2
+
+
+def test_invalid_ndjson_line_rejects_the_batch():
+    client, factory = make_client()
+    body = json.dumps(sample()) + "\n" + json.dumps(sample(focus_score="very")) + "\n"
+
+    response = client.post("/api/camera/metrics/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 422
+    assert stored(factory) == 0
+
+
+def test_oversized_batches_are_rejected_before_validation(monkeypatch):
+    client, factory = make_client()
+    validated = []
+    monkeypatch.setattr(camera.CameraMetrics, "model_validate_json", classmethod(lambda cls, line: validated.append(line)))
+    monkeypatch.setattr(camera, "MAX_CAMERA_BATCH", 2)
+
+    lines = "\n".join(json.dumps(sample()) for _ in range(3))
+    too_many = client.post("/api/camera/metrics/batch", content=lines, headers={"Content-Type": "application/x-ndjson"})
+    assert too_many.status_code == 400
+    assert validated == []
+
+    monkeypatch.setattr(camera, "MAX_CAMERA_BATCH_BYTES", 100)
+    too_large = client.post("/api/camera/metrics/batch", json=[sample()])
+    assert too_large.status_code == 413
+    assert stored(factory) == 0
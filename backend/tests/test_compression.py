@@ -0,0 +1,51 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+from services.compression import CompressionMiddleware, choose_encoding
+from services.json_response import FastJSONResponse, loads
+
+
+def make_client():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/big")
+    def big():
+        return {"blocks": [{"type": "paragraph", "content": "derivatives " * 20}] * 10}
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/audio")
+    def audio():
+        return Response(b"\x00" * 4000, media_type="audio/wav")
+
+    return TestClient(app)
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("") is None
+
+
+def test_large_json_is_compressed_small_and_audio_are_not():
+    client = make_client()
+    headers = {"Accept-Encoding": "gzip"}
+
+    big = client.get("/big", headers=headers)
+    assert big.headers["content-encoding"] in ("gzip", "br")
+    assert "accept-encoding" in big.headers["vary"].lower()
+    assert len(big.json()["blocks"]) == 10
+
+    assert "content-encoding" not in client.get("/small", headers=headers).headers
+    assert "content-encoding" not in client.get("/audio", headers=headers).headers
+
+    raw = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert loads(raw.content) == big.json()
+    assert len(gzip.compress(raw.content)) < len(raw.content)
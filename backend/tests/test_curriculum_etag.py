@@ -0,0 +1,85 @@
+import os
+import sqlite3
+
+os.environ.setdefault("UNSTRUCTURED_API_KEY", "test")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from routes.curriculum import router
+from services.db_services.db import get_session
+from services.db_services.migrations import run_migrations
+from services.db_services.score_stats import record_attempt
+from services.response_cache import curriculum_cache, etag_matches
+
+
+def make_client():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={
+        "check_same_thread": False,
+        # TIMESTAMP columns come back as datetimes, as they do on Postgres
+        "detect_types": sqlite3.PARSE_DECLTYPES,
+    })
+    run_migrations(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.execute(text("INSERT INTO users (id, name) VALUES ('u1', 'A')"))
+        db.execute(text("INSERT INTO curriculums (id, user_id, title, created_at) VALUES ('c1', 'u1', 'C', '2026-01-01 00:00:00')"))
+        db.execute(text("INSERT INTO modules (id, curriculum_id, title, position) VALUES ('m1', 'c1', 'M', 1)"))
+        db.execute(text("INSERT INTO subtopics (id, module_id, title, score, position) VALUES ('s1', 'm1', 'S', 0, 1)"))
+        db.commit()
+
+    def session():
+        with factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_session] = session
+    curriculum_cache.clear()
+    return TestClient(app), factory
+
+
+def test_etag_matching():
+    assert etag_matches('W/"a-1", "b-2"', '"b-2"')
+    assert etag_matches("*", '"x"')
+    assert not etag_matches('"a-2"', '"a-1"')
+    assert not etag_matches(None, '"a-1"')
+
+
+def test_curriculum_revalidates_until_score_changes():
+    client, factory = make_client()
+    first = client.get("/api/curriculum", params={"user_id": "u1"})
+    etag = first.headers["etag"]
+    assert first.json()["curriculum_id"] == "c1"
+
+    again = client.get("/api/curriculum", params={"user_id": "u1"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+    # Another learner's score leaves this learner's view alone
+    with factory() as db:
+        record_attempt(db, "u2", "s1", 0.8)
+        db.commit()
+    assert client.get("/api/curriculum", params={"user_id": "u1"}, headers={"If-None-Match": etag}).status_code == 304
+
+    with factory() as db:
+        record_attempt(db, "u1", "s1", 0.8)
+        db.commit()
+    changed = client.get("/api/curriculum", params={"user_id": "u1"}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["modules"][0]["subtopics"][0]["score"] == 80
+
+
+def test_curriculum_list_changes_on_pin():
+    client, _ = make_client()
+    etag = client.get("/api/curriculums", params={"user_id": "u1"}).headers["etag"]
+    assert client.get("/api/curriculums", params={"user_id": "u1"}, headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/api/curriculum/c1/pin", params={"user_id": "u1"})
+    pinned = client.get("/api/curriculums", params={"user_id": "u1"}, headers={"If-None-Match": etag})
+    assert pinned.status_code == 200
+    assert pinned.json()["curriculums"][0]["is_pinned"] is True
@@ -0,0 +1,70 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from services.db_services.migrations import run_migrations
+from services.db_services.score_stats import record_attempt, record_engagement
+from services.db_services.curriculum_progress import (
+    backfill_user_progress,
+    get_user_progress,
+    set_total_subtopics,
+)
+
+
+def make_db():
+    engine = create_engine("sqlite://")
+    run_migrations(engine)
+    db = sessionmaker(bind=engine)()
+    db.execute(text("INSERT INTO curriculums (id, title) VALUES ('c1', 'C')"))
+    db.execute(text("INSERT INTO modules (id, curriculum_id, title, position) VALUES ('m1', 'c1', 'M', 1)"))
+    for i in range(4):
+        db.execute(
+            text("INSERT INTO subtopics (id, module_id, title, score, position) VALUES (:id, 'm1', 'S', 0, :i)"),
+            {"id": f"s{i}", "i": i}
+        )
+    set_total_subtopics(db, "c1", 4)
+    return db
+
+
+def filter_count(db, user_id):
+    return db.execute(
+        text("SELECT COUNT(*) FILTER (WHERE score > 0) FROM user_subtopic_score_stats WHERE user_id = :uid"),
+        {"uid": user_id}
+    ).scalar()
+
+
+def test_counter_follows_zero_crossings():
+    db = make_db()
+    record_attempt(db, "u1", "s0", 0.8)
+    record_attempt(db, "u1", "s0", 0.9)
+    record_attempt(db, "u1", "s1", 0.01)
+    record_attempt(db, "u1", "s2", 0.0)
+    record_engagement(db, [("u1", "s3", 0.0)])
+    assert tuple(get_user_progress(db, "u1", "c1")) == (4, 2)
+
+    # 0.005 average truncates to a score of 0
+    record_attempt(db, "u1", "s1", 0.0)
+    assert tuple(get_user_progress(db, "u1", "c1")) == (4, 1) == (4, filter_count(db, "u1"))
+
+
+def test_user_progress_counts_only_the_learners_own_scores():
+    db = make_db()
+    record_attempt(db, "owner", "s0", 1.0)
+    record_attempt(db, "owner", "s1", 0.8)
+    record_attempt(db, "visitor", "s2", 0.0)
+
+    assert tuple(get_user_progress(db, "owner", "c1")) == (4, 2)
+    assert tuple(get_user_progress(db, "visitor", "c1")) == (4, 0)
+    assert tuple(get_user_progress(db, "newcomer", "c1")) == (4, 0)
+    assert get_user_progress(db, "owner", "missing") is None
+
+
+def test_backfill_matches_filter_count():
+    db = make_db()
+    record_attempt(db, "owner", "s0", 1.0)
+    record_engagement(db, [("owner", "s3", 40.0), ("visitor", "s1", 0.0)])
+    db.execute(text("DELETE FROM user_curriculum_progress"))
+
+    backfill_user_progress(db)
+
+    assert tuple(get_user_progress(db, "owner", "c1")) == (4, 2) == (4, filter_count(db, "owner"))
+    assert tuple(get_user_progress(db, "visitor", "c1")) == (4, 0)
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from services.metrics import (
+    DB_QUERY_LATENCY,
+    HTTP_REQUESTS,
+    Histogram,
+    Metric,
+    MetricsMiddleware,
+    Registry,
+    instrument_engine,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.register(Histogram("piper_seconds", "Piper time.", ("outcome",), buckets=(0.1, 1.0)))
+    histogram.observe(0.05, outcome="ok")
+    histogram.observe(0.5, outcome="ok")
+    histogram.observe(3, outcome="ok")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE piper_seconds histogram" in lines
+    assert 'piper_seconds_bucket{outcome="ok",le="0.1"} 1' in lines
+    assert 'piper_seconds_bucket{outcome="ok",le="1"} 2' in lines
+    assert 'piper_seconds_bucket{outcome="ok",le="+Inf"} 3' in lines
+    assert 'piper_seconds_count{outcome="ok"} 3' in lines
+
+
+def test_metrics_must_define_samples():
+    class Untyped(Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        Untyped("orbit_untyped", "No samples.")
+
+
+def test_scrape_merges_worker_snapshots(tmp_path, monkeypatch):
+    monkeypatch.delenv("ORBIT_WORKER_ID", raising=False)
+    registry = Registry()
+    requests = registry.counter("orbit_test_requests_total", "Requests.", ("route",))
+    pool = registry.gauge("orbit_test_pool_connections", "Pool.")
+    latency = registry.histogram("orbit_test_seconds", "Latency.", buckets=(1.0,))
+
+    pid = os.fork()
+    if pid == 0:
+        os.environ["ORBIT_WORKER_ID"] = "1"
+        requests.inc(2, route="/a")
+        pool.set(3)
+        latency.observe(0.5)
+        registry.write_snapshot(str(tmp_path))
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    requests.inc(route="/a")
+    pool.set(5)
+    latency.observe(2)
+    lines = registry.render(str(tmp_path)).splitlines()
+
+    # The exited worker's counts stay in the totals; its gauges do not
+    assert 'orbit_test_requests_total{route="/a"} 3' in lines
+    assert 'orbit_test_seconds_bucket{le="1"} 1' in lines
+    assert "orbit_test_seconds_count 2" in lines
+    assert 'orbit_test_pool_connections{worker="0"} 5' in lines
+    assert not any('worker="1"' in line for line in lines)
+    # Local values are untouched by the merge
+    assert requests.value(route="/a") == 1
+
+
+def test_requests_and_queries_are_labelled_by_route_template():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    instrument_engine(engine)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/api/teaching/{subtopic_id}")
+    def teaching(subtopic_id: str):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return {"id": subtopic_id}
+
+    route = "/api/teaching/{subtopic_id}"
+    before = DB_QUERY_LATENCY.count(route=route)
+    client = TestClient(app)
+    client.get("/api/teaching/a")
+    client.get("/api/teaching/b")
+    client.get("/nowhere")
+
+    assert HTTP_REQUESTS.value(method="GET", route=route, status=200) == 2
+    assert HTTP_REQUESTS.value(method="GET", route="unmatched", status=404) >= 1
+    assert DB_QUERY_LATENCY.count(route=route) - before == 2
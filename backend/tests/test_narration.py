@@ -0,0 +1,32 @@
+from services.narration import lesson_segments, verbalize_formula
+
+
+def test_formula_is_verbalized_like_the_frontend():
+    assert verbalize_formula("E = mc^2") == "E equals mc squared"
+    assert verbalize_formula("a/b ≤ π") == "a over b is less than or equal to pie"
+
+
+def test_question_block_reads_options_with_letters():
+    blocks = [
+        {"type": "paragraph", "content": "Energy is **conserved**."},
+        {
+            "type": "question",
+            "questionType": "mcq",
+            "question": "Which is a vector?",
+            "options": ["Speed", "Velocity"],
+        },
+    ]
+
+    texts = [(s["block_index"], s["text"]) for s in lesson_segments(blocks)]
+
+    assert texts == [
+        (0, "Energy is conserved."),
+        (0, "Say next to continue, or repeat to hear again."),
+        (1, "Question time!"),
+        (1, "Which is a vector?"),
+        (1, "Your options are:"),
+        (1, "A: Speed"),
+        (1, "B: Velocity"),
+        (1, "Say the letter of your answer, like A, B, C, or D."),
+        (1, "This is the last section. Say next to complete the lesson."),
+    ]
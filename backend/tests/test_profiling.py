@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes.admin import router as admin_router
+from services.profiling import ProfilingMiddleware, ProfilingState, profiling
+
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def make_client(monkeypatch, sample_rate=0.0):
+    monkeypatch.setattr(profiling, "admin_token", "secret")
+    monkeypatch.setattr(profiling, "sample_rate", sample_rate)
+    monkeypatch.setattr(profiling, "interval_ms", 1.0)
+    profiling.store.clear()
+
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(admin_router)
+
+    @app.get("/slow")
+    def slow():
+        busy_wait(0.1)
+        return {"ok": True}
+
+    @app.get("/waits")
+    async def waits():
+        await asyncio.sleep(0.3)
+        return {"ok": True}
+
+    @app.get("/hogs-loop")
+    async def hogs_loop():
+        busy_wait(0.2)
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_profile_header_needs_admin_token(monkeypatch):
+    client = make_client(monkeypatch)
+
+    response = client.get("/slow", headers={"X-Profile": "1"})
+
+    assert "x-profile-id" not in response.headers
+    assert profiling.store.list() == []
+
+
+def test_profiled_request_is_retrievable_as_folded_stacks(monkeypatch):
+    client = make_client(monkeypatch)
+    admin = {"X-Admin-Token": "secret"}
+
+    response = client.get("/slow", headers={"X-Profile": "1", "X-Request-Id": "req-1", **admin})
+
+    assert response.headers["x-profile-id"] == "req-1"
+    listed = client.get("/admin/profiles", headers=admin).json()["profiles"]
+    assert [(p["id"], p["route"], p["status"]) for p in listed] == [("req-1", "/slow", 200)]
+    folded = client.get("/admin/profiles/req-1", headers=admin).text
+    # A sync endpoint runs in the threadpool, which is sampled process-wide
+    assert "[process-wide];" in folded
+    assert "busy_wait (tests/test_profiling.py" in folded
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+
+
+def test_admin_toggle_enables_sampling(monkeypatch):
+    client = make_client(monkeypatch)
+
+    assert client.post("/admin/profiling?sample_rate=1").status_code == 404
+    assert client.post("/admin/profiling?sample_rate=1", headers={"X-Admin-Token": "secret"}).json()["sample_rate"] == 1
+    response = client.get("/slow")
+
+    assert response.headers["x-profile-id"]
+    assert len(profiling.store.list()) == 1
+
+
+def test_loop_samples_from_other_requests_are_left_out(monkeypatch):
+    admin = {"X-Admin-Token": "secret"}
+    with make_client(monkeypatch) as client:
+        other = threading.Thread(target=lambda: (time.sleep(0.05), client.get("/hogs-loop")))
+        other.start()
+        client.get("/waits", headers={"X-Profile": "1", "X-Request-Id": "req-2", **admin})
+        other.join()
+
+        folded = client.get("/admin/profiles/req-2", headers=admin).text
+
+    assert "hogs_loop" not in folded
+    assert "busy_wait" not in folded
+
+
+def test_workers_share_profiles_and_toggle(tmp_path):
+    # Two states over one directory stand in for two serve.py workers
+    first, second = ProfilingState(), ProfilingState()
+    first.share(str(tmp_path))
+    second.share(str(tmp_path))
+
+    first.update(sample_rate=0.5)
+    second.poll()
+    assert second.sample_rate == 0.5
+
+    first.store.put("req-9", {"status": 200, "folded": "a;b 1\n"})
+    assert second.store.get("req-9") == {"status": 200, "folded": "a;b 1\n"}
+    assert second.store.get("../settings") is None
+
+    time.sleep(0.01)
+    second.store.max_entries = 1
+    second.store.put("req-10", {"status": 500, "folded": ""})
+    assert [p["id"] for p in first.store.list()] == ["req-10"]
+
+    first.store.clear()
+    assert second.store.list() == []
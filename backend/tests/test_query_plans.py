@@ -0,0 +1,258 @@
+import json
+import os
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from services.db_services.content_versions import CURRICULUM_VERSION_SQL
+from services.db_services.curriculum_progress import USER_PROGRESS_SQL
+from services.db_services.migrations import (
+    BASELINE,
+    USER_ID_COLUMNS,
+    _drop_invalid_index,
+    _render,
+    _text_user_ids,
+    run_migrations,
+)
+
+# The filtering part of each hot route query; if one of these starts scanning a
+# whole table, an index is missing from the migrations.
+ROUTE_QUERIES = {
+    "GET /api/curriculums": """
+        SELECT id, title, created_at, is_pinned, is_archived
+        FROM curriculums
+        WHERE user_id = :uid AND (is_archived IS FALSE OR is_archived IS NULL)
+        ORDER BY is_pinned DESC NULLS LAST, created_at DESC
+    """,
+    "GET /api/curriculums (etag)": "SELECT curriculums_version FROM users WHERE id = :uid",
+    "GET /api/curriculum (latest)": """
+        SELECT id FROM curriculums
+        WHERE user_id = :uid
+        ORDER BY created_at DESC
+        LIMIT 1
+    """,
+    "GET /api/curriculum (etag)": CURRICULUM_VERSION_SQL.format(target="c.id = :cid"),
+    "POST /api/revision/check-milestone": USER_PROGRESS_SQL,
+    "GET /api/curriculum (modules)": """
+        SELECT m.id, m.title, m.position
+        FROM modules m
+        WHERE m.curriculum_id = :cid
+        ORDER BY m.position
+    """,
+    "GET /api/curriculum (subtopics)": """
+        SELECT s.id, s.title, COALESCE(p.score, 0) AS score, s.position
+        FROM subtopics s
+        LEFT JOIN user_subtopic_score_stats p
+            ON p.user_id = :uid AND p.subtopic_id = s.id
+        WHERE s.module_id = :mid
+        ORDER BY s.position
+    """,
+    "GET /api/teaching (subtopic)": """
+        SELECT s.title, s.content, m.curriculum_id
+        FROM subtopics s
+        JOIN modules m ON s.module_id = m.id
+        WHERE s.id = :sid
+    """,
+    "GET /api/teaching (cache)": "SELECT CAST(blocks_json AS TEXT) AS blocks_json FROM teaching_blocks WHERE subtopic_id = :sid",
+    "GET /api/users/stats": """
+        SELECT completed_count, total_lessons, attempt_sum, attempt_count,
+               current_streak, last_activity_date
+        FROM user_stats
+        WHERE user_id = :uid
+    """,
+    "GET /api/camera/stats": """
+        SELECT COUNT(*) as session_count, AVG(engagement_score) as avg_engagement_score
+        FROM camera_metrics
+        WHERE subtopic_id = :sid
+    """,
+    "score write (progress)": """
+        SELECT m.curriculum_id
+        FROM subtopics s
+        JOIN modules m ON s.module_id = m.id
+        WHERE s.id = :sid
+    """,
+    "POST /api/revision/generate": """
+        SELECT s.id, s.title, SUBSTR(s.content, 1, 500) AS content,
+               COALESCE(p.score, 0) AS score, m.title as module_title
+        FROM subtopics s
+        JOIN modules m ON s.module_id = m.id
+        LEFT JOIN user_subtopic_score_stats p
+            ON p.user_id = :uid AND p.subtopic_id = s.id
+        WHERE m.curriculum_id = :cid
+        ORDER BY COALESCE(p.score, 0) ASC, s.position ASC
+        LIMIT (
+            SELECT CASE WHEN total_subtopics * 3 / 10 > 3 THEN total_subtopics * 3 / 10 ELSE 3 END
+            FROM curriculums
+            WHERE id = :cid
+        )
+    """,
+    "score stats": "SELECT attempt_sum, attempt_count FROM user_subtopic_score_stats WHERE user_id = :uid AND subtopic_id = :sid",
+}
+
+
+def seed(engine, users=3, curriculums=3, modules=4, subtopics=5):
+    ids = {}
+    with engine.begin() as conn:
+        for _ in range(users):
+            # Real ids are Clerk or guest ids, not UUIDs
+            uid = f"guest_{uuid4()}"
+            conn.execute(text("INSERT INTO users (id, name) VALUES (:id, 'u')"), {"id": uid})
+            for c in range(curriculums):
+                cid = str(uuid4())
+                conn.execute(
+                    text("INSERT INTO curriculums (id, user_id, title) VALUES (:id, :uid, 'c')"),
+                    {"id": cid, "uid": uid}
+                )
+                for m in range(modules):
+                    mid = str(uuid4())
+                    conn.execute(
+                        text("INSERT INTO modules (id, curriculum_id, title, position) VALUES (:id, :cid, 'm', :p)"),
+                        {"id": mid, "cid": cid, "p": m}
+                    )
+                    for s in range(subtopics):
+                        sid = str(uuid4())
+                        conn.execute(
+                            text("INSERT INTO subtopics (id, module_id, title, content, score, position) VALUES (:id, :mid, 's', 'x', 0, :p)"),
+                            {"id": sid, "mid": mid, "p": s}
+                        )
+                        conn.execute(
+                            text("INSERT INTO user_attempts (user_id, subtopic_id, score) VALUES (:uid, :sid, 0.5)"),
+                            {"uid": uid, "sid": sid}
+                        )
+                        conn.execute(
+                            text("INSERT INTO camera_metrics (user_id, subtopic_id, engagement_score) VALUES (:uid, :sid, 50)"),
+                            {"uid": uid, "sid": sid}
+                        )
+                        ids = {"uid": uid, "cid": cid, "mid": mid, "sid": sid}
+    return ids
+
+
+def full_scans(conn, query, params):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SET enable_seqscan = off"))
+        plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + query), params).scalar()
+        plan = plan if isinstance(plan, list) else json.loads(plan)
+        scans = []
+
+        def walk(node):
+            if node.get("Node Type") == "Seq Scan":
+                scans.append(node.get("Relation Name"))
+            for child in node.get("Plans", []):
+                walk(child)
+
+        walk(plan[0]["Plan"])
+        return scans
+
+    rows = conn.execute(text("EXPLAIN QUERY PLAN " + query), params).fetchall()
+    # SQLite reports "SCAN <table>" for a full scan and "SEARCH ..." for index use
+    return [row[-1] for row in rows if row[-1].startswith("SCAN ") and "USING" not in row[-1]]
+
+
+@pytest.fixture(scope="module")
+def seeded(tmp_path_factory):
+    url = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{tmp_path_factory.mktemp('db') / 'plans.db'}"
+    engine = create_engine(url)
+    run_migrations(engine)
+    ids = seed(engine)
+    yield engine, ids
+    engine.dispose()
+
+
+@pytest.mark.parametrize("route", list(ROUTE_QUERIES))
+def test_route_query_uses_an_index(seeded, route):
+    engine, ids = seeded
+    with engine.connect() as conn:
+        assert full_scans(conn, ROUTE_QUERIES[route], ids) == []
+
+
+def test_migrations_are_recorded_once(seeded):
+    engine, _ = seeded
+    assert run_migrations(engine) == []
+
+
+def test_user_id_columns_are_text_on_postgres():
+    rendered = "\n".join(_render(statement, "postgresql") for statement in BASELINE)
+    assert "id TEXT PRIMARY KEY,\n        name" in rendered
+    assert "user_id UUID" not in rendered
+
+
+def postgres_schema(name):
+    # A scratch schema on the TEST_DATABASE_URL server, dropped afterwards
+    url = os.getenv("TEST_DATABASE_URL", "")
+    admin = create_engine(url)
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {name} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {name}"))
+    return admin, create_engine(url, connect_args={"options": f"-csearch_path={name}"})
+
+
+needs_postgres = pytest.mark.skipif(
+    not os.getenv("TEST_DATABASE_URL", "").startswith("postgresql"), reason="needs TEST_DATABASE_URL on Postgres"
+)
+
+
+@needs_postgres
+def test_text_user_ids_keeps_every_foreign_key():
+    admin, engine = postgres_schema("legacy_ids")
+    with engine.begin() as conn:
+        for statement in (
+            "CREATE TABLE users (id UUID PRIMARY KEY)",
+            "CREATE TABLE curriculums (id UUID PRIMARY KEY, user_id UUID REFERENCES users(id))",
+            "CREATE TABLE user_attempts (id BIGSERIAL PRIMARY KEY, user_id UUID REFERENCES users(id))",
+            "CREATE INDEX idx_attempts_user ON user_attempts (user_id)",
+            "CREATE TABLE camera_metrics (id BIGSERIAL PRIMARY KEY, user_id UUID)",
+            "CREATE TABLE user_subtopic_score_stats (user_id UUID, subtopic_id UUID, PRIMARY KEY (user_id, subtopic_id))",
+            "CREATE TABLE user_stats (user_id UUID PRIMARY KEY)",
+            "CREATE TABLE user_completions (user_id UUID, subtopic_id UUID, PRIMARY KEY (user_id, subtopic_id))",
+        ):
+            conn.execute(text(statement))
+        legacy = str(uuid4())
+        conn.execute(text("INSERT INTO users (id) VALUES (:id)"), {"id": legacy})
+        conn.execute(text("INSERT INTO user_attempts (user_id) VALUES (:id)"), {"id": legacy})
+
+    with engine.begin() as conn:
+        _text_user_ids(conn)
+    # Already TEXT, so a second run changes nothing
+    with engine.begin() as conn:
+        _text_user_ids(conn)
+
+    with engine.begin() as conn:
+        types = {
+            (row.table_name, row.column_name): row.data_type
+            for row in conn.execute(text("SELECT table_name, column_name, data_type FROM information_schema.columns WHERE table_schema = 'legacy_ids'"))
+        }
+        assert {types[column] for column in USER_ID_COLUMNS} == {"text"}
+        foreign_keys = conn.execute(text(
+            "SELECT COUNT(*) FROM pg_constraint WHERE contype = 'f' AND connamespace = 'legacy_ids'::regnamespace"
+        )).scalar()
+        assert foreign_keys == 2
+        conn.execute(text("INSERT INTO users (id) VALUES ('guest_1')"))
+        conn.execute(text("INSERT INTO user_attempts (user_id) VALUES ('guest_1')"))
+    with pytest.raises(Exception):
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO user_attempts (user_id) VALUES ('guest_missing')"))
+    engine.dispose()
+    with admin.begin() as conn:
+        conn.execute(text("DROP SCHEMA legacy_ids CASCADE"))
+
+
+@needs_postgres
+def test_invalid_concurrent_index_is_rebuilt():
+    admin, engine = postgres_schema("invalid_index")
+    statement = "CREATE INDEX {concurrently} IF NOT EXISTS idx_dupes_value ON dupes (value)"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE TABLE dupes (value INTEGER)"))
+        conn.execute(text("INSERT INTO dupes VALUES (1), (1)"))
+        # A failed concurrent build leaves the index behind, marked invalid
+        with pytest.raises(Exception):
+            conn.execute(text("CREATE UNIQUE INDEX CONCURRENTLY idx_dupes_value ON dupes (value)"))
+
+        _drop_invalid_index(conn, statement)
+        conn.execute(text(_render(statement, "postgresql")))
+
+        valid = conn.execute(text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass('idx_dupes_value')")).scalar()
+        assert valid is True
+    engine.dispose()
+    with admin.begin() as conn:
+        conn.execute(text("DROP SCHEMA invalid_index CASCADE"))
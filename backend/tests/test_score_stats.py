@@ -0,0 +1,77 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from services.db_services.migrations import run_migrations
+from services.db_services.score_stats import (
+    SCORE_STATS_DDL,
+    backfill_score_stats,
+    get_subtopic_weighted_score,
+    get_user_attempt_average,
+    record_attempt,
+    record_engagement,
+    weighted_score,
+)
+
+
+def make_db():
+    engine = create_engine("sqlite://")
+    run_migrations(engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_weighted_score_matches_previous_rules():
+    assert weighted_score(0, 0, 0, 0) == 0
+    assert weighted_score(0, 0, 160, 2) == 80
+    assert weighted_score(1.5, 2, 0, 0) == 75
+    assert weighted_score(1.5, 2, 160, 2) == int(75 * 0.7 + 80 * 0.3)
+
+
+def test_running_aggregates_track_inserts():
+    db = make_db()
+    record_attempt(db, "u1", "s1", 1.0)
+    record_attempt(db, "u1", "s1", 0.5)
+    record_attempt(db, "u2", "s1", 0.0)
+    record_engagement(db, [("u1", "s1", 90.0), ("u2", "s1", 60.0)])
+
+    assert get_user_attempt_average(db, "u1", "s1") == 75
+    assert get_user_attempt_average(db, "u3", "s1") == 0
+    assert get_subtopic_weighted_score(db, "s1") == int(50 * 0.7 + 75 * 0.3)
+
+    progress = dict(db.execute(text("SELECT user_id, score FROM user_subtopic_score_stats")).fetchall())
+    assert progress == {"u1": weighted_score(1.5, 2, 90, 1), "u2": weighted_score(0.0, 1, 60, 1)}
+
+
+def test_backfill_matches_incremental_updates():
+    db = make_db()
+    rows = [("u1", "s1", 1.0), ("u1", "s1", 0.25), ("u2", "s2", 0.75)]
+    for user_id, subtopic_id, score in rows:
+        db.execute(
+            text("INSERT INTO user_attempts (user_id, subtopic_id, score) VALUES (:u, :s, :score)"),
+            {"u": user_id, "s": subtopic_id, "score": score}
+        )
+        record_attempt(db, user_id, subtopic_id, score)
+    db.execute(text("INSERT INTO camera_metrics (user_id, subtopic_id, engagement_score) VALUES ('u2', 's2', 40.0)"))
+    record_engagement(db, [("u2", "s2", 40.0)])
+
+    tables = ("subtopic_score_stats", "user_subtopic_score_stats")
+    before = [db.execute(text(f"SELECT * FROM {table} ORDER BY subtopic_id")).fetchall() for table in tables]
+    assert backfill_score_stats(db) == (2, 2)
+    after = [db.execute(text(f"SELECT * FROM {table} ORDER BY subtopic_id")).fetchall() for table in tables]
+
+    assert before == after
+
+
+def test_user_ids_are_text_on_postgres():
+    # Clerk and guest ids aren't UUIDs; only subtopic ids use the UUID type
+    ddl = SCORE_STATS_DDL[1].format(id_type="UUID")
+    assert "user_id TEXT" in ddl
+    assert "subtopic_id UUID" in ddl
+
+    db = make_db()
+    guest = "guest_0f8fad5b-d9cb-469f-a165-70867728950e"
+    record_attempt(db, guest, "s1", 1.0)
+    record_engagement(db, [("user_2abcDEF", "s1", 70.0)])
+
+    assert get_user_attempt_average(db, guest, "s1") == 100
+    users = {row[0] for row in db.execute(text("SELECT user_id FROM user_subtopic_score_stats"))}
+    assert users == {guest, "user_2abcDEF"}
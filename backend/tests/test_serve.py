@@ -0,0 +1,57 @@
+import os
+import signal
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from serve import STARTUP_FAILED, Supervisor
+
+CONFIG = SimpleNamespace(loop="asyncio", http="h11")
+
+
+@pytest.fixture(autouse=True)
+def keep_signal_handlers():
+    handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT)}
+    yield
+    for sig, handler in handlers.items():
+        signal.signal(sig, handler)
+
+
+class FailingStartup(Supervisor):
+    spawned = 0
+
+    def spawn(self, worker_id):
+        self.spawned += 1
+        super().spawn(worker_id)
+
+    def serve(self):
+        return STARTUP_FAILED
+
+
+def test_failed_startups_back_off_and_stop_the_supervisor():
+    supervisor = FailingStartup(
+        CONFIG, sock=None, workers=2, stop_timeout=1,
+        restart_backoff=0.05, max_backoff=0.2, max_crashes=5,
+    )
+
+    started = time.monotonic()
+    assert supervisor.run() == 1
+
+    # The sixth exit trips the limit; the other slot is either running or backing off
+    assert supervisor.spawned in (6, 7)
+    # Slot delays 0.05 then 0.1, and the second restart waits on the first
+    assert time.monotonic() - started >= 0.15
+    assert not supervisor.children and not supervisor.pending
+
+
+def test_worker_that_ran_for_a_while_restarts_with_base_delay():
+    supervisor = Supervisor(CONFIG, sock=None, workers=1, stop_timeout=1, restart_backoff=0.5, stable_after=10)
+    supervisor.failures[0] = 6
+    supervisor.started_at[0] = time.monotonic() - 60
+
+    supervisor.exited(12345, 0, 1 << 8)
+
+    assert supervisor.failures[0] == 1
+    assert supervisor.pending[0] - time.monotonic() == pytest.approx(0.5, abs=0.05)
+    assert supervisor.exit_code == 0
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from services.Gemini_Services.teaching_models import (
+    Paragraph,
+    Question,
+    Simulation,
+    TeachingResponse,
+    parse_teaching_response,
+)
+
+RAW = json.dumps({"blocks": [
+    {"type": "paragraph", "content": "Slopes."},
+    {"type": "simulation", "html": "  <canvas></canvas>\n```", "description": "Tangent line"},
+    {
+        "type": "question", "questionType": "mcq", "question": "d/dx x^2?", "options": ["x", "2x"],
+        "correctIndex": 1, "explanations": {"correct": "Power rule"}, "hint": "Bring down the 2",
+    },
+]})
+
+
+def test_parse_matches_previous_model_dump():
+    result, blocks_json = parse_teaching_response(RAW)
+    assert [type(b) for b in result.blocks] == [Paragraph, Simulation, Question]
+    assert result.blocks[1].html == "<canvas></canvas>"
+
+    previous = TeachingResponse(**json.loads(RAW))
+    previous.blocks[1].html = "<canvas></canvas>"
+    assert json.loads(blocks_json) == [block.model_dump() for block in previous.blocks]
+
+
+def test_unknown_block_type_is_rejected_by_tag():
+    with pytest.raises(ValidationError) as error:
+        parse_teaching_response('{"blocks": [{"type": "video", "url": "x"}]}')
+    assert "does not match any of the expected tags" in str(error.value)
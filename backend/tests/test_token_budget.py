@@ -0,0 +1,57 @@
+from services.Gemini_Services import token_budget
+from services.Gemini_Services.token_budget import compress_to_budget, estimate_tokens, fit_content, split_to_budget
+
+SECTION = "  ".join(
+    f"A derivative measures how fast a function changes at point {i}. "
+    f"Example {i} applies the power rule to x squared."
+    for i in range(200)
+)
+
+
+def test_split_to_budget_keeps_every_sentence_in_even_parts():
+    parts = split_to_budget(SECTION, 1000)
+
+    assert len(parts) > 1
+    assert all(estimate_tokens(part) <= 1000 for part in parts)
+    assert min(map(estimate_tokens, parts)) > 1000 / 2
+    assert " ".join(parts).split() == SECTION.split()
+
+
+def test_split_to_budget_cuts_text_without_sentence_breaks():
+    table = " ".join(f"cell{i}" for i in range(3000))
+
+    parts = split_to_budget(table, 500)
+
+    assert all(estimate_tokens(part) <= 500 for part in parts)
+    assert " ".join(parts) == table
+
+
+def test_short_content_is_left_alone():
+    assert split_to_budget("Limits describe values.", 100) == ["Limits describe values."]
+    assert compress_to_budget("Limits describe values.", 100) == "Limits describe values."
+
+
+def test_compress_keeps_opening_sentence_and_original_order():
+    text = (
+        "A limit describes the value a function approaches. "
+        "The weather was pleasant during the lecture. "
+        "The limit of a function at a point uses values of the function near the point. "
+        "Lunch followed afterwards."
+    )
+
+    compressed = compress_to_budget(text, 40)
+
+    assert estimate_tokens(compressed) <= 40
+    assert compressed.startswith("A limit describes the value a function approaches.")
+    assert "The limit of a function at a point" in compressed
+    assert "Lunch" not in compressed
+
+
+def test_fit_content_compresses_to_the_endpoint_budget(monkeypatch):
+    monkeypatch.setitem(token_budget.INPUT_BUDGETS, "teaching", 1200)
+    template = "x " * 600
+
+    fitted = fit_content("teaching", template, SECTION)
+
+    assert estimate_tokens(fitted) <= 1200 - estimate_tokens(template)
+    assert fit_content("teaching", template, "Short content.") == "Short content."
@@ -0,0 +1,49 @@
+import json
+
+from services import tracing
+from services.tracing import current_span, span, start_trace, summarize
+
+
+def test_spans_nest_and_summarize_in_start_order():
+    with start_trace("parse", files=1) as root:
+        with span("create_modules") as stage:
+            for _ in range(3):
+                with current_span().timer("ftfy"):
+                    pass
+            with span("balance_modules", modules_in=4):
+                pass
+        with span("upload_to_db"):
+            pass
+
+    summary = summarize(root)
+
+    assert [(s["name"], s["depth"]) for s in summary["spans"]] == [
+        ("parse", 0), ("create_modules", 1), ("balance_modules", 2), ("upload_to_db", 1),
+    ]
+    assert stage.attributes["ftfy_calls"] == 3
+    assert summary["spans"][2]["attributes"] == {"modules_in": 4}
+
+
+def test_spans_outside_a_trace_are_noops():
+    with span("create_modules") as stage:
+        stage.set(elements=10)
+        with current_span().timer("similarity"):
+            pass
+    assert current_span() is tracing.NOOP_SPAN
+
+
+def test_failed_trace_is_written_to_trace_file(tmp_path, monkeypatch):
+    trace_file = tmp_path / "parse_traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(trace_file))
+
+    try:
+        with start_trace("parse"):
+            with span("unstructured.poll_job"):
+                raise RuntimeError("Job failed with status FAILED")
+    except RuntimeError:
+        pass
+
+    rows = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    assert [row["name"] for row in rows] == ["parse", "unstructured.poll_job"]
+    assert rows[1]["parent_id"] == rows[0]["span_id"]
+    assert "FAILED" in rows[1]["error"]
@@ -0,0 +1,250 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from services.tts_cache import AudioCache
+from services import tts_service as tts_service_module
+from services import audio_encoding
+from services.audio_encoding import detect_format, negotiate_format
+from services.phrase_store import export_manifest, phrase_key, voice_id
+from services.tts_service import TTSService
+
+
+def make_service(tmp_path, calls):
+    service = TTSService(cache_dir=tmp_path, static_dir=None)
+
+    async def fake_generate(text, rate=1.0):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return f"wav:{text}".encode()
+
+    service._generate_audio = fake_generate
+    return service
+
+
+def test_batch_dedupes_and_keeps_order(tmp_path):
+    calls = []
+    service = make_service(tmp_path, calls)
+
+    results = asyncio.run(service.synthesize_batch(["Correct!", "Next lesson", "Correct!", ""]))
+
+    assert results == [b"wav:Correct!", b"wav:Next lesson", b"wav:Correct!", b""]
+    assert sorted(calls) == ["Correct!", "Next lesson"]
+
+
+def test_batch_serves_cache_hits_without_synthesis(tmp_path):
+    calls = []
+    service = make_service(tmp_path, calls)
+    asyncio.run(service.synthesize("Paused"))
+    calls.clear()
+
+    results = asyncio.run(service.synthesize_batch(["Paused", "Resuming"]))
+
+    assert results == [b"wav:Paused", b"wav:Resuming"]
+    assert calls == ["Resuming"]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = AudioCache(tmp_path, max_bytes=10, memory_bytes=0)
+    cache.put("aa11", b"12345")
+    cache.put("bb22", b"12345")
+    cache.get("aa11")
+    cache.put("cc33", b"12345")
+
+    assert cache.get("bb22") is None
+    assert cache.get("aa11") == b"12345"
+    assert (cache.count, cache.size) == (2, 10)
+    assert not (tmp_path / "bb" / "bb22.wav").exists()
+
+
+def test_memory_hits_keep_phrases_from_eviction(tmp_path):
+    cache = AudioCache(tmp_path, max_bytes=10)
+    cache.put("aa11", b"12345")
+    cache.put("bb22", b"12345")
+    # Served from memory; must still count as recent use
+    assert cache.get("aa11") == b"12345"
+    cache.put("cc33", b"12345")
+
+    assert cache.get("aa11") == b"12345"
+    assert not (tmp_path / "bb" / "bb22.wav").exists()
+    cache.flush()
+    hits = cache._db.execute("SELECT hits FROM entries WHERE name = 'aa11.wav'").fetchone()[0]
+    assert hits == 2
+
+
+def test_running_totals_match_the_index(tmp_path):
+    cache = AudioCache(tmp_path, max_bytes=100, memory_bytes=0)
+    for i in range(30):
+        cache.put(f"k{i:03d}", b"x" * (i % 7 + 1))
+    cache.put("k005", b"replaced")
+
+    recount = cache._db.execute("SELECT COUNT(*), SUM(size) FROM entries").fetchone()
+    assert cache.totals() == recount
+    assert recount[1] <= 100
+
+    cache.clear()
+    assert cache.totals() == (0, 0)
+
+
+def test_disk_reads_happen_outside_the_lock(tmp_path, monkeypatch):
+    cache = AudioCache(tmp_path, memory_bytes=0)
+    cache.put("aa11", b"12345")
+    locked = []
+    read_bytes = Path.read_bytes
+
+    def watched(path):
+        locked.append(cache._lock.locked())
+        return read_bytes(path)
+
+    monkeypatch.setattr(Path, "read_bytes", watched)
+
+    assert cache.get("aa11") == b"12345"
+    assert locked == [False]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_cache_budget_is_shared_across_forked_workers(tmp_path):
+    cache = AudioCache(tmp_path, max_bytes=10, memory_bytes=0)
+    cache.put("aa11", b"12345")
+    parent_conn = cache._conn
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            cache.put("bb22", b"12345")
+            cache.put("cc33", b"12345")
+            code = 0 if cache._conn is not parent_conn else 3
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert (cache.count, cache.size) == (2, 10)
+    assert cache.get("aa11") is None
+
+
+def test_cache_adopts_flat_legacy_files(tmp_path):
+    (tmp_path / "dd44.wav").write_bytes(b"legacy")
+
+    cache = AudioCache(tmp_path)
+
+    assert cache.get("dd44") == b"legacy"
+    assert (tmp_path / "dd" / "dd44.wav").exists()
+    assert cache.stats()["cached_files"] == 1
+
+
+def test_encoded_variant_is_cached_next_to_wav(tmp_path, monkeypatch):
+    calls = []
+    service = make_service(tmp_path, calls)
+    encodes = []
+
+    def fake_encode(wav_data, fmt):
+        encodes.append(fmt)
+        return b"OggS" + wav_data
+
+    monkeypatch.setattr(tts_service_module, "encode_wav", fake_encode)
+
+    first = asyncio.run(service.synthesize("Paused", audio_format="opus"))
+    second = asyncio.run(service.synthesize("Paused", audio_format="opus"))
+
+    assert first == second == b"OggSwav:Paused"
+    assert detect_format(first) == "opus"
+    assert calls == ["Paused"] and encodes == ["opus"]
+    assert service.cache.count == 2
+
+
+def test_failed_encoding_falls_back_to_wav(tmp_path, monkeypatch):
+    service = make_service(tmp_path, [])
+    monkeypatch.setattr(tts_service_module, "encode_wav", lambda wav_data, fmt: b"")
+
+    audio = asyncio.run(service.synthesize("Paused", audio_format="flac"))
+
+    assert audio == b"wav:Paused"
+
+
+def test_phrase_key_ignores_case_and_spacing_but_not_voice_or_rate():
+    key = phrase_key("Correct!", "en_US-amy-medium")
+
+    assert phrase_key("  correct! ", "en_US-amy-medium") == key
+    assert phrase_key("Correct!", "en_US-amy-medium", 1.5) != key
+    assert phrase_key("Correct!", "en_US-lessac-medium") != key
+    assert voice_id("/app/piper_models/en_US-amy-medium.onnx") == "en_US-amy-medium"
+
+
+def test_exported_phrases_are_not_resynthesized(tmp_path):
+    static_dir = tmp_path / "static"
+    store = AudioCache(tmp_path / "store")
+    voice = voice_id(tts_service_module.PIPER_MODEL)
+    store.put(phrase_key("Lesson complete!", voice), b"wav:exported")
+    manifest = export_manifest(store, ["Lesson complete!"], voice, static_dir)
+    assert list(manifest) == ["lesson complete!"]
+
+    calls = []
+    service = make_service(tmp_path / "runtime", calls)
+    service.static_dir = static_dir
+
+    assert asyncio.run(service.synthesize("lesson COMPLETE!")) == b"wav:exported"
+    assert calls == []
+
+
+def test_drain_waits_for_running_synthesis(tmp_path):
+    calls = []
+    service = make_service(tmp_path, calls)
+
+    async def run():
+        job = asyncio.create_task(service.synthesize("Goodbye"))
+        await asyncio.sleep(0)
+        abandoned = await service.drain(timeout=1)
+        return abandoned, job.done()
+
+    assert asyncio.run(run()) == (0, True)
+
+
+def test_batch_route_negotiates_format_from_accept(monkeypatch):
+    os.environ.setdefault("UNSTRUCTURED_API_KEY", "test")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from routes import voice
+    from services import audio_encoding
+
+    requested = []
+
+    async def fake_batch(texts, rate, fmt):
+        requested.append(fmt)
+        return [b"OggS" for _ in texts]
+
+    monkeypatch.setattr(audio_encoding, "encoder_available", lambda: True)
+    monkeypatch.setattr(voice.tts_service, "synthesize_batch", fake_batch)
+    app = FastAPI()
+    app.include_router(voice.router)
+
+    response = TestClient(app).post("/api/voice/batch", json={"texts": ["Hello"]}, headers={"Accept": "audio/ogg"})
+
+    assert response.status_code == 200
+    assert requested == ["opus"]
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("audio/ogg;q=0, audio/wav", "wav"),
+    ("audio/wav;q=0.5, audio/flac", "flac"),
+    ("audio/ogg, audio/wav", "opus"),
+    ("audio/wav, */*", "wav"),
+    ("*/*, audio/flac;q=0.9", "wav"),
+    ("audio/*;q=0.2, audio/ogg; codecs=opus", "opus"),
+    ("*/*;q=0.1, audio/wav;q=0", "opus"),
+    ("text/html, audio/ogg;q=oops", "wav"),
+])
+def test_accept_header_honours_q_values(monkeypatch, accept, expected):
+    monkeypatch.setattr(audio_encoding, "encoder_available", lambda: True)
+    assert negotiate_format(None, accept) == expected
+
+
+def test_accept_header_without_encoder_serves_wav(monkeypatch):
+    monkeypatch.setattr(audio_encoding, "encoder_available", lambda: False)
+    assert negotiate_format(None, "audio/ogg, audio/wav;q=0.1") == "wav"
+    assert negotiate_format("flac", None) == "wav"
+    with pytest.raises(ValueError):
+        negotiate_format("mp3", None)
@@ -0,0 +1,123 @@
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from services.db_services.migrations import run_migrations
+from services.db_services.user_stats import (
+    USER_STATS_DDL,
+    add_lessons,
+    backfill_user_stats,
+    compute_streak,
+    get_user_stats_row,
+    record_attempt,
+    remove_curriculum,
+    visible_streak,
+)
+
+TODAY = date(2026, 3, 10)
+
+
+def make_db():
+    engine = create_engine("sqlite://")
+    run_migrations(engine)
+    db = sessionmaker(bind=engine)()
+    db.execute(text("INSERT INTO users (id, name) VALUES ('u1', 'A')"))
+    db.execute(text("INSERT INTO curriculums (id, user_id, title) VALUES ('c1', 'u1', 'C')"))
+    db.execute(text("INSERT INTO modules (id, curriculum_id, title, position) VALUES ('m1', 'c1', 'M', 1)"))
+    for i in range(4):
+        db.execute(
+            text("INSERT INTO subtopics (id, module_id, title, content, position) VALUES (:id, 'm1', 'S', 'x', :i)"),
+            {"id": f"s{i}", "i": i}
+        )
+    add_lessons(db, "u1", 4)
+    return db
+
+
+ATTEMPTS = [
+    ("s0", 0.9, TODAY - timedelta(days=5)),
+    ("s0", 0.8, TODAY - timedelta(days=2)),
+    ("s1", 0.4, TODAY - timedelta(days=1)),
+    ("s1", 0.7, TODAY),
+    ("s2", 0.5, TODAY),
+]
+
+
+def replay(db):
+    for subtopic_id, score, on in ATTEMPTS:
+        db.execute(
+            text("INSERT INTO user_attempts (user_id, subtopic_id, score, created_at) VALUES ('u1', :sid, :score, :at)"),
+            {"sid": subtopic_id, "score": score, "at": f"{on} 12:00:00"}
+        )
+        record_attempt(db, "u1", subtopic_id, score, on=on)
+
+
+def test_incremental_rollup_matches_backfill():
+    db = make_db()
+    replay(db)
+    incremental = tuple(get_user_stats_row(db, "u1"))
+
+    backfill_user_stats(db)
+    rebuilt = tuple(get_user_stats_row(db, "u1"))
+
+    assert incremental[:2] == (2, 4)
+    assert incremental[3:5] == (5, 3)
+    assert abs(incremental[2] - 3.3) < 1e-9
+    assert incremental == rebuilt
+
+
+def test_streak_lapses_and_curriculum_delete():
+    db = make_db()
+    replay(db)
+    stats = get_user_stats_row(db, "u1")
+    assert visible_streak(stats.current_streak, stats.last_activity_date, TODAY + timedelta(days=1)) == 3
+    assert visible_streak(stats.current_streak, stats.last_activity_date, TODAY + timedelta(days=2)) == 0
+
+    remove_curriculum(db, "u1", "c1")
+    stats = get_user_stats_row(db, "u1")
+    assert (stats.completed_count, stats.total_lessons, stats.attempt_count) == (0, 0, 0)
+
+
+def test_sql_streak_picks_latest_run_only():
+    db = make_db()
+    replay(db)
+    assert compute_streak(db, "u1") == (3, TODAY)
+    assert compute_streak(db, "nobody") == (0, None)
+
+
+def test_user_ids_are_text_on_postgres():
+    for statement in USER_STATS_DDL:
+        assert "user_id TEXT" in statement.format(id_type="UUID")
+
+    db = make_db()
+    guest = "guest_0f8fad5b-d9cb-469f-a165-70867728950e"
+    add_lessons(db, guest, 3)
+    record_attempt(db, guest, "s0", 0.9, on=TODAY)
+
+    stats = get_user_stats_row(db, guest)
+    assert (stats.completed_count, stats.total_lessons) == (1, 3)
+
+
+def test_streak_stops_at_the_latest_gap_for_every_user():
+    db = make_db()
+    history = {
+        "u1": [0, 1, 2, 4, 5, 6, 7, 8],
+        "u2": [3, 5, 6],
+        "u3": [0],
+    }
+    for user_id, offsets in history.items():
+        for offset in offsets:
+            on = TODAY - timedelta(days=offset)
+            for hour in ("00:00:00", "23:59:59"):
+                db.execute(
+                    text("INSERT INTO user_attempts (user_id, subtopic_id, score, created_at) VALUES (:uid, 's0', 0.5, :at)"),
+                    {"uid": user_id, "at": f"{on} {hour}"}
+                )
+
+    assert compute_streak(db, "u1") == (3, TODAY)
+    assert compute_streak(db, "u2") == (1, TODAY - timedelta(days=3))
+    assert compute_streak(db, "u3") == (1, TODAY)
+
+    backfill_user_stats(db)
+    streaks = {user_id: get_user_stats_row(db, user_id).current_streak for user_id in history}
+    assert streaks == {"u1": 3, "u2": 1, "u3": 1}
@@ -0,0 +1,59 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import health
+from services.warmup import WarmupManager
+
+
+def test_steps_run_in_background_and_failures_keep_instance_cold():
+    manager = WarmupManager()
+    ran = []
+
+    async def async_step():
+        await asyncio.sleep(0.01)
+        ran.append("async")
+
+    def sync_step():
+        ran.append("sync")
+
+    def broken_step():
+        raise RuntimeError("model missing")
+
+    manager.register("tts", async_step)
+    manager.register("spacy", sync_step)
+    manager.register("db", broken_step)
+
+    async def run():
+        manager.start(concurrency=2)
+        assert manager.serving and not manager.is_warm
+        await manager.wait()
+
+    asyncio.run(run())
+
+    snapshot = manager.snapshot()
+    assert not snapshot["warm"]
+    assert snapshot["failed"] == ["db"]
+    assert sorted(ran) == ["async", "sync"]
+    assert snapshot["steps"]["db"]["state"] == "failed"
+    assert snapshot["steps"]["db"]["error"] == "model missing"
+
+
+def test_warm_endpoint_reports_failed_steps(monkeypatch):
+    manager = WarmupManager()
+    manager.register("spacy", lambda: None)
+    monkeypatch.setattr(health, "warmup", manager)
+    app = FastAPI()
+    app.include_router(health.router)
+    client = TestClient(app)
+
+    assert client.get("/health/warm").status_code == 503
+
+    manager.status["spacy"]["state"] = "done"
+    assert client.get("/health/warm").json()["status"] == "warm"
+
+    manager.status["spacy"]["state"] = "failed"
+    response = client.get("/health/warm")
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed"
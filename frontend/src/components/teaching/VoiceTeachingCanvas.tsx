@@ -78,6 +78,7 @@ export function VoiceTeachingCanvas({
         });
 
 
+        voiceEngineRef.current.loadLessonNarration(subtopicId);
         analyticsRef.current.startSession(uid, subtopicId);
 
 
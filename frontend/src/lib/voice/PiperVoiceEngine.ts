@@ -8,6 +8,11 @@ const VOICE_CACHE_BASE = '/voice_cache';
 let manifest: Record<string, string> = {};
 let manifestLoaded = false;
 
+// Must stay in sync with normalize_phrase in backend/services/phrase_store.py
+export function normalizePhrase(text: string): string {
+    return text.normalize('NFKC').toLowerCase().replace(/\s+/g, ' ').trim();
+}
+
 async function loadManifest(): Promise<void> {
     if (manifestLoaded) return;
     try {
@@ -20,6 +25,7 @@ async function loadManifest(): Promise<void> {
 export class PiperVoiceEngine {
     private preferences: VoicePreferences;
     private audioCache: Map<string, string> = new Map();
+    private lessonAudio: Map<string, string> = new Map();
     private pendingFetches: Map<string, Promise<string | null>> = new Map();
     private currentAudio: HTMLAudioElement | null = null;
     private speechQueue: string[] = [];
@@ -483,7 +489,7 @@ export class PiperVoiceEngine {
     }
 
     private async getAudioUrl(text: string): Promise<string | null> {
-        const key = text.toLowerCase().trim();
+        const key = normalizePhrase(text);
 
         if (this.audioCache.has(key)) {
             return this.audioCache.get(key)!;
@@ -511,6 +517,12 @@ export class PiperVoiceEngine {
             return url;
         }
 
+        const lessonUrl = this.lessonAudio.get(key);
+        if (lessonUrl && (this.preferences.rate || 1.0) === 1.0) {
+            this.audioCache.set(key, lessonUrl);
+            return lessonUrl;
+        }
+
         const fetchPromise = this.fetchAudio(text, key);
         this.pendingFetches.set(key, fetchPromise);
 
@@ -543,6 +555,22 @@ export class PiperVoiceEngine {
         return null;
     }
 
+    public async loadLessonNarration(subtopicId: string): Promise<boolean> {
+        try {
+            const res = await fetch(`${API_BASE}/api/voice/lesson/${encodeURIComponent(subtopicId)}`);
+            if (res.status !== 200) return false;
+            const data = await res.json();
+            for (const segment of data.segments || []) {
+                if (segment.cached) {
+                    this.lessonAudio.set(normalizePhrase(segment.text), `${API_BASE}${segment.url}`);
+                }
+            }
+            return true;
+        } catch {
+            return false;
+        }
+    }
+
     public async prefetch(texts: string[]): Promise<void> {
         const uniqueTexts = [...new Set(texts.filter(t => t?.trim()))];
         const CONCURRENT_LIMIT = 5;
@@ -550,7 +578,7 @@ export class PiperVoiceEngine {
         for (let i = 0; i < uniqueTexts.length; i += CONCURRENT_LIMIT) {
             const batch = uniqueTexts.slice(i, i + CONCURRENT_LIMIT);
             await Promise.all(batch.map(text => {
-                const key = text.toLowerCase().trim();
+                const key = normalizePhrase(text);
                 if (!this.audioCache.has(key) && !this.pendingFetches.has(key)) {
                     return this.getAudioUrl(text);
                 }
@@ -67,6 +67,8 @@ export function useVoiceMode({
             });
         }
 
+        voiceEngineRef.current.loadLessonNarration(subtopicId);
+
         if (!analyticsRef.current) {
             analyticsRef.current = new VoiceAnalytics();
             analyticsRef.current.startSession(uid, subtopicId);